@@ -1,10 +1,14 @@
 import os
 import sys
+import time
 import torch
+import asyncio
 import logging
+import threading
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
+from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig, StoppingCriteria, StoppingCriteriaList
 from peft import PeftModel
 from dotenv import load_dotenv
 import uvicorn
@@ -17,7 +21,12 @@ REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 # Añade la raíz al path para que las importaciones de shared_libs funcionen si las necesitas en el futuro.
 sys.path.insert(0, REPO_ROOT)
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+from shared_libs.utils.tracing import REQUEST_ID_HEADER, configure_logging, start_trace, current_request_id, span, get_spans
+from shared_libs.utils.metrics import REGISTRY, observe_spans
+from shared_libs.utils.deadline import deadline_from_headers, remaining_seconds
+from scheduler import PriorityScheduler, PRIORITY_HEADER, UnknownPriorityError
+
+configure_logging()
 logger = logging.getLogger("CoderAgent")
 
 # --- 1. CONFIGURACIÓN ---
@@ -29,11 +38,28 @@ HF_TOKEN = os.getenv("HUGGING_FACE_TOKEN")
 BASE_MODEL_NAME = "mistralai/Mistral-7B-Instruct-v0.3"
 LORA_PATH = os.path.join(REPO_ROOT, "Revit-Agent", "training_artifacts", "lora_revit_agent_mistral_v3_explicit")
 
+# Presupuesto de generación. Sin deadline del cliente se aplica el mismo timeout que usa el Orquestador.
+MAX_NEW_TOKENS = 1024
+DEFAULT_TIMEOUT_SECONDS = 300
+# Estimación inicial de velocidad (tokens/s); se ajusta con cada generación real.
+INITIAL_TOKENS_PER_SECOND = float(os.getenv("CODER_TOKENS_PER_SECOND", "20"))
+DISCONNECT_POLL_SECONDS = 0.5
+# Slots de generación simultánea en la GPU y cuántos puede ocupar el trabajo 'bulk'.
+GENERATION_SLOTS = int(os.getenv("CODER_GENERATION_SLOTS", "1"))
+BULK_MAX_RUNNING = int(os.getenv("CODER_BULK_MAX_RUNNING", "1"))
+PRIORITY_AGING_SECONDS = float(os.getenv("CODER_PRIORITY_AGING_SECONDS", "30"))
+MAX_BATCH_SIZE = int(os.getenv("CODER_MAX_BATCH_SIZE", "8"))
+
+GENERATIONS_ABORTED = REGISTRY.counter("generations_aborted_total", "Generaciones abortadas por deadline o desconexión del cliente.")
+
 # --- 2. LÓGICA DE LA APP FASTAPI ---
 app = FastAPI()
 # Movemos las variables del modelo al contexto de la app para que estén disponibles
 app.state.model = None
 app.state.tokenizer = None
+app.state.tokens_per_second = INITIAL_TOKENS_PER_SECOND
+# Los slots de la GPU se reparten por prioridad: las peticiones interactivas van primero.
+app.state.scheduler = PriorityScheduler(GENERATION_SLOTS, BULK_MAX_RUNNING, PRIORITY_AGING_SECONDS)
 
 @app.on_event("startup")
 def load_model():
@@ -67,6 +93,8 @@ def load_model():
         logger.info(f"Cargando tokenizer para '{BASE_MODEL_NAME}'...")
         app.state.tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL_NAME, trust_remote_code=True, token=HF_TOKEN)
         app.state.tokenizer.pad_token = app.state.tokenizer.eos_token
+        # Relleno por la izquierda: en /predict_batch todas las filas terminan en la misma posición.
+        app.state.tokenizer.padding_side = "left"
 
         logger.info(f"Aplicando adaptador LoRA desde '{LORA_PATH}'...")
         peft_model = PeftModel.from_pretrained(base_model, LORA_PATH)
@@ -82,38 +110,172 @@ def load_model():
 
 class PromptRequest(BaseModel):
     prompt: str
+    # 'interactive' (plugin) o 'bulk' (datasets, evaluaciones). La cabecera X-Priority tiene preferencia.
+    priority: str = "interactive"
+
+class BatchPromptRequest(BaseModel):
+    prompts: list[str]
+    priority: str = "interactive"
+
+class DeadlineStoppingCriteria(StoppingCriteria):
+    """
+    Detiene `generate` cuando vence el deadline o el cliente se desconecta.
+    Se evalúa tras cada token, así que el corte es casi inmediato.
+    """
+    def __init__(self, deadline: float, cancelled: threading.Event):
+        self.deadline = deadline
+        self.cancelled = cancelled
+        self.reason = None
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        if self.cancelled.is_set():
+            self.reason = "client_disconnected"
+        elif time.time() >= self.deadline:
+            self.reason = "deadline"
+        return self.reason is not None
+
+def _token_budget(deadline: float) -> int:
+    """Ajusta max_new_tokens a lo que cabe en el tiempo restante según la velocidad observada."""
+    affordable = int(remaining_seconds(deadline) * app.state.tokens_per_second)
+    return max(1, min(MAX_NEW_TOKENS, affordable))
+
+async def _watch_disconnect(request: Request, cancelled: threading.Event):
+    while not cancelled.is_set():
+        if await request.is_disconnected():
+            cancelled.set()
+            return
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    # Reutilizamos el ID que envía el Orquestador para que ambos logs compartan correlación.
+    start_trace(request.headers.get(REQUEST_ID_HEADER))
+    response = await call_next(request)
+    response.headers[REQUEST_ID_HEADER] = current_request_id()
+    return response
+
+def _parse_priority(request: Request, body_priority: str) -> str:
+    try:
+        return PriorityScheduler.validate(request.headers.get(PRIORITY_HEADER) or body_priority)
+    except UnknownPriorityError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _generate_codes(request: Request, prompts: list, priority: str) -> list:
+    """
+    Genera el código de uno o varios prompts en una única pasada por la GPU.
+    Con varios prompts se rellenan por la izquierda para generarlos como un solo lote.
+    """
+    deadline = deadline_from_headers(request.headers, DEFAULT_TIMEOUT_SECONDS)
+    cancelled = threading.Event()
+    watcher = asyncio.create_task(_watch_disconnect(request, cancelled))
+    try:
+        with span("tokenize"):
+            inputs = app.state.tokenizer(prompts, return_tensors="pt", padding=True).to(app.state.model.device)
+
+        async with app.state.scheduler.slot(priority):
+            # Mientras esperaba turno pudo vencer el deadline o irse el cliente: no gastamos GPU.
+            if cancelled.is_set() or remaining_seconds(deadline) <= 0:
+                reason = "client_disconnected" if cancelled.is_set() else "deadline"
+                GENERATIONS_ABORTED.inc(reason=reason, stage="queued")
+                logger.warning(f"Generación descartada antes de empezar ({reason}).")
+                raise HTTPException(status_code=504, detail=f"Generación abortada: {reason}.")
+
+            max_new_tokens = _token_budget(deadline)
+            stopper = DeadlineStoppingCriteria(deadline, cancelled)
+            if max_new_tokens < MAX_NEW_TOKENS:
+                logger.info(f"max_new_tokens reducido a {max_new_tokens} por el deadline.")
+
+            with span("generate"):
+                started = time.perf_counter()
+                outputs = await run_in_threadpool(
+                    _generate, inputs, max_new_tokens, StoppingCriteriaList([stopper])
+                )
+                elapsed = time.perf_counter() - started
+
+        prompt_length = inputs.input_ids.shape[-1]
+        new_tokens = outputs.shape[-1] - prompt_length
+        if new_tokens > 0 and elapsed > 0:
+            # Media móvil exponencial de la velocidad real de generación (pasos por segundo).
+            app.state.tokens_per_second = 0.8 * app.state.tokens_per_second + 0.2 * (new_tokens / elapsed)
+
+        if stopper.reason:
+            GENERATIONS_ABORTED.inc(reason=stopper.reason, stage="generating")
+            logger.warning(f"Generación abortada tras {new_tokens} tokens ({stopper.reason}).")
+            raise HTTPException(status_code=504, detail=f"Generación abortada: {stopper.reason}.")
+
+        with span("decode"):
+            return [
+                app.state.tokenizer.decode(row[prompt_length:], skip_special_tokens=True).strip()
+                for row in outputs
+            ]
+    finally:
+        cancelled.set()
+        watcher.cancel()
 
 @app.post("/predict")
 async def predict(request: Request, body: PromptRequest):
     if not app.state.model or not app.state.tokenizer:
         raise HTTPException(status_code=503, detail="El modelo no está disponible o falló al cargar. Revise los logs del servidor.")
     
+    priority = _parse_priority(request, body.priority)
     try:
-        full_prompt = body.prompt
-        logger.info(f"Recibida petición del Orquestador.")
-        
-        inputs = app.state.tokenizer(full_prompt, return_tensors="pt").to(app.state.model.device)
-
-        with torch.no_grad():
-            outputs = app.state.model.generate(
-                **inputs,
-                max_new_tokens=1024,
-                do_sample=True,
-                temperature=0.05,
-                top_p=0.9,
-                pad_token_id=app.state.tokenizer.eos_token_id,
-                eos_token_id=app.state.tokenizer.eos_token_id
-            )
-        
-        response_text = app.state.tokenizer.decode(outputs[0][len(inputs.input_ids[0]):], skip_special_tokens=True)
+        logger.info(f"Recibida petición del Orquestador (prioridad: {priority}).")
+        codes = await _generate_codes(request, [body.prompt], priority)
         
+        spans = get_spans()
+        observe_spans(spans)
         logger.info(f"Respuesta generada con éxito.")
-        return {"code": response_text.strip()}
+        return {"code": codes[0], "request_id": current_request_id(), "spans": spans}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error durante la inferencia: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/predict_batch")
+async def predict_batch(request: Request, body: BatchPromptRequest):
+    if not app.state.model or not app.state.tokenizer:
+        raise HTTPException(status_code=503, detail="El modelo no está disponible o falló al cargar. Revise los logs del servidor.")
+    if not body.prompts:
+        raise HTTPException(status_code=400, detail="La lista de prompts está vacía.")
+
+    priority = _parse_priority(request, body.priority)
+    try:
+        logger.info(f"Recibido lote de {len(body.prompts)} prompts (prioridad: {priority}).")
+        codes = []
+        # Los lotes grandes se parten para no desbordar la memoria de la GPU.
+        for i in range(0, len(body.prompts), MAX_BATCH_SIZE):
+            codes.extend(await _generate_codes(request, body.prompts[i:i + MAX_BATCH_SIZE], priority))
+
+        spans = get_spans()
+        observe_spans(spans)
+        logger.info(f"Lote generado con éxito.")
+        return {"codes": codes, "request_id": current_request_id(), "spans": spans}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error durante la inferencia por lotes: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _generate(inputs, max_new_tokens: int, stopping_criteria: StoppingCriteriaList):
+    with torch.no_grad():
+        return app.state.model.generate(
+            **inputs,
+            max_new_tokens=max_new_tokens,
+            do_sample=True,
+            temperature=0.05,
+            top_p=0.9,
+            pad_token_id=app.state.tokenizer.eos_token_id,
+            eos_token_id=app.state.tokenizer.eos_token_id,
+            stopping_criteria=stopping_criteria
+        )
+
+@app.get("/metrics")
+async def metrics():
+    return {**REGISTRY.snapshot(), "scheduler": app.state.scheduler.stats()}
+
 @app.get("/")
 async def root():
     return {"message": "Agente Coder (CodeLlama-7b-LoRA) está en funcionamiento."}
\ No newline at end of file
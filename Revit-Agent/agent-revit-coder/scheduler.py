@@ -0,0 +1,118 @@
+# scheduler.py
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+from shared_libs.utils.metrics import REGISTRY
+
+# --- 1. Clases de Prioridad ---
+# Menor rango = se atiende antes. 'interactive' son los drafters desde el plugin;
+# 'bulk' son transformaciones de datasets, evaluaciones nocturnas, etc.
+PRIORITY_CLASSES = {"interactive": 0, "bulk": 1}
+DEFAULT_PRIORITY = "interactive"
+PRIORITY_HEADER = "X-Priority"
+
+QUEUE_DEPTH = REGISTRY.gauge("scheduler_queue_depth", "Peticiones esperando slot de generación, por clase.")
+RUNNING = REGISTRY.gauge("scheduler_running", "Generaciones en curso, por clase.")
+QUEUE_WAIT_MS = REGISTRY.histogram("scheduler_queue_wait_ms", "Espera hasta obtener slot de generación (ms), por clase.")
+SERVED = REGISTRY.counter("scheduler_served_total", "Peticiones que obtuvieron slot, por clase.")
+
+
+class UnknownPriorityError(ValueError):
+    pass
+
+
+# --- 2. Planificador ---
+class PriorityScheduler:
+    """
+    Reparte los slots de generación de la GPU entre clases de prioridad.
+
+    - Sin expropiación: una generación en curso nunca se interrumpe.
+    - 'bulk' nunca ocupa más de `max_bulk_running` slots, de modo que una petición
+      interactiva espera como mucho a que termine una generación bulk.
+    - Envejecimiento: cada clase se trata como si hubiera llegado `rank * aging_seconds`
+      más tarde; un trabajo bulk que lleva esperando más que eso adelanta a los
+      interactivos recién llegados y no puede quedar en inanición.
+    """
+    def __init__(self, slots: int = 1, max_bulk_running: int = 1, aging_seconds: float = 30.0):
+        self.slots = slots
+        self.max_bulk_running = max_bulk_running
+        self.aging_seconds = aging_seconds
+        self._running = {name: 0 for name in PRIORITY_CLASSES}
+        self._waiters = []
+
+    @staticmethod
+    def validate(priority: str) -> str:
+        priority = (priority or DEFAULT_PRIORITY).strip().lower()
+        if priority not in PRIORITY_CLASSES:
+            raise UnknownPriorityError(f"Prioridad desconocida '{priority}'. Use: {', '.join(PRIORITY_CLASSES)}.")
+        return priority
+
+    @asynccontextmanager
+    async def slot(self, priority: str):
+        priority = self.validate(priority)
+        enqueued_at = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((priority, enqueued_at, future))
+        QUEUE_DEPTH.inc(priority=priority)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Si el slot llegó a concederse justo antes de la cancelación, lo devolvemos.
+            if future.done() and not future.cancelled():
+                self._release(priority)
+            else:
+                self._remove_waiter(future, priority)
+            raise
+
+        QUEUE_WAIT_MS.observe((time.monotonic() - enqueued_at) * 1000, priority=priority)
+        SERVED.inc(priority=priority)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    def stats(self) -> dict:
+        return {
+            "running": dict(self._running),
+            "queued": {name: sum(1 for w in self._waiters if w[0] == name) for name in PRIORITY_CLASSES}
+        }
+
+    # --- 3. Internos ---
+    def _effective_arrival(self, waiter) -> float:
+        priority, enqueued_at, _ = waiter
+        return enqueued_at + PRIORITY_CLASSES[priority] * self.aging_seconds
+
+    def _eligible(self, priority: str) -> bool:
+        return priority != "bulk" or self._running["bulk"] < self.max_bulk_running
+
+    def _dispatch(self):
+        while sum(self._running.values()) < self.slots:
+            # Una tarea cancelada deja su future cancelado en la lista hasta que vuelve a ejecutarse
+            # (y llama a `_remove_waiter`); si se libera un slot entre medias, no debe recibirlo.
+            for waiter in [w for w in self._waiters if w[2].done()]:
+                self._waiters.remove(waiter)
+                QUEUE_DEPTH.dec(priority=waiter[0])
+            candidates = [w for w in self._waiters if self._eligible(w[0])]
+            if not candidates:
+                return
+            waiter = min(candidates, key=self._effective_arrival)
+            self._waiters.remove(waiter)
+            priority, _, future = waiter
+            QUEUE_DEPTH.dec(priority=priority)
+            future.set_result(True)
+            self._running[priority] += 1
+            RUNNING.set(self._running[priority], priority=priority)
+
+    def _release(self, priority: str):
+        self._running[priority] -= 1
+        RUNNING.set(self._running[priority], priority=priority)
+        self._dispatch()
+
+    def _remove_waiter(self, future, priority: str):
+        for waiter in self._waiters:
+            if waiter[2] is future:
+                self._waiters.remove(waiter)
+                QUEUE_DEPTH.dec(priority=priority)
+                return
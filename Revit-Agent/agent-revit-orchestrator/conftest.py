@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import hashlib
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+# Catálogo mínimo con el formato de revit_api_reflection.json (colección 'api_signatures').
+API_CATALOG = [
+    {"type": "Wall", "methods": [{"signature": "Create(Document, Curve, ElementId, ElementId, Double, Double, Boolean, Boolean)"}],
+     "properties": ["Width", "Flipped", "WallType"]},
+    {"type": "Floor", "methods": [{"signature": "Create(Document, IList<CurveLoop>, ElementId, ElementId)"}],
+     "properties": ["FloorType"]},
+    {"type": "FamilyInstance", "methods": [{"signature": "flipFacing()"}], "properties": ["Symbol", "Host"]},
+    {"type": "ItemFactoryBase", "methods": [{"signature": "NewFamilyInstance(XYZ, FamilySymbol, StructuralType)"}],
+     "properties": []},
+    {"type": "Room", "methods": [{"signature": "IsPointInRoom(XYZ)"}], "properties": ["Area", "Number"]},
+    {"type": "Level", "methods": [{"signature": "Create(Document, Double)"}], "properties": ["Elevation", "Name"]},
+]
+
+
+class HashingEncoder:
+    """
+    Encoder determinista para las pruebas del RAG (sin descargar MiniLM): bolsa de términos de
+    bm25.tokenize proyectada por hash en `dimension` componentes y normalizada. Textos con
+    términos en común quedan cerca. Guarda los lotes que recibe en `calls`.
+    """
+    backend = "hash"
+
+    def __init__(self, dimension: int = 64):
+        self.dimension = dimension
+        self.calls = []
+
+    def encode(self, texts: list, batch_size: int = 64, show_progress_bar: bool = False, normalize: bool = False):
+        import numpy as np
+        from shared_libs.vectordb.bm25 import tokenize
+        self.calls.append(list(texts))
+        out = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for term in tokenize(text):
+                out[row, int(hashlib.md5(term.encode("utf-8")).hexdigest(), 16) % self.dimension] += 1.0
+        out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-9, None)
+        return out
+
+
+@pytest.fixture
+def hashing_encoder(monkeypatch):
+    """Sustituye el encoder compartido del proceso (get_encoder) durante la prueba."""
+    pytest.importorskip("numpy")
+    from shared_libs.vectordb import encoder as encoder_module
+    encoder = HashingEncoder()
+    monkeypatch.setitem(encoder_module._ENCODERS, (encoder_module.MODEL_NAME, encoder_module.ENCODER_BACKEND), encoder)
+    return encoder
+
+
+@pytest.fixture
+def api_catalog(tmp_path):
+    path = tmp_path / "revit_api_reflection.json"
+    path.write_text(json.dumps(API_CATALOG), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def vector_db(tmp_path, hashing_encoder, api_catalog):
+    """Directorio del servicio de índices con la colección 'api_signatures' (flat/L2) construida."""
+    pytest.importorskip("faiss")
+    from shared_libs.vectordb.ann_index import make_config
+    from shared_libs.vectordb.index_service import build_collection
+    directory = str(tmp_path / "vector_db")
+    assert build_collection("api_signatures", make_config(), source=api_catalog, directory=directory)
+    return directory
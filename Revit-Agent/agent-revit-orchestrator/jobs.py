@@ -0,0 +1,189 @@
+# jobs.py
+import time
+import uuid
+import queue
+import logging
+import threading
+
+from shared_libs.utils.tracing import start_trace
+from shared_libs.utils.metrics import REGISTRY
+
+logger = logging.getLogger("OrchestratorJobs")
+
+# --- 1. Métricas ---
+JOBS_QUEUE_DEPTH = REGISTRY.gauge("jobs_queue_depth", "Trabajos en cola esperando un worker.")
+JOBS_TOTAL = REGISTRY.counter("jobs_total", "Trabajos por estado final (succeeded, failed, cancelled, rejected).")
+JOB_QUEUE_WAIT_MS = REGISTRY.histogram("job_queue_wait_ms", "Tiempo de espera en cola de cada trabajo (ms).")
+
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+
+class QueueFullError(Exception):
+    """La cola local de trabajos está llena; el cliente debe reintentar más tarde."""
+
+
+class JobCancelledError(Exception):
+    """El cliente canceló el trabajo mientras se ejecutaba."""
+
+
+# --- 2. Cola de Trabajos ---
+class JobQueue:
+    """
+    Cola local y acotada de instrucciones de larga duración.
+
+    - `submit` devuelve el trabajo al instante; un número fijo de workers lo procesa.
+    - Como mucho `max_queued` trabajos esperan a la vez. Los cancelados en cola dejan de contar
+      al cancelarse, aunque su entrada siga en la cola interna hasta que un worker la descarte.
+    - Los resultados se conservan `ttl_seconds` tras terminar y luego se purgan.
+    - `wait` permite long-polling: bloquea hasta que el trabajo cambie de versión.
+    """
+    def __init__(self, handler, workers: int = 2, max_queued: int = 32, ttl_seconds: int = 600):
+        self.handler = handler
+        self.ttl_seconds = ttl_seconds
+        self.max_queued = max_queued
+        self._queue = queue.Queue()
+        self._queued = 0   # trabajos en estado 'queued' (el límite y el gauge), bajo self._lock
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True).start()
+
+    def submit(self, payload: dict, request_id: str) -> dict:
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "request_id": request_id,
+            "status": "queued",
+            "progress": {"stage": "queued"},
+            "version": 0,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            "cancel_requested": False
+        }
+        self._purge_expired()
+        with self._lock:
+            if self._queued >= self.max_queued:
+                JOBS_TOTAL.inc(status="rejected")
+                raise QueueFullError("La cola de trabajos está llena.")
+            self._jobs[job_id] = job
+            self._queued += 1
+            JOBS_QUEUE_DEPTH.set(self._queued)
+        self._queue.put((job_id, payload))
+        return self._public(job)
+
+    def get(self, job_id: str) -> dict:
+        self._purge_expired()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._public(job) if job else None
+
+    def wait(self, job_id: str, timeout: float, known_version: int = -1) -> dict:
+        """
+        Devuelve el trabajo en cuanto su versión supere `known_version`, termine,
+        o venza el `timeout`.
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                if job["version"] > known_version or job["status"] in FINISHED_STATES:
+                    return self._public(job)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return self._public(job)
+                self._changed.wait(remaining)
+
+    def cancel(self, job_id: str) -> dict:
+        """
+        Un trabajo en cola se descarta sin ejecutarse. Uno en curso sólo se marca
+        (`cancel_requested`) y se detiene en la siguiente llamada a `report()` del handler, es
+        decir, al pasar a la siguiente fase del pipeline: la fase en curso (p. ej. la llamada al
+        Coder) no se interrumpe y termina o vence con el deadline del trabajo. Hasta entonces el
+        trabajo sigue en estado 'running'.
+        """
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] == "queued":
+                job.update(status="cancelled", finished_at=time.time(), progress={"stage": "cancelled"})
+                self._queued -= 1
+                JOBS_QUEUE_DEPTH.set(self._queued)
+                JOBS_TOTAL.inc(status="cancelled")
+            elif job["status"] == "running":
+                job["cancel_requested"] = True
+            job["version"] += 1
+            self._changed.notify_all()
+            return self._public(job)
+
+    # --- 3. Internos ---
+    def _update(self, job_id: str, **fields):
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            job["version"] += 1
+            self._changed.notify_all()
+
+    def _worker(self):
+        while True:
+            job_id, payload = self._queue.get()
+            # Paso a 'running' atómico con `cancel`: o se cancela en cola o se ejecuta, nunca ambos.
+            with self._changed:
+                job = self._jobs.get(job_id)
+                if job is None or job["status"] != "queued":
+                    continue   # cancelado mientras esperaba: ya no contaba en la cola
+                started_at = time.time()
+                job.update(status="running", started_at=started_at, progress={"stage": "started"})
+                job["version"] += 1
+                self._queued -= 1
+                JOBS_QUEUE_DEPTH.set(self._queued)
+                self._changed.notify_all()
+
+            # Cada trabajo conserva el ID de la petición que lo creó, también en los logs del worker.
+            start_trace(job["request_id"])
+            JOB_QUEUE_WAIT_MS.observe((started_at - job["created_at"]) * 1000)
+            logger.info(f"Trabajo {job_id} iniciado.")
+
+            def report(stage: str, **details):
+                if job["cancel_requested"]:
+                    raise JobCancelledError(f"Trabajo {job_id} cancelado por el cliente.")
+                self._update(job_id, progress={"stage": stage, **details})
+
+            try:
+                result = self.handler(payload, report)
+                self._update(job_id, status="succeeded", result=result, finished_at=time.time(),
+                             progress={"stage": "done"})
+                JOBS_TOTAL.inc(status="succeeded")
+                logger.info(f"Trabajo {job_id} terminado.")
+            except JobCancelledError as e:
+                logger.info(str(e))
+                self._update(job_id, status="cancelled", finished_at=time.time(), progress={"stage": "cancelled"})
+                JOBS_TOTAL.inc(status="cancelled")
+            except Exception as e:
+                logger.error(f"El trabajo {job_id} falló: {e}", exc_info=True)
+                self._update(job_id, status="failed", error=str(e), finished_at=time.time(),
+                             progress={"stage": "failed"})
+                JOBS_TOTAL.inc(status="failed")
+
+    def _purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job["finished_at"] and now - job["finished_at"] > self.ttl_seconds
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    @staticmethod
+    def _public(job: dict) -> dict:
+        return dict(job)
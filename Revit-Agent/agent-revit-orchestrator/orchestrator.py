@@ -4,27 +4,53 @@ import json
 import requests
 import logging
 import re
-from flask import Flask, request, jsonify
+import math
+import time
+from flask import Flask, request, jsonify, g, Response, stream_with_context
 
 # --- 0. Configuración ---
 REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.insert(0, REPO_ROOT)
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+from shared_libs.utils.tracing import REQUEST_ID_HEADER, configure_logging, start_trace, current_request_id, span, get_spans
+from shared_libs.utils.metrics import REGISTRY, observe_spans
+from shared_libs.utils.deadline import deadline_from_headers, deadline_headers, remaining_seconds
+
+configure_logging()
 logger = logging.getLogger("OrchestratorAgent")
 
-from shared_libs.nlu.intent_classifier import classify_intent
-from shared_libs.nlu.slot_filler import extract_slots
+from shared_libs.nlu.intent_classifier import classify_intent, classify_intents
+from shared_libs.nlu.slot_filler import extract_slots, extract_slots_batch
+from shared_libs.nlu.artifact import RUNTIME as NLU_RUNTIME
+from shared_libs.nlu.embedding_fallback import FALLBACK as NLU_FALLBACK
+from shared_libs.nlu.utterance import Utterance
+from shared_libs.vectordb.retriever import RETRIEVER
+from jobs import JobQueue, QueueFullError
+from prompt_builder import TEMPLATES
 
 # --- 1. Inicialización ---
 app = Flask(__name__)
 AGENT_URL = "http://localhost:8000/predict"
+AGENT_BATCH_URL = "http://localhost:8000/predict_batch"
+# Timeout por defecto de una instrucción si el plugin no envía su propio deadline.
+REQUEST_TIMEOUT_SECONDS = 300
+# Modo asíncrono: workers, tamaño de la cola y tiempo de vida de los resultados.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "32"))
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "600"))
+JOB_MAX_WAIT_SECONDS = 60
+# Máximo de instrucciones por petición en /process_instructions (cada una es una llamada a la NLU y al Coder).
+MAX_INSTRUCTIONS = int(os.getenv("MAX_INSTRUCTIONS", "50"))
+
+CODER_CALLS_ABORTED = REGISTRY.counter("coder_calls_aborted_total", "Llamadas al Coder omitidas o cortadas por deadline.")
 logger.info(f"✅ Orquestador (Modo Prompt Maker) iniciado. Apuntando al Coder en: {AGENT_URL}")
 
 # --- 2. Lógica de Negocio ---
 
-def build_expert_prompt(user_text: str, intent: str, slots: dict, revit_context: dict) -> str:
+def build_expert_prompt(user_text: str, intent: str, slots: dict, revit_context: dict, api_context: list = None) -> str:
     """
     Construye un prompt de alta calidad, enriquecido con contexto, para que el Coder razone.
+    `api_context` son los resultados del RAG (miembros de la API relevantes para la petición).
     """
     prompt = "### INSTRUCTION:\n"
     prompt += "You are an expert C# programmer for the Autodesk Revit API. Your task is to generate a C# code snippet that can be executed directly to fulfill the user's request.\n"
@@ -49,19 +75,45 @@ def build_expert_prompt(user_text: str, intent: str, slots: dict, revit_context:
         prompt += f"Available Wall Types in Project: {', '.join(revit_context['available_wall_types'])}\n"
     if revit_context.get("selected_element_ids"):
         prompt += f"User's Selected Element IDs: {', '.join(revit_context['selected_element_ids'])}\n"
+    if api_context:
+        prompt += "Relevant Revit API Members:\n"
+        prompt += "".join(f"- {hit['text']}\n" for hit in api_context)
         
     prompt += "\n### RESPONSE:\n"
     return prompt
 
-def call_coder_agent(prompt: str) -> dict:
+def _post_to_coder(url: str, payload: dict, deadline: float):
+    """
+    Envía la petición al Coder con el ID y el deadline de la petición actual.
+    Devuelve (respuesta_json, None) o (None, mensaje_de_error_en_C#).
+    """
+    remaining = remaining_seconds(deadline)
+    if remaining <= 0:
+        logger.warning("Deadline vencido antes de llamar al Coder; no se envía la petición.")
+        CODER_CALLS_ABORTED.inc(reason="expired_before_call")
+        return None, "// ERROR: Tiempo agotado antes de generar el código."
     try:
-        payload = {"prompt": prompt}
-        response = requests.post(AGENT_URL, json=payload, timeout=300)
+        # Propagamos el ID y el deadline: el Coder recorta o aborta la generación si ya nadie la espera.
+        headers = {REQUEST_ID_HEADER: current_request_id(), **deadline_headers(deadline)}
+        response = requests.post(url, json=payload, headers=headers, timeout=remaining)
         response.raise_for_status()
-        return response.json() 
+        return response.json(), None
+    except requests.exceptions.Timeout:
+        logger.warning(f"El Coder no respondió antes del deadline ({remaining:.1f}s).")
+        CODER_CALLS_ABORTED.inc(reason="timeout")
+        return None, "// ERROR: Tiempo agotado esperando al Coder."
     except requests.exceptions.RequestException as e:
-        logger.error(f"No se pudo conectar con el Coder en {AGENT_URL}. {e}")
-        return {"code": f"// ERROR: No se pudo conectar con el Coder."}
+        logger.error(f"No se pudo conectar con el Coder en {url}. {e}")
+        return None, f"// ERROR: No se pudo conectar con el Coder."
+
+def call_coder_agent(prompt: str, deadline: float) -> dict:
+    data, error = _post_to_coder(AGENT_URL, {"prompt": prompt}, deadline)
+    return data if data is not None else {"code": error}
+
+def call_coder_agent_batch(prompts: list, deadline: float) -> dict:
+    """Un único viaje al Coder para todos los prompts; devuelve los códigos en el mismo orden."""
+    data, error = _post_to_coder(AGENT_BATCH_URL, {"prompts": prompts}, deadline)
+    return data if data is not None else {"codes": [error] * len(prompts)}
 
 def clean_generated_code(raw_code: str) -> str:
     """
@@ -101,41 +153,269 @@ def clean_generated_code(raw_code: str) -> str:
     
     return code_to_process.strip()
 
-# --- 3. Endpoint Principal ---
+def join_in_transaction(codes: list, name: str = "AI Batch") -> str:
+    """
+    Une varios fragmentos en una sola transacción. Cada fragmento va en su propio bloque
+    `{ }` para que las variables con el mismo nombre no choquen, y se eliminan sus
+    transacciones internas para no anidarlas.
+    """
+    blocks = []
+    for code in codes:
+        transaction_match = re.search(r'using\s*\(\s*Transaction.*\)\s*\{([\s\S]*)\}', code, re.DOTALL)
+        if transaction_match:
+            code = transaction_match.group(1)
+        code = re.sub(r'^\s*\w+\.(Start|Commit)\(\);\s*$', '', code, flags=re.MULTILINE).strip()
+        blocks.append("{\n" + "\n".join(f"    {line}" for line in code.splitlines()) + "\n}")
+
+    body = "\n".join(blocks)
+    indented = "\n".join(f"    {line}" for line in body.splitlines())
+    return (
+        f'using (Transaction t = new Transaction(doc, "{name}"))\n{{\n    t.Start();\n'
+        f'{indented}\n    t.Commit();\n}}'
+    )
+
+# --- 3. Trazabilidad ---
+@app.before_request
+def open_trace():
+    # Aceptamos el ID del plugin si lo envía; si no, generamos uno nuevo.
+    g.request_id = start_trace(request.headers.get(REQUEST_ID_HEADER))
+
+@app.after_request
+def attach_request_id(response):
+    response.headers[REQUEST_ID_HEADER] = current_request_id()
+    return response
+
+def run_instruction(user_text: str, revit_context: dict, deadline: float, report=None) -> dict:
+    """
+    Ejecuta el pipeline completo (NLU -> Prompt -> Coder -> Limpieza) para una instrucción.
+    `deadline` es el instante absoluto (epoch) tras el cual nadie leerá el resultado.
+    `report(stage)` permite a los trabajos asíncronos publicar su progreso.
+    """
+    report = report or (lambda stage, **details: None)
+    logger.info(f"--- INICIO DE PETICIÓN: '{user_text}' ---")
+
+    # FASE 1: NLU (con la búsqueda del RAG corriendo en paralelo)
+    report("nlu")
+    rag_started = time.perf_counter()
+    rag_future = RETRIEVER.submit([user_text])
+    with span("nlu"):
+        # Se preprocesa una sola vez; clasificador y slots comparten las vistas del texto.
+        utterance = Utterance(user_text)
+        intent = classify_intent(utterance)
+        slots = extract_slots(utterance, intent)
+    logger.info(f"1. NLU -> Intención: [{intent}], Slots: {slots}, Idioma: {utterance.language}")
+
+    # Sólo se espera lo que quede del presupuesto del RAG después de la NLU.
+    with span("retrieval"):
+        api_context = RETRIEVER.collect(rag_future, 1, rag_started, deadline=deadline, intents=[intent])[0]
+    logger.info(f"1b. RAG -> {len(api_context)} miembros de la API.")
+
+    # FASE 2: Construcción del Prompt Experto
+    report("build_prompt")
+    with span("build_prompt"):
+        final_prompt = build_expert_prompt(user_text, intent, slots, revit_context, api_context)
+    logger.info(f"2. Prompt Experto construido para el Coder.")
+
+    # FASE 3: Delegación
+    report("coder")
+    with span("coder"):
+        coder_response = call_coder_agent(final_prompt, deadline)
+    raw_code = coder_response.get("code", "// ERROR: El Coder no devolvió código.")
+    with span("clean_code"):
+        final_code = clean_generated_code(raw_code)
+    logger.info(f"3. Código recibido y limpiado.")
+
+    # FASE 4: Respuesta
+    spans = get_spans()
+    observe_spans(spans)
+    return {
+        "request_id": current_request_id(),
+        "intent": intent,
+        "slots": slots,
+        "generated_code": final_code,
+        "trace": {
+            "spans": spans,
+            "coder_spans": coder_response.get("spans", [])
+        }
+    }
+
+def run_instructions(user_texts: list, revit_context: dict, deadline: float, join_transaction: bool = False) -> dict:
+    """
+    Versión por lotes de `run_instruction`: todas las instrucciones comparten el contexto,
+    la NLU se resuelve de una vez y el Coder recibe todos los prompts en una sola petición.
+    """
+    logger.info(f"--- INICIO DE LOTE: {len(user_texts)} instrucciones ---")
+
+    rag_started = time.perf_counter()
+    rag_future = RETRIEVER.submit(user_texts)
+    with span("nlu"):
+        utterances = [Utterance(text) for text in user_texts]
+        intents = classify_intents(utterances)
+        slots_list = extract_slots_batch(utterances, intents)
+    logger.info(f"1. NLU -> Intenciones: {intents}")
+
+    with span("retrieval"):
+        api_contexts = RETRIEVER.collect(rag_future, len(user_texts), rag_started, deadline=deadline, intents=intents)
+
+    with span("build_prompt"):
+        prompts = [
+            build_expert_prompt(text, intent, slots, revit_context, api_context)
+            for text, intent, slots, api_context in zip(user_texts, intents, slots_list, api_contexts)
+        ]
+
+    with span("coder"):
+        coder_response = call_coder_agent_batch(prompts, deadline)
+    raw_codes = coder_response.get("codes") or ["// ERROR: El Coder no devolvió código."] * len(prompts)
+    with span("clean_code"):
+        final_codes = [clean_generated_code(code) for code in raw_codes]
+    logger.info(f"2. {len(final_codes)} códigos recibidos y limpiados.")
+
+    spans = get_spans()
+    observe_spans(spans)
+    response = {
+        "request_id": current_request_id(),
+        "results": [
+            {"text": text, "intent": intent, "slots": slots, "generated_code": code}
+            for text, intent, slots, code in zip(user_texts, intents, slots_list, final_codes)
+        ],
+        "trace": {
+            "spans": spans,
+            "coder_spans": coder_response.get("spans", [])
+        }
+    }
+    if join_transaction:
+        response["generated_code"] = join_in_transaction(final_codes)
+    return response
+
+def _run_job(payload: dict, report) -> dict:
+    return run_instruction(payload["text"], payload["context"], payload["deadline"], report)
+
+job_queue = JobQueue(_run_job, workers=JOB_WORKERS, max_queued=JOB_QUEUE_SIZE, ttl_seconds=JOB_RESULT_TTL_SECONDS)
+# Los cambios de patrones se publican regenerando el artefacto de la NLU; no hace falta reiniciar.
+NLU_RUNTIME.start_watching()
+# El modelo del respaldo por embeddings se carga en segundo plano; hasta entonces, sin respaldo.
+NLU_FALLBACK.warm_up()
+# Índice FAISS y modelo del RAG: se cargan aquí una sola vez (o con la primera petición si RAG_LAZY=1).
+# La consulta de API de cada plantilla se resuelve al cargar: si la búsqueda de la petición no llega
+# a tiempo, esas intenciones usan ese contexto en lugar de ir sin él.
+RETRIEVER.warm_up(precompute={intent: t["api_context_query"] for intent, t in TEMPLATES.items() if intent != "DEFAULT"})
+logger.info(f"NLU versión {NLU_RUNTIME.state.version} ({NLU_RUNTIME.state.source}).")
+
+# --- 4. Endpoint Principal ---
 @app.route("/process_instruction", methods=["POST"])
 def process_instruction():
     try:
         data = request.json
         user_text = data.get("text", "").strip()
         revit_context = data.get("context", {}) # El contexto del plugin
-
-        logger.info(f"--- INICIO DE PETICIÓN: '{user_text}' ---")
-        
-        # FASE 1: NLU
-        intent = classify_intent(user_text)
-        slots = extract_slots(user_text, intent)
-        logger.info(f"1. NLU -> Intención: [{intent}], Slots: {slots}")
-
-        # FASE 2: Construcción del Prompt Experto
-        final_prompt = build_expert_prompt(user_text, intent, slots, revit_context)
-        logger.info(f"2. Prompt Experto construido para el Coder.")
-
-        # FASE 3: Delegación
-        coder_response = call_coder_agent(final_prompt)
-        raw_code = coder_response.get("code", "// ERROR: El Coder no devolvió código.")
-        final_code = clean_generated_code(raw_code)
-        logger.info(f"3. Código recibido y limpiado.")
-
-        # FASE 4: Respuesta
-        return jsonify({
-            "intent": intent,
-            "slots": slots,
-            "generated_code": final_code
-        })
+        deadline = deadline_from_headers(request.headers, REQUEST_TIMEOUT_SECONDS)
+        return jsonify(run_instruction(user_text, revit_context, deadline))
         
     except Exception as e:
         logger.error(f"Error inesperado en el orquestador: {e}", exc_info=True)
-        return jsonify({"error": str(e)}), 500
+        return jsonify({"error": str(e), "request_id": current_request_id()}), 500
+
+@app.route("/process_instructions", methods=["POST"])
+def process_instructions():
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "El cuerpo debe ser un objeto JSON.", "request_id": current_request_id()}), 400
+        instructions = data.get("instructions", [])
+        if not isinstance(instructions, list) or not all(isinstance(text, str) for text in instructions):
+            return jsonify({"error": "'instructions' debe ser una lista de textos.", "request_id": current_request_id()}), 400
+        if len(instructions) > MAX_INSTRUCTIONS:
+            return jsonify({"error": f"'instructions' admite como máximo {MAX_INSTRUCTIONS} elementos.",
+                            "request_id": current_request_id()}), 400
+        user_texts = [text.strip() for text in instructions if text.strip()]
+        if not user_texts:
+            return jsonify({"error": "La lista 'instructions' está vacía.", "request_id": current_request_id()}), 400
+        revit_context = data.get("context", {})
+        deadline = deadline_from_headers(request.headers, REQUEST_TIMEOUT_SECONDS)
+        return jsonify(run_instructions(user_texts, revit_context, deadline, bool(data.get("join_transaction"))))
+
+    except Exception as e:
+        logger.error(f"Error inesperado en el orquestador: {e}", exc_info=True)
+        return jsonify({"error": str(e), "request_id": current_request_id()}), 500
+
+# --- 5. Modo Asíncrono (Trabajos) ---
+@app.route("/jobs", methods=["POST"])
+def create_job():
+    data = request.json or {}
+    payload = {
+        "text": data.get("text", "").strip(),
+        "context": data.get("context", {}),
+        # El deadline corre desde que se encola: un trabajo que nadie recogerá a tiempo no llega al Coder.
+        "deadline": deadline_from_headers(request.headers, REQUEST_TIMEOUT_SECONDS)
+    }
+    try:
+        job = job_queue.submit(payload, current_request_id())
+    except QueueFullError as e:
+        response = jsonify({"error": str(e), "request_id": current_request_id()})
+        response.headers["Retry-After"] = "5"
+        return response, 429
+    logger.info(f"Trabajo {job['job_id']} encolado.")
+    return jsonify({
+        "job_id": job["job_id"],
+        "request_id": job["request_id"],
+        "status": job["status"],
+        "status_url": f"/jobs/{job['job_id']}"
+    }), 202
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    # ?wait=N activa el long-polling: se responde en cuanto haya progreso o tras N segundos.
+    # Valores no numéricos -> 400; los negativos se tratan como "sin espera" / "cualquier versión".
+    try:
+        wait = float(request.args.get("wait", "0"))
+        version = int(request.args.get("version", "-1"))
+    except ValueError:
+        return jsonify({"error": "'wait' y 'version' deben ser numéricos."}), 400
+    if not math.isfinite(wait):
+        return jsonify({"error": "'wait' debe ser un número finito."}), 400
+    wait = min(max(wait, 0.0), JOB_MAX_WAIT_SECONDS)
+    version = max(version, -1)
+    if wait > 0:
+        job = job_queue.wait(job_id, wait, known_version=version)
+    else:
+        job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Trabajo '{job_id}' no encontrado o expirado."}), 404
+    return jsonify(job)
+
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return jsonify({"error": f"Trabajo '{job_id}' no encontrado o expirado."}), 404
+    return jsonify(job)
+
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def stream_job(job_id):
+    """Server-Sent Events: un evento por cada cambio de estado hasta que el trabajo termine."""
+    if job_queue.get(job_id) is None:
+        return jsonify({"error": f"Trabajo '{job_id}' no encontrado o expirado."}), 404
+
+    def events():
+        version = -1
+        deadline = time.monotonic() + JOB_RESULT_TTL_SECONDS
+        while time.monotonic() < deadline:
+            job = job_queue.wait(job_id, 15, known_version=version)
+            if job is None:
+                return
+            if job["version"] == version:
+                yield ": keep-alive\n\n"
+                continue
+            version = job["version"]
+            yield f"event: {job['status']}\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+            if job["status"] in ("succeeded", "failed", "cancelled"):
+                return
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream")
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return jsonify(REGISTRY.snapshot())
 
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5001)
\ No newline at end of file
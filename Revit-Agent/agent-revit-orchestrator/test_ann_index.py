@@ -0,0 +1,139 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+
+from shared_libs.vectordb.ann_index import (
+    ExactVectors, as_distance, build_index, exact_vectors_path_for, factory_string, load_exact_vectors,
+    load_index, make_config, prepare_vectors, save_index, search,
+)
+
+DIMENSION = 48
+
+
+def _vectors(n: int, seed: int = 0):
+    return np.random.default_rng(seed).standard_normal((n, DIMENSION)).astype(np.float32)
+
+
+# --- 1. Configuración ---
+def test_make_config_rejects_unknown_values():
+    assert make_config(type="hnsw", nprobe=None)["nprobe"] == 16
+    for bad in ({"type": "lsh"}, {"metric": "hamming"}, {"storage": "int4"}):
+        with pytest.raises(ValueError):
+            make_config(**bad)
+
+
+def test_factory_strings():
+    assert factory_string(make_config(), DIMENSION, 1000) == "Flat"
+    assert factory_string(make_config(type="hnsw", hnsw_m=16), DIMENSION, 1000) == "HNSW16"
+    assert factory_string(make_config(type="ivfsq8", nlist=8), DIMENSION, 1000) == "IVF8,SQ8"
+    assert factory_string(make_config(type="ivfpq", nlist=8, pq_m=12), DIMENSION, 1000) == "IVF8,PQ12x8"
+    with pytest.raises(ValueError):
+        factory_string(make_config(type="ivfpq", pq_m=7), DIMENSION, 1000)
+
+
+# --- 2. Construcción y búsqueda ---
+@pytest.mark.parametrize("overrides", [
+    {"type": "flat"},
+    {"type": "hnsw", "hnsw_m": 8},
+    {"type": "ivfsq8", "nprobe": 8},
+    {"type": "ivfpq", "pq_m": 12, "pq_bits": 4, "nprobe": 8},
+])
+def test_each_type_finds_the_stored_vectors(overrides):
+    vectors = _vectors(400)
+    config = make_config(**overrides)
+    index = build_index(vectors, config)
+    assert index.ntotal == len(vectors)
+    _, ids = search(index, config, vectors[:20], k=5)
+    recall = np.mean([i in row for i, row in enumerate(ids)])
+    assert recall >= (1.0 if config["type"] in ("flat", "hnsw") else 0.8)
+
+
+def test_save_and_load_keep_search_params(tmp_path):
+    vectors = _vectors(400)
+    config = make_config(type="hnsw", hnsw_m=8, ef_search=48)
+    path = str(tmp_path / "index.faiss")
+    save_index(build_index(vectors, config), config, path, extra={"model": "test"})
+    index, loaded = load_index(path)
+    assert loaded["type"] == "hnsw" and loaded["ef_search"] == 48
+    assert index.hnsw.efSearch == 48
+    assert search(index, loaded, vectors[:1], k=1)[1][0][0] == 0
+
+
+# --- 3. Métricas, almacenamiento y re-puntuación exacta ---
+def _exact_vectors(tmp_path, vectors) -> ExactVectors:
+    path = str(tmp_path / "vectors.f32")
+    vectors.astype(np.float32).tofile(path)
+    return ExactVectors(path, vectors.shape[1])
+
+
+@pytest.mark.parametrize("metric", ["l2", "ip"])
+def test_rescore_orders_candidates_exactly(tmp_path, metric):
+    vectors = _vectors(50)
+    queries = _vectors(4, seed=1)
+    exact = _exact_vectors(tmp_path, vectors)
+    rng = np.random.default_rng(2)
+    candidates = np.stack([rng.permutation(50)[:20] for _ in queries])
+    candidates[:, -3:] = -1   # huecos de faiss cuando hay menos resultados que los pedidos
+    distances, ids = exact.rescore(queries, candidates, 5, metric)
+    for query, cand, row_d, row_i in zip(queries, candidates, distances, ids):
+        cand = cand[cand >= 0]
+        if metric == "l2":
+            scores = ((vectors[cand] - query) ** 2).sum(axis=1)
+            expected = cand[np.argsort(scores)[:5]]
+        else:
+            scores = vectors[cand] @ query
+            expected = cand[np.argsort(-scores)[:5]]
+        assert list(row_i) == list(expected)
+        assert list(row_d) == sorted(row_d, reverse=(metric != "l2"))
+
+
+def test_rescore_pads_short_candidate_lists(tmp_path):
+    exact = _exact_vectors(tmp_path, _vectors(10))
+    distances, ids = exact.rescore(_vectors(1, seed=1), np.array([[3, -1, -1]]), 3, "l2")
+    assert ids[0][0] == 3 and list(ids[0][1:]) == [-1, -1]
+    assert np.isinf(distances[0][1:]).all()
+
+
+@pytest.mark.parametrize("metric,storage", [("l2", "sq8"), ("ip", "fp16"), ("cosine", "sq8")])
+def test_quantized_index_with_rescore_matches_exact_search(tmp_path, metric, storage):
+    vectors = _vectors(500)
+    queries = _vectors(20, seed=3)
+    config = make_config(metric=metric, storage=storage, rescore=4)
+    path = str(tmp_path / "index.faiss")
+    save_index(build_index(vectors, config), config, path, vectors=vectors)
+    assert os.path.getsize(exact_vectors_path_for(path)) == vectors.size * 4
+
+    index, loaded = load_index(path)
+    exact = load_exact_vectors(path, index, loaded)
+    distances, ids = search(index, loaded, queries, 5, exact)
+    reference_config = make_config(metric=metric)
+    _, reference = search(build_index(vectors, reference_config), reference_config, queries, 5)
+    overlap = np.mean([len(set(a) & set(b)) / 5 for a, b in zip(ids, reference)])
+    assert overlap >= 0.95
+    # `as_distance`: menor = más parecido en cualquier métrica.
+    for row in distances:
+        converted = [as_distance(value, loaded) for value in row]
+        assert converted == sorted(converted)
+
+
+def test_cosine_normalizes_queries_and_documents():
+    vectors = _vectors(30)
+    config = make_config(metric="cosine")
+    index = build_index(vectors * 10, config)
+    similarities, ids = search(index, config, vectors[:3] * 0.1, 1)
+    assert list(ids[:, 0]) == [0, 1, 2]
+    np.testing.assert_allclose(similarities[:, 0], 1.0, atol=1e-5)
+    np.testing.assert_allclose(np.linalg.norm(prepare_vectors(vectors, config), axis=1), 1.0, atol=1e-5)
+
+
+def test_rescore_needs_the_exact_vectors(tmp_path):
+    config = make_config(rescore=2)
+    with pytest.raises(ValueError):
+        save_index(build_index(_vectors(10), config), config, str(tmp_path / "index.faiss"))
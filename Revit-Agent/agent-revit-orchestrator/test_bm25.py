@@ -0,0 +1,57 @@
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from shared_libs.vectordb.bm25 import BM25Index, RRF_K, reciprocal_rank_fusion, tokenize
+
+
+# --- 1. Tokenizador ---
+def test_tokenize_splits_dotted_identifiers_and_camel_case():
+    tokens = tokenize("Document.Create.NewFamilyInstance")
+    assert tokens[0] == "document.create.newfamilyinstance"
+    for term in ("document", "create", "newfamilyinstance", "new", "family", "instance"):
+        assert term in tokens
+
+
+def test_tokenize_splits_underscores_and_acronyms():
+    tokens = tokenize("OST_StructuralColumns XYZPoint")
+    for term in ("ost_structuralcolumns", "ost", "structuralcolumns", "structural", "columns",
+                 "xyzpoint", "xyz", "point"):
+        assert term in tokens
+
+
+def test_tokenize_keeps_accented_words_and_numbers_whole():
+    assert tokenize("Crea un muro de 3,5 metros en la sección") == \
+        ["crea", "un", "muro", "de", "3,5", "metros", "en", "la", "sección"]
+
+
+# --- 2. Índice ---
+def test_search_ranks_exact_identifier_first():
+    index = BM25Index.build([
+        "Wall.Create crea un muro",
+        "Document.Create.NewFamilyInstance coloca un ejemplar de familia",
+        "Floor.Create crea un suelo",
+    ])
+    hits = index.search("NewFamilyInstance", k=2)
+    assert hits[0][0] == 1
+    assert index.search("new family instance", k=1)[0][0] == 1
+
+
+def test_search_applies_filter():
+    index = BM25Index.build(["muro", "muro muro", "suelo"])
+    assert [doc_id for doc_id, _ in index.search("muro", k=3, allowed=lambda doc_id: doc_id != 1)] == [0]
+
+
+# --- 3. Fusión ---
+def test_rrf_rewards_documents_in_both_rankings():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]])
+    assert [doc_id for doc_id, _ in fused][:2] == [1, 3]
+    assert dict(fused)[1] == 1 / (RRF_K + 1) + 1 / (RRF_K + 2)
+    assert {doc_id for doc_id, _ in fused} == {1, 2, 3, 4}
+
+
+def test_rrf_weights():
+    fused = reciprocal_rank_fusion([[1], [2]], weights=[1.0, 2.0])
+    assert [doc_id for doc_id, _ in fused] == [2, 1]
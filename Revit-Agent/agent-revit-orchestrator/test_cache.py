@@ -0,0 +1,55 @@
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from shared_libs.vectordb.cache import LRUCache
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache("test", 2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1      # 'a' pasa a ser la más reciente
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_put_existing_key_refreshes_it():
+    cache = LRUCache("test", 2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 10)
+    cache.put("c", 3)
+    assert cache.get("a") == 10
+    assert cache.get("b") is None
+
+
+def test_stats_count_hits_and_misses():
+    cache = LRUCache("test", 4)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("x")
+    assert cache.stats() == {"entries": 1, "hits": 2, "misses": 1, "hit_ratio": 2 / 3}
+    assert cache.get("x", "default") == "default"
+
+
+def test_maxsize_zero_disables_cache():
+    cache = LRUCache("test", 0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats()["misses"] == 1
+
+
+def test_clear():
+    cache = LRUCache("test", 2)
+    cache.put("a", 1)
+    cache.clear()
+    assert cache.get("a") is None
+    assert len(cache) == 0
@@ -0,0 +1,86 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+np = pytest.importorskip("numpy")
+
+from shared_libs.vectordb.embedding_store import EmbeddingStore, content_hash, documents_digest
+
+
+class CountingEncoder:
+    """encode() determinista por texto que recuerda qué textos se le pidieron."""
+    def __init__(self, dimension: int = 8):
+        self.dimension = dimension
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.stack([
+            np.random.default_rng(int(content_hash(text)[:8], 16)).standard_normal(self.dimension)
+            for text in texts
+        ]).astype(np.float32)
+
+
+def test_sync_encodes_only_new_texts(tmp_path):
+    encode = CountingEncoder()
+    store = EmbeddingStore(str(tmp_path), "model-a")
+    first, stats = store.sync(["a", "b", "c"], encode)
+    assert stats == {"documents": 3, "reused": 0, "encoded": 3, "removed": 0}
+
+    # Otro proceso (o una ejecución posterior) abre el mismo almacén desde disco.
+    store = EmbeddingStore(str(tmp_path), "model-a")
+    second, stats = store.sync(["c", "a", "d"], encode)
+    assert stats == {"documents": 3, "reused": 2, "encoded": 1, "removed": 1}
+    assert encode.calls[-1] == ["d"]
+    np.testing.assert_array_equal(second[0], first[2])
+    np.testing.assert_array_equal(second[1], first[0])
+    np.testing.assert_array_equal(second[2], encode(["d"])[0])
+
+
+def test_sync_compacts_removed_rows(tmp_path):
+    encode = CountingEncoder()
+    store = EmbeddingStore(str(tmp_path), "model-a")
+    store.sync(["a", "b", "c", "d"], encode)
+    store.sync(["b"], encode)
+    assert len(store) == 1
+    assert os.path.getsize(store.vectors_path) == 1 * encode.dimension * 4
+    matrix, stats = EmbeddingStore(str(tmp_path), "model-a").sync(["b"], encode)
+    assert stats["encoded"] == 0 and matrix.shape == (1, encode.dimension)
+
+
+def test_sync_keeps_duplicates_and_order(tmp_path):
+    encode = CountingEncoder()
+    matrix, stats = EmbeddingStore(str(tmp_path), "model-a").sync(["x", "y", "x"], encode)
+    assert encode.calls == [["x", "y"]]
+    assert matrix.shape == (3, encode.dimension)
+    np.testing.assert_array_equal(matrix[0], matrix[2])
+
+
+def test_unchanged_texts_do_not_rewrite(tmp_path):
+    encode = CountingEncoder()
+    store = EmbeddingStore(str(tmp_path), "model-a")
+    store.sync(["a", "b"], encode)
+    mtime = os.stat(store.vectors_path).st_mtime_ns
+    _, stats = store.sync(["b", "a"], encode)
+    assert stats["encoded"] == 0 and stats["removed"] == 0
+    assert os.stat(store.vectors_path).st_mtime_ns == mtime
+
+
+def test_other_model_and_clear_reencode(tmp_path):
+    encode = CountingEncoder()
+    EmbeddingStore(str(tmp_path), "model-a").sync(["a"], encode)
+    assert len(EmbeddingStore(str(tmp_path), "model-b")) == 0
+    store = EmbeddingStore(str(tmp_path), "model-a")
+    store.clear()
+    _, stats = store.sync(["a"], encode)
+    assert stats["encoded"] == 1
+
+
+def test_documents_digest_depends_on_order():
+    hashes = [content_hash("a"), content_hash("b")]
+    assert documents_digest(hashes) == documents_digest(list(hashes))
+    assert documents_digest(hashes) != documents_digest(hashes[::-1])
@@ -0,0 +1,155 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+np = pytest.importorskip("numpy")
+
+from shared_libs.vectordb import encoder as encoder_module
+from shared_libs.vectordb.encoder import OnnxEncoder, get_encoder, load_encoder
+
+DIMENSION = 4
+PAD_ID = 0
+
+
+class WordTokenizer:
+    """Tokenizador por palabras con relleno hasta la más larga del lote, como `tokenizers` con enable_padding."""
+    def __init__(self):
+        self.vocab = {}
+
+    def encode_batch(self, texts: list):
+        ids = [[self.vocab.setdefault(word, len(self.vocab) + 1) for word in text.split()] for text in texts]
+        width = max(len(row) for row in ids)
+        return [SimpleNamespace(ids=row + [PAD_ID] * (width - len(row)),
+                                attention_mask=[1] * len(row) + [0] * (width - len(row)),
+                                type_ids=[0] * width) for row in ids]
+
+
+class TableSession:
+    """Sesión de ONNX Runtime cuyo last_hidden_state es una tabla de embeddings por id (el relleno, enorme)."""
+    def __init__(self):
+        self.batches = []
+
+    @staticmethod
+    def embedding(token_id: int):
+        if token_id == PAD_ID:
+            return np.full(DIMENSION, 1e6, dtype=np.float32)
+        return np.random.default_rng(token_id).standard_normal(DIMENSION).astype(np.float32)
+
+    def run(self, outputs, feed):
+        self.batches.append(feed)
+        ids = feed["input_ids"]
+        return [np.stack([[self.embedding(i) for i in row] for row in ids])]
+
+
+def _onnx_encoder(normalize: bool = False) -> OnnxEncoder:
+    encoder = OnnxEncoder.__new__(OnnxEncoder)
+    encoder.meta = {"model": "test", "dimension": DIMENSION, "normalize": normalize}
+    encoder.model_name = "test"
+    encoder.normalize = normalize
+    encoder.tokenizer = WordTokenizer()
+    encoder.session = TableSession()
+    encoder.input_names = {"input_ids", "attention_mask"}
+    return encoder
+
+
+# --- 1. Pooling y orden (OnnxEncoder) ---
+def test_mean_pooling_ignores_padding():
+    encoder = _onnx_encoder()
+    texts = ["crea un muro de tres metros", "muro"]
+    vectors = encoder.encode(texts)
+    for text, vector in zip(texts, vectors):
+        ids = [encoder.tokenizer.vocab[word] for word in text.split()]
+        expected = np.mean([TableSession.embedding(i) for i in ids], axis=0)
+        np.testing.assert_allclose(vector, expected, rtol=1e-5)
+    assert "token_type_ids" not in encoder.session.batches[0]
+
+
+def test_batches_by_length_and_restores_order():
+    encoder = _onnx_encoder()
+    texts = ["a b c d e", "a", "a b c", "a b", "a b c d"]
+    vectors = encoder.encode(texts, batch_size=2)
+    # Lotes de textos de longitud parecida: apenas relleno.
+    assert [batch["input_ids"].shape for batch in encoder.session.batches] == [(2, 2), (2, 4), (1, 5)]
+    for text, vector in zip(texts, vectors):
+        np.testing.assert_allclose(vector, encoder.encode([text])[0], rtol=1e-5)
+
+
+def test_normalize_and_empty_input():
+    encoder = _onnx_encoder(normalize=True)
+    np.testing.assert_allclose(np.linalg.norm(encoder.encode(["un muro", "un suelo"]), axis=1), 1.0, rtol=1e-5)
+    assert encoder.encode([]).shape == (0, DIMENSION)
+    unnormalized = _onnx_encoder()
+    assert np.linalg.norm(unnormalized.encode(["un muro"], normalize=True)[0]) == pytest.approx(1.0, rel=1e-5)
+
+
+# --- 2. Carga y caché ---
+class StubTorchEncoder:
+    backend = "torch"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+
+def test_load_encoder_falls_back_to_torch(tmp_path, monkeypatch):
+    monkeypatch.setattr(encoder_module, "SentenceTransformerEncoder", StubTorchEncoder)
+    encoder = load_encoder("some/model", backend="onnx", onnx_dir=str(tmp_path / "missing"))
+    assert isinstance(encoder, StubTorchEncoder) and encoder.model_name == "some/model"
+
+
+def test_get_encoder_loads_once_per_model_and_backend(monkeypatch):
+    loaded = []
+    monkeypatch.setattr(encoder_module, "_ENCODERS", {})
+    monkeypatch.setattr(encoder_module, "load_encoder", lambda name, backend: loaded.append((name, backend)) or object())
+    assert get_encoder("a", "torch") is get_encoder("a", "torch")
+    get_encoder("a", "onnx")
+    assert loaded == [("a", "torch"), ("a", "onnx")]
+
+
+# --- 3. Modelo exportado (torch + sentence-transformers + onnxruntime) ---
+@pytest.fixture(scope="module")
+def exported_model(tmp_path_factory):
+    """Un BERT diminuto creado en local (sin descargas), exportado con scripts/export_onnx_encoder.py."""
+    for module in ("torch", "transformers", "sentence_transformers", "onnxruntime", "tokenizers", "onnx"):
+        pytest.importorskip(module)
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+    from sentence_transformers import SentenceTransformer, models
+    sys.path.insert(0, os.path.join(REPO_ROOT, 'Revit-Agent', 'scripts'))
+    from export_onnx_encoder import export
+
+    root = tmp_path_factory.mktemp("tiny_encoder")
+    bert_dir, model_dir, onnx_dir = str(root / "bert"), str(root / "model"), str(root / "onnx")
+    os.makedirs(bert_dir)
+    words = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + "crea un muro suelo de en el nivel wall floor create room".split()
+    with open(os.path.join(bert_dir, "vocab.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(words))
+    BertTokenizerFast(vocab_file=os.path.join(bert_dir, "vocab.txt")).save_pretrained(bert_dir)
+    config = BertConfig(vocab_size=len(words), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                        intermediate_size=64, max_position_embeddings=64)
+    BertModel(config).save_pretrained(bert_dir)
+    transformer = models.Transformer(bert_dir, max_seq_length=32)
+    pooling = models.Pooling(transformer.get_word_embedding_dimension(), "mean")
+    SentenceTransformer(modules=[transformer, pooling, models.Normalize()]).save(model_dir)
+    export(model_dir, onnx_dir)
+    return model_dir, onnx_dir
+
+
+def test_exported_model_matches_sentence_transformer(exported_model):
+    model_dir, onnx_dir = exported_model
+    texts = ["crea un muro", "wall create en el nivel", "floor", "suelo de room en el nivel un muro"]
+    onnx = load_encoder(model_dir, backend="onnx", onnx_dir=onnx_dir)
+    assert onnx.backend == "onnx"
+    reference = encoder_module.SentenceTransformerEncoder(model_dir).encode(texts, normalize=True)
+    vectors = onnx.encode(texts, batch_size=2)
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+    assert (vectors * reference).sum(axis=1).min() >= 0.99
+
+
+def test_exported_model_of_another_model_is_not_used(exported_model, monkeypatch):
+    _, onnx_dir = exported_model
+    monkeypatch.setattr(encoder_module, "SentenceTransformerEncoder", StubTorchEncoder)
+    assert load_encoder("other/model", backend="onnx", onnx_dir=onnx_dir).backend == "torch"
@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from conftest import API_CATALOG
+from shared_libs.vectordb.index_service import (
+    Collection, VectorIndexService, build_collection, collection_paths, load_manifest, matches_filters, record_text,
+)
+
+CORPUS = [
+    {"id": "walls-1", "title": "Walls", "text": "Use Wall.Create to create a wall from a curve on a level."},
+    {"id": "rooms-1", "title": "Rooms", "text": "Room.IsPointInRoom tells whether a point lies inside the room."},
+    {"id": "levels-1", "title": "Levels", "text": "Level.Create adds a level at the given elevation."},
+]
+
+
+def _make_config():
+    from shared_libs.vectordb.ann_index import make_config
+    return make_config()
+
+
+@pytest.fixture
+def service(vector_db, tmp_path):
+    corpus = tmp_path / "rag_corpus.jsonl"
+    corpus.write_text("".join(json.dumps(record) + "\n" for record in CORPUS), encoding="utf-8")
+    assert build_collection("rag_corpus", _make_config(), source=str(corpus), directory=vector_db)
+    return VectorIndexService(vector_db)
+
+
+# --- 1. Registros y filtros ---
+def test_record_text_and_filters():
+    record = {"title": "Walls", "content": "", "class": "Wall", "kind": "method"}
+    assert record_text(record, ("title", "content")) == "Walls"
+    assert matches_filters(record, {"class": ["Wall", "WallType"], "kind": "method"})
+    assert not matches_filters(record, {"class": "Floor"})
+    assert not matches_filters(record, {"member": ("Create",)})
+
+
+# --- 2. Construcción ---
+def test_build_writes_files_and_manifest(vector_db):
+    entry = load_manifest(vector_db)["collections"]["api_signatures"]
+    assert entry["documents"] == 16
+    assert entry["index_config"]["type"] == "flat"
+    paths = collection_paths("api_signatures", vector_db)
+    for key in ("index", "metadata", "bm25"):
+        assert os.path.exists(paths[key])
+    assert len(VectorIndexService(vector_db).collection("api_signatures")) == 16
+
+
+def test_rebuild_encodes_only_changed_documents(vector_db, api_catalog, hashing_encoder):
+    index_path = collection_paths("api_signatures", vector_db)["index"]
+    mtime = os.stat(index_path).st_mtime_ns
+    calls = len(hashing_encoder.calls)
+    assert build_collection("api_signatures", _make_config(), source=api_catalog, directory=vector_db)
+    assert len(hashing_encoder.calls) == calls
+    assert os.stat(index_path).st_mtime_ns == mtime
+
+    with open(api_catalog, "w", encoding="utf-8") as f:
+        json.dump(API_CATALOG + [{"type": "Grid", "methods": [], "properties": ["Curve"]}], f)
+    entry = build_collection("api_signatures", _make_config(), source=api_catalog, directory=vector_db)
+    assert entry["documents"] == 17
+    assert hashing_encoder.calls[-1] == ["Class: Grid. Property: Curve"]
+
+
+def test_missing_source_is_skipped(tmp_path):
+    assert build_collection("api_signatures", _make_config(), source=str(tmp_path / "missing.json"),
+                            directory=str(tmp_path)) is None
+
+
+# --- 3. Consulta ---
+def test_search_vectors_with_filters(service):
+    collection = service.collection("api_signatures")
+    vectors = service.encode(["wall width", "create"])
+    hits = collection.search_vectors(vectors, 3)
+    assert [len(row) for row in hits] == [3, 3]
+    assert hits[0][0]["class"] == "Wall" and hits[0][0]["member"] == "Width"
+    assert all(row[i]["distance"] <= row[i + 1]["distance"] for row in hits for i in range(len(row) - 1))
+
+    filtered = collection.search_vectors(vectors, 4, {"class": ["Wall", "Floor"], "kind": "property"})
+    assert [len(row) for row in filtered] == [4, 4]
+    assert all(hit["class"] in ("Wall", "Floor") and hit["kind"] == "property" for row in filtered for hit in row)
+    assert collection.search_vectors(vectors[:1], 3, {"class": "Grid"}) == [[]]
+
+
+def test_hybrid_finds_exact_identifiers(service):
+    collection = service.collection("api_signatures")
+    # El vector denso apunta a otra cosa: el identificador exacto lo aporta BM25.
+    texts, vectors = ["NewFamilyInstance"], service.encode(["floor type"])
+    dense = collection.search_vectors(vectors, 1)[0]
+    hybrid = collection.search_hybrid(texts, vectors, 3)[0]
+    assert dense[0]["class"] == "Floor"
+    assert hybrid[0]["class"] == "ItemFactoryBase" and hybrid[0]["member"].startswith("NewFamilyInstance")
+    assert all("score" in hit and "distance" in hit for hit in hybrid)
+    assert hybrid[0]["score"] >= hybrid[1]["score"]
+    filtered = collection.search_hybrid(texts, vectors, 3, {"class": "Room"})[0]
+    assert filtered and all(hit["class"] == "Room" for hit in filtered)
+
+
+def test_service_searches_several_collections(service, hashing_encoder):
+    assert sorted(service.names()) == ["api_signatures", "rag_corpus"]
+    hashing_encoder.calls.clear()
+    results = service.search(["is point in room", "wall create"],
+                             {"api_signatures": 2, "rag_corpus": {"k": 1, "filters": {"title": "Walls"}}})
+    assert len(hashing_encoder.calls) == 1
+    assert [len(row) for row in results["api_signatures"]] == [2, 2]
+    assert results["api_signatures"][0][0]["member"] == "IsPointInRoom(XYZ)"
+    assert [[hit["id"] for hit in row] for row in results["rag_corpus"]] == [[0], [0]]
+    assert results["rag_corpus"][1][0]["title"] == "Walls"
+
+
+def test_collection_of_another_model_or_missing(vector_db):
+    entry = load_manifest(vector_db)["collections"]["api_signatures"]
+    with pytest.raises(ValueError):
+        Collection("api_signatures", entry, vector_db, model_name="other/model")
+    with pytest.raises(ValueError):
+        VectorIndexService(vector_db).collection("no_existe")
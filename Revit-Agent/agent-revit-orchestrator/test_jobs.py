@@ -0,0 +1,131 @@
+import os
+import sys
+import threading
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jobs import JobQueue, QueueFullError
+
+
+def _wait_finished(jobs: JobQueue, job_id: str, timeout: float = 5.0) -> dict:
+    job = jobs.get(job_id)
+    version = -1
+    while job["status"] not in ("succeeded", "failed", "cancelled"):
+        version = job["version"]
+        job = jobs.wait(job_id, timeout, known_version=version)
+        assert job["version"] > version, "el trabajo no avanzó a tiempo"
+    return job
+
+
+# --- 1. Ciclo de vida ---
+def test_job_succeeds_and_reports_progress():
+    def handler(payload, report):
+        report("nlu")
+        return {"echo": payload["text"]}
+
+    jobs = JobQueue(handler, workers=1)
+    job = jobs.submit({"text": "hola"}, "req-1")
+    assert job["status"] == "queued"
+    job = _wait_finished(jobs, job["job_id"])
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"echo": "hola"}
+    assert job["request_id"] == "req-1"
+
+
+def test_failed_job_keeps_error():
+    def handler(payload, report):
+        raise RuntimeError("sin Coder")
+
+    jobs = JobQueue(handler, workers=1)
+    job = _wait_finished(jobs, jobs.submit({}, "req")["job_id"])
+    assert job["status"] == "failed"
+    assert job["error"] == "sin Coder"
+
+
+def test_queue_full():
+    jobs = JobQueue(lambda payload, report: None, workers=0, max_queued=1)
+    jobs.submit({}, "req")
+    with pytest.raises(QueueFullError):
+        jobs.submit({}, "req")
+
+
+# --- 2. Cancelación ---
+def test_cancel_queued_job_never_runs():
+    ran = []
+    jobs = JobQueue(lambda payload, report: ran.append(payload), workers=0)
+    job_id = jobs.submit({}, "req")["job_id"]
+    assert jobs.cancel(job_id)["status"] == "cancelled"
+    assert jobs.get(job_id)["status"] == "cancelled"
+    assert ran == []
+    assert jobs.cancel("no-existe") is None
+
+
+def test_cancel_running_job_stops_at_next_report():
+    started, resume = threading.Event(), threading.Event()
+    stages = []
+
+    def handler(payload, report):
+        report("nlu")
+        stages.append("nlu")
+        started.set()
+        resume.wait(5)
+        report("coder")       # aquí se detiene el trabajo cancelado
+        stages.append("coder")
+
+    jobs = JobQueue(handler, workers=1)
+    job_id = jobs.submit({}, "req")["job_id"]
+    assert started.wait(5)
+    job = jobs.cancel(job_id)
+    assert job["status"] == "running" and job["cancel_requested"]
+    resume.set()
+    assert _wait_finished(jobs, job_id)["status"] == "cancelled"
+    assert stages == ["nlu"]
+
+
+def test_cancelled_queued_job_frees_its_slot():
+    jobs = JobQueue(lambda payload, report: None, workers=0, max_queued=1)
+    jobs.cancel(jobs.submit({}, "req")["job_id"])
+    jobs.submit({}, "req")
+    with pytest.raises(QueueFullError):
+        jobs.submit({}, "req")
+
+
+def test_worker_skips_cancelled_entries():
+    ran = []
+    release = threading.Event()
+
+    def handler(payload, report):
+        release.wait(5)
+        ran.append(payload["n"])
+
+    jobs = JobQueue(handler, workers=1, max_queued=3)
+    first = jobs.submit({"n": 1}, "req")["job_id"]
+    second = jobs.submit({"n": 2}, "req")["job_id"]
+    third = jobs.submit({"n": 3}, "req")["job_id"]
+    jobs.cancel(second)
+    release.set()
+    assert _wait_finished(jobs, first)["status"] == "succeeded"
+    assert _wait_finished(jobs, third)["status"] == "succeeded"
+    assert ran == [1, 3]
+
+
+# --- 3. Caducidad ---
+def test_finished_jobs_expire_after_ttl():
+    jobs = JobQueue(lambda payload, report: "ok", workers=1, ttl_seconds=0)
+    job_id = jobs.submit({}, "req")["job_id"]
+    # `wait` no purga: sirve para ver terminar el trabajo antes de comprobar la caducidad.
+    job = jobs.wait(job_id, 5)
+    while job["status"] != "succeeded":
+        job = jobs.wait(job_id, 5, known_version=job["version"])
+    jobs._jobs[job_id]["finished_at"] -= 1   # ya pasó el TTL
+    assert jobs.get(job_id) is None
+
+
+def test_unfinished_jobs_do_not_expire():
+    jobs = JobQueue(lambda payload, report: None, workers=0, ttl_seconds=0)
+    job_id = jobs.submit({}, "req")["job_id"]
+    assert jobs.get(job_id)["status"] == "queued"
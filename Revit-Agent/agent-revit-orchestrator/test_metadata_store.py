@@ -0,0 +1,41 @@
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from shared_libs.vectordb.metadata_store import MetadataStore, write_metadata
+
+
+# --- 1. Ida y vuelta ---
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "metadata.bin")
+    records = [
+        {"text": "Wall.Create", "class": "Wall"},
+        {"text": "Floor.Create"},
+        {},
+        {"text": "Línea de cota con tildes ✓", "class": "Dimension"},
+    ]
+    assert write_metadata(path, records, ["text", "class"]) == 4
+    store = MetadataStore(path)
+    try:
+        assert len(store) == 4
+        assert store.fields == ["text", "class"]
+        assert [store.get(i) for i in range(4)] == records
+        assert store.field(3, "text") == "Línea de cota con tildes ✓"
+        assert store.field(1, "class", "n/a") == "n/a"
+        assert store.get(4) is None
+        assert store.field(-1, "text") is None
+    finally:
+        store.close()
+
+
+def test_records_without_fields(tmp_path):
+    path = str(tmp_path / "metadata.bin")
+    assert write_metadata(path, iter([{}, {}, {}]), []) == 3
+    store = MetadataStore(path)
+    try:
+        assert len(store) == 3
+        assert store.get(2) == {}
+    finally:
+        store.close()
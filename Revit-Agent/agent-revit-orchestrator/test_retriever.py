@@ -0,0 +1,117 @@
+import os
+import sys
+import time
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from shared_libs.vectordb.retriever import Retriever, normalize_query
+from shared_libs.vectordb.index_service import VectorIndexService
+
+LIVE = [[{"id": 1, "text": "Wall.Create"}]]
+PRECOMPUTED = [{"id": 2, "text": "Wall"}]
+
+
+def _retriever() -> Retriever:
+    retriever = Retriever()
+    retriever.intent_results = {"CreateWall": PRECOMPUTED}
+    return retriever
+
+
+def _resolve_later(result, delay: float) -> Future:
+    future = Future()
+    threading.Timer(delay, future.set_result, args=(result,)).start()
+    return future
+
+
+# --- 1. Espera del resultado (sin índice) ---
+def test_live_search_wins_within_budget():
+    # La búsqueda termina después de la NLU pero dentro del presupuesto: no se usa el precalculado.
+    started = time.perf_counter()
+    future = _resolve_later(LIVE, 0.02)
+    assert _retriever().collect(future, 1, started, budget_ms=500, intents=["CreateWall"]) == LIVE
+
+
+def test_precomputed_on_timeout():
+    started = time.perf_counter()
+    assert _retriever().collect(Future(), 1, started, budget_ms=20, intents=["CreateWall"]) == [PRECOMPUTED]
+
+
+def test_precomputed_on_error_or_without_search():
+    failed = Future()
+    failed.set_exception(RuntimeError("faiss"))
+    retriever = _retriever()
+    started = time.perf_counter()
+    assert retriever.collect(failed, 1, started, intents=["CreateWall"]) == [PRECOMPUTED]
+    assert retriever.collect(None, 1, started, intents=["CreateWall"]) == [PRECOMPUTED]
+
+
+def test_empty_without_precomputed_intent():
+    started = time.perf_counter()
+    retriever = _retriever()
+    assert retriever.collect(Future(), 2, started, budget_ms=10, intents=["CreateWall", "CreateFloor"]) == [[], []]
+    assert retriever.collect(None, 1, started) == [[]]
+
+
+def test_deadline_shortens_the_wait():
+    started = time.perf_counter()
+    retriever = _retriever()
+    assert retriever.collect(Future(), 1, started, budget_ms=5000, deadline=time.time() - 1,
+                             intents=["CreateWall"]) == [PRECOMPUTED]
+    assert time.perf_counter() - started < 1
+
+
+# --- 2. Búsqueda sobre una colección real (numpy + faiss) ---
+@pytest.fixture
+def retriever(vector_db):
+    retriever = Retriever(VectorIndexService(vector_db), "api_signatures")
+    retriever.warm_up(precompute={"CreateWall": "Wall Create", "CreateRoom": "Room area"})
+    assert retriever.ready
+    return retriever
+
+
+def test_normalize_query():
+    assert normalize_query("  ¿Crea   un MURO? ") == "crea un muro"
+
+
+def test_retrieve_and_filters(retriever):
+    hits = retriever.retrieve("wall width", k=3, budget_ms=5000)
+    assert len(hits) == 3
+    assert hits[0]["class"] == "Wall"
+    assert {"id", "text", "class", "kind", "member"} <= set(hits[0])
+    only_rooms = retriever.retrieve("wall width", k=2, filters={"class": "Room"}, budget_ms=5000)
+    assert only_rooms and all(hit["class"] == "Room" for hit in only_rooms)
+
+
+def test_caches_skip_encoding_and_search(retriever, hashing_encoder):
+    first = retriever.retrieve("Floor type", budget_ms=5000)
+    calls = len(hashing_encoder.calls)
+    # Misma consulta normalizada: embedding y resultados de la caché, future ya resuelto.
+    future = retriever.submit(["  floor TYPE. "])
+    assert future.done()
+    assert future.result() == [first]
+    assert len(hashing_encoder.calls) == calls
+    assert retriever.cache_stats()["results"]["hits"] >= 1
+
+
+def test_batch_encodes_each_query_once(retriever, hashing_encoder):
+    hashing_encoder.calls.clear()
+    results = retriever.retrieve_batch(["room number", "Room number!", "level elevation"], budget_ms=5000)
+    assert hashing_encoder.calls == [["room number", "level elevation"]]
+    assert results[0] == results[1]
+
+
+def test_precomputed_intents(retriever):
+    assert set(retriever.intent_results) == {"CreateWall", "CreateRoom"}
+    assert retriever.intent_results["CreateRoom"][0]["class"] == "Room"
+
+
+def test_missing_collection_disables_rag(vector_db):
+    retriever = Retriever(VectorIndexService(vector_db), "no_existe")
+    retriever.warm_up()
+    assert not retriever.available
+    assert retriever.retrieve("wall") == []
@@ -0,0 +1,99 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'Revit-Agent', 'agent-revit-coder'))
+
+from scheduler import PriorityScheduler, UnknownPriorityError
+
+
+async def _serve_order(scheduler: PriorityScheduler, arrivals: list) -> list:
+    """
+    Ocupa el único slot, encola `arrivals` = [(nombre, prioridad, espera previa en s)] y lo
+    libera: devuelve los nombres en el orden en que obtuvieron el slot.
+    """
+    order = []
+    release = asyncio.Event()
+
+    async def request(name, priority):
+        async with scheduler.slot(priority):
+            order.append(name)
+
+    async def holder():
+        async with scheduler.slot("interactive"):
+            await release.wait()
+
+    tasks = [asyncio.create_task(holder())]
+    await asyncio.sleep(0)
+    for name, priority, delay in arrivals:
+        await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(request(name, priority)))
+        await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_interactive_goes_before_recent_bulk():
+    scheduler = PriorityScheduler(slots=1, aging_seconds=30.0)
+    order = asyncio.run(_serve_order(scheduler, [("bulk", "bulk", 0), ("interactive", "interactive", 0)]))
+    assert order == ["interactive", "bulk"]
+
+
+def test_aged_bulk_overtakes_new_interactive():
+    scheduler = PriorityScheduler(slots=1, aging_seconds=0.05)
+    order = asyncio.run(_serve_order(scheduler, [("bulk", "bulk", 0), ("interactive", "interactive", 0.1)]))
+    assert order == ["bulk", "interactive"]
+
+
+def test_bulk_never_exceeds_its_slots():
+    scheduler = PriorityScheduler(slots=2, max_bulk_running=1)
+    peak = 0
+
+    async def bulk():
+        nonlocal peak
+        async with scheduler.slot("bulk"):
+            peak = max(peak, scheduler.stats()["running"]["bulk"])
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(bulk() for _ in range(3)))
+
+    asyncio.run(main())
+    assert peak == 1
+    assert scheduler.stats() == {"running": {"interactive": 0, "bulk": 0}, "queued": {"interactive": 0, "bulk": 0}}
+
+
+def test_cancelled_waiter_does_not_take_released_slot():
+    scheduler = PriorityScheduler(slots=1)
+
+    async def waiter():
+        async with scheduler.slot("interactive"):
+            pass
+
+    async def main():
+        holder = scheduler.slot("interactive")
+        await holder.__aenter__()
+        task = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        # Cancelación y liberación en el mismo ciclo del bucle: la tarea aún no ha retirado su future.
+        task.cancel()
+        await holder.__aexit__(None, None, None)
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert scheduler.stats() == {"running": {"interactive": 0, "bulk": 0}, "queued": {"interactive": 0, "bulk": 0}}
+        # El slot sigue disponible para las siguientes peticiones.
+        await asyncio.wait_for(waiter(), timeout=1)
+
+    asyncio.run(main())
+
+
+def test_validate_priority():
+    assert PriorityScheduler.validate(None) == "interactive"
+    assert PriorityScheduler.validate(" Bulk ") == "bulk"
+    with pytest.raises(UnknownPriorityError):
+        PriorityScheduler.validate("urgent")
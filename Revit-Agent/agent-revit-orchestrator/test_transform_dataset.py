@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+import transform_dataset
+from shared_libs.vectordb.index_service import VectorIndexService
+
+PROMPTS = [
+    "Create a wall on Level 1 with a width of 200mm.",
+    "Crea un suelo en el nivel 2.",
+    "Create a wall on Level 1 with a width of 200mm.",
+    "Place a family instance at point (1, 2).",
+    "Cuál es el área de la habitación 101?",
+]
+
+
+@pytest.fixture
+def rag(vector_db, monkeypatch):
+    """transform_dataset con el servicio de índices de la prueba, cargado con `load_rag`."""
+    monkeypatch.setattr(transform_dataset, "INDEX_SERVICE", VectorIndexService(vector_db))
+    monkeypatch.setattr(transform_dataset, "RAG_ENABLED", False)
+    transform_dataset.load_rag()
+    assert transform_dataset.RAG_ENABLED
+    return transform_dataset
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    in_file = data_dir / "train_data.jsonl"
+    with open(in_file, "w", encoding="utf-8") as f:
+        for i, prompt in enumerate(PROMPTS):
+            f.write(json.dumps({"prompt": prompt, "completion": f"// código {i}"}, ensure_ascii=False) + "\n")
+        f.write("línea mal formada\n")
+    out_file = str(data_dir / "train_data_rag_format_v2.jsonl")
+    monkeypatch.setattr(transform_dataset, "IN_FILE", str(in_file))
+    monkeypatch.setattr(transform_dataset, "OUT_FILE", out_file)
+    monkeypatch.setattr(transform_dataset, "CHECKPOINT_PATH", out_file + ".checkpoint.json")
+    return out_file
+
+
+def _read(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+# --- 1. Contexto de API por lotes ---
+def test_batch_matches_single_queries_and_encodes_once(rag, hashing_encoder):
+    hashing_encoder.calls.clear()
+    batch = rag.find_relevant_api_context_batch(PROMPTS, k=2)
+    # Una sola codificación, sin repetidos y ordenada por longitud.
+    assert hashing_encoder.calls == [sorted(set(PROMPTS), key=len)]
+    assert batch == [rag.find_relevant_api_context(prompt, k=2) for prompt in PROMPTS]
+    assert batch[0] == batch[2]
+    assert all(len(context) == 2 for context in batch)
+    assert any("Class: Wall." in text for text in batch[0])
+
+
+def test_without_rag_contexts_are_empty(monkeypatch):
+    monkeypatch.setattr(transform_dataset, "RAG_ENABLED", False)
+    assert transform_dataset.find_relevant_api_context_batch(PROMPTS[:2]) == [[], []]
+
+
+# --- 2. Transformación y reanudación ---
+def test_transform_writes_every_record(rag, dataset):
+    rag.transform(restart=True)
+    rows = _read(dataset)
+    assert [row["USER_REQUEST"] for row in rows] == PROMPTS
+    assert [row["EXPECTED_COMPLETION"] for row in rows] == [f"// código {i}" for i in range(len(PROMPTS))]
+    assert all(len(row["RELEVANT_API_CONTEXT"]) == 3 for row in rows)
+    assert not os.path.exists(rag.CHECKPOINT_PATH)
+
+
+def test_transform_resumes_from_checkpoint(rag, dataset):
+    rag.transform(restart=True)
+    with open(dataset, "rb") as f:
+        expected = f.read()
+    # Ejecución interrumpida: checkpoint tras dos registros y un bloque a medio escribir detrás.
+    kept = b"".join(expected.splitlines(keepends=True)[:2])
+    with open(dataset, "wb") as f:
+        f.write(kept + b'{"USER_REQUEST": "a medi')
+    rag.save_checkpoint(rag.input_signature(rag.IN_FILE), 2, len(kept))
+    rag.transform()
+    with open(dataset, "rb") as f:
+        assert f.read() == expected
@@ -0,0 +1,83 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+# --- CONFIGURACIÓN ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from shared_libs.nlu.intent_classifier import classify_intents
+from shared_libs.nlu.slot_filler import extract_slots_batch
+from shared_libs.nlu.utterance import Utterance
+
+BLOCK_SIZE = 5000
+
+
+# --- 1. Lectura por Bloques ---
+def read_blocks(fin, text_field: str, block_size: int):
+    """Genera bloques de (objeto, texto) sin cargar el archivo entero en memoria."""
+    block = []
+    for line_no, line in enumerate(fin, 1):
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError:
+            print(f"Advertencia: Se omitió la línea {line_no} mal formada.", file=sys.stderr)
+            continue
+        block.append((obj, (obj.get(text_field) or "").strip()))
+        if len(block) >= block_size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+# --- 2. Anotación ---
+def annotate(fin, fout, text_field: str, intent_field: str, slots_field: str, workers: int, block_size: int) -> int:
+    count = 0
+    for block in read_blocks(fin, text_field, block_size):
+        utterances = [Utterance(text) for _, text in block]
+        # Sólo los patrones: las conjeturas del respaldo por embeddings no son anotaciones.
+        intents = classify_intents(utterances, workers=workers, fallback=False)
+        slots_list = extract_slots_batch(utterances, intents, workers=workers)
+        for (obj, _), intent, slots in zip(block, intents, slots_list):
+            obj[intent_field] = intent
+            obj[slots_field] = slots
+            fout.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        count += len(block)
+        print(f"  Anotadas {count} líneas...", file=sys.stderr)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Anota un JSONL con la intención y los slots de la NLU.")
+    parser.add_argument("input", help="JSONL de entrada ('-' para stdin).")
+    parser.add_argument("output", help="JSONL de salida ('-' para stdout).")
+    parser.add_argument("--text-field", default="prompt", help="Campo con el texto del usuario.")
+    parser.add_argument("--intent-field", default="intent")
+    parser.add_argument("--slots-field", default="slots")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos de NLU (0 = uno por CPU).")
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE, help="Líneas procesadas por bloque.")
+    args = parser.parse_args()
+
+    fin = sys.stdin if args.input == "-" else open(args.input, 'r', encoding='utf-8')
+    fout = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+    start = time.perf_counter()
+    try:
+        count = annotate(fin, fout, args.text_field, args.intent_field, args.slots_field,
+                         args.workers, args.block_size)
+    finally:
+        if fin is not sys.stdin:
+            fin.close()
+        if fout is not sys.stdout:
+            fout.close()
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ {count} líneas anotadas en {elapsed:.1f} s ({count / max(elapsed, 1e-9):.0f} líneas/s).", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import numpy as np
+import faiss
+from sentence_transformers import SentenceTransformer
+
+# --- CONFIGURACIÓN ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from shared_libs.vectordb.ann_index import make_config, build_index, apply_search_params, factory_string
+from shared_libs.utils.build_vector_db import API_CATALOG_PATH, MODEL_NAME, load_api_documents
+
+TRAIN_DATA = os.path.join(REPO_ROOT, "Revit-Agent", "agent-revit-orchestrator", "data", "train_data.jsonl")
+RAG_CORPUS = os.path.join(REPO_ROOT, "Revit-Agent", "agent-revit-coder", "rag_database", "rag_corpus.jsonl")
+N_QUERIES = 500
+K = 10
+SEED = 1234
+
+# Configuraciones candidatas; los parámetros de búsqueda (ef_search, nprobe) se barren sin reconstruir.
+CANDIDATES = [
+    ({"type": "hnsw", "hnsw_m": 16}, "ef_search", (16, 32, 64, 128)),
+    ({"type": "hnsw", "hnsw_m": 32}, "ef_search", (16, 32, 64, 128)),
+    ({"type": "ivfsq8"}, "nprobe", (4, 8, 16, 32)),
+    ({"type": "ivfpq"}, "nprobe", (4, 8, 16, 32)),
+]
+
+
+# --- 1. Colecciones y Consultas ---
+def load_rag_corpus(path: str = RAG_CORPUS) -> list:
+    """Título + texto de cada fragmento de rag_corpus.jsonl (lo que se vectoriza del corpus)."""
+    documents = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            text = f"{record.get('title', '')}. {record.get('text', '')}".strip(". ")
+            if text:
+                documents.append(text)
+    return documents
+
+
+def load_queries(path: str, n: int) -> list:
+    """Muestra reproducible de prompts del dataset: las consultas reales que recibe el RAG."""
+    prompts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                prompt = (json.loads(line).get("prompt") or "").strip()
+            except json.JSONDecodeError:
+                continue
+            if prompt:
+                prompts.append(prompt)
+    prompts = sorted(set(prompts))
+    return random.Random(SEED).sample(prompts, min(n, len(prompts)))
+
+
+# --- 2. Medición ---
+def index_size(index) -> int:
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def search_timed(index, queries, k: int):
+    """Una búsqueda por consulta (como en producción); devuelve (ids, µs por consulta)."""
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    start = time.perf_counter()
+    for i in range(len(queries)):
+        _, found = index.search(queries[i:i + 1], k)
+        ids[i] = found[0]
+    return ids, (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def recall_at_k(found, truth) -> float:
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def benchmark_collection(name: str, vectors, queries, k: int) -> list:
+    print(f"\n=== {name}: {len(vectors)} vectores, {len(queries)} consultas, recall@{k} ===")
+    rows = []
+
+    start = time.perf_counter()
+    flat = build_index(vectors, make_config(type="flat"))
+    flat_build = time.perf_counter() - start
+    truth, flat_us = search_timed(flat, queries, k)
+    rows.append({"collection": name, "config": make_config(type="flat"), "factory": "Flat",
+                 "build_s": flat_build, "bytes": index_size(flat), "us_per_query": flat_us, "recall": 1.0})
+
+    for base, param, values in CANDIDATES:
+        config = make_config(**base)
+        try:
+            factory = factory_string(config, vectors.shape[1], len(vectors))
+            start = time.perf_counter()
+            index = build_index(vectors, config)
+            build_s = time.perf_counter() - start
+        except (ValueError, RuntimeError) as e:
+            print(f"  {config['type']}: omitido ({e})")
+            continue
+        size = index_size(index)
+        for value in values:
+            config = make_config(**base, **{param: value})
+            apply_search_params(index, config)
+            found, us = search_timed(index, queries, k)
+            rows.append({"collection": name, "config": config, "factory": factory, "build_s": build_s,
+                         "bytes": size, "us_per_query": us, "recall": recall_at_k(found, truth)})
+
+    print(f"  {'factory':<18} {'búsqueda':<14} {'recall':>7} {'µs/cons.':>9} {'x flat':>7} {'MB':>7} {'build s':>8}")
+    for row in rows:
+        config = row["config"]
+        knob = {"hnsw": f"efSearch={config['ef_search']}", "flat": "-"}.get(config["type"], f"nprobe={config['nprobe']}")
+        print(f"  {row['factory']:<18} {knob:<14} {row['recall']:>7.3f} {row['us_per_query']:>9.1f} "
+              f"{flat_us / row['us_per_query']:>6.2f}x {row['bytes'] / 1e6:>7.2f} {row['build_s']:>8.2f}")
+    return rows
+
+
+def recommend(rows: list, min_recall: float):
+    """La configuración más rápida que llega al recall mínimo (flat si ninguna llega)."""
+    eligible = [row for row in rows if row["recall"] >= min_recall]
+    return min(eligible, key=lambda row: row["us_per_query"])
+
+
+# --- 3. Ejecución ---
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k y latencia de los índices ANN frente al índice flat.")
+    parser.add_argument("--queries", type=int, default=N_QUERIES)
+    parser.add_argument("--k", type=int, default=K)
+    parser.add_argument("--min-recall", type=float, default=0.95, help="Recall mínimo para recomendar una configuración.")
+    parser.add_argument("--json", help="Guarda todas las mediciones en este archivo.")
+    args = parser.parse_args()
+
+    # Latencia por consulta sin el paralelismo de OpenMP, como en el servicio (una petición cada vez).
+    faiss.omp_set_num_threads(1)
+
+    print(f"INFO: Cargando el modelo '{MODEL_NAME}'...")
+    model = SentenceTransformer(MODEL_NAME, device="cpu")
+    queries = load_queries(TRAIN_DATA, args.queries)
+    query_vectors = np.asarray(model.encode(queries, batch_size=64), dtype=np.float32)
+
+    collections = {}
+    if os.path.exists(API_CATALOG_PATH):
+        collections["api"] = load_api_documents(API_CATALOG_PATH)
+    else:
+        print(f"ADVERTENCIA: No se encontró {API_CATALOG_PATH}; se omite la colección 'api'.")
+    collections["rag_corpus"] = load_rag_corpus(RAG_CORPUS)
+
+    results = []
+    for name, documents in collections.items():
+        print(f"INFO: Codificando {len(documents)} documentos de '{name}'...")
+        vectors = np.asarray(model.encode(documents, batch_size=128, show_progress_bar=True), dtype=np.float32)
+        rows = benchmark_collection(name, vectors, query_vectors, args.k)
+        best = recommend(rows, args.min_recall)
+        print(f"  -> Recomendada (recall >= {args.min_recall}): {best['factory']} "
+              f"({best['recall']:.3f}, {best['us_per_query']:.1f} µs/consulta)")
+        results.extend(rows)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nINFO: Mediciones guardadas en '{args.json}'.")
+
+
+if __name__ == "__main__":
+    main()
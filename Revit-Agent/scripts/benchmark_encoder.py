@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import random
+import argparse
+import numpy as np
+
+# --- CONFIGURACIÓN ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, SCRIPT_DIR)
+
+from shared_libs.vectordb.encoder import MODEL_NAME, SentenceTransformerEncoder, OnnxEncoder, ONNX_MODEL_DIR, onnx_model_dir_for
+from benchmark_ann import TRAIN_DATA, RAG_CORPUS, SEED, load_rag_corpus, load_queries
+
+N_QUERIES = 500
+N_DOCUMENTS = 2000
+K = 10
+# Umbrales de paridad del modelo int8 frente al de PyTorch (coseno entre los dos embeddings del mismo texto).
+MIN_MEAN_COSINE = 0.99
+MIN_COSINE = 0.97
+
+
+# --- 1. Paridad ---
+def parity(reference, candidate, queries: list, documents: list, k: int) -> bool:
+    """
+    Coseno por texto entre ambos encoders y solapamiento de los k vecinos de cada consulta
+    sobre una muestra del corpus (lo que de verdad cambia para el RAG).
+    """
+    ok = True
+    encoded = {}
+    for name, texts in (("consultas", queries), ("documentos", documents)):
+        ref = reference.encode(texts, batch_size=64)
+        cand = candidate.encode(texts, batch_size=64)
+        cosines = (ref * cand).sum(axis=1) / (np.linalg.norm(ref, axis=1) * np.linalg.norm(cand, axis=1))
+        passed = cosines.mean() >= MIN_MEAN_COSINE and cosines.min() >= MIN_COSINE
+        ok &= bool(passed)
+        print(f"  {name:<10} {len(texts):>5} textos: coseno medio {cosines.mean():.4f}, p1 {np.percentile(cosines, 1):.4f}, "
+              f"mínimo {cosines.min():.4f} -> {'OK' if passed else 'FALLA'}")
+        encoded[name] = (ref, cand)
+
+    (ref_q, cand_q), (ref_d, cand_d) = encoded["consultas"], encoded["documentos"]
+    truth = np.argsort(-ref_q @ ref_d.T, axis=1)[:, :k]
+    found = np.argsort(-cand_q @ cand_d.T, axis=1)[:, :k]
+    overlap = np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)])
+    top1 = np.mean(truth[:, 0] == found[:, 0])
+    print(f"  vecinos@{k} coincidentes con PyTorch: {overlap:.3f} (primer vecino igual en {top1:.3f} de las consultas)")
+    return ok
+
+
+# --- 2. Latencia ---
+def latency(encoder, queries: list, batch_size: int):
+    """Una consulta cada vez (el caso del orquestador) y un lote (el de la indexación)."""
+    for text in queries[:10]:
+        encoder.encode([text])   # calentamiento
+    times = []
+    for text in queries:
+        start = time.perf_counter()
+        encoder.encode([text])
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    n = len(times)
+    start = time.perf_counter()
+    encoder.encode(queries, batch_size=batch_size)
+    throughput = len(queries) / (time.perf_counter() - start)
+    print(f"  {encoder.backend:<6} por consulta: p50 {times[n // 2]:.2f} ms, p99 {times[min(n - 1, int(n * 0.99))]:.2f} ms; "
+          f"lotes de {batch_size}: {throughput:.0f} textos/s")
+
+
+# --- 3. Ejecución ---
+def main():
+    parser = argparse.ArgumentParser(description="Paridad (coseno) y latencia del encoder ONNX int8 frente a SentenceTransformer.")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--onnx-dir", help="Modelo exportado con export_onnx_encoder.py.")
+    parser.add_argument("--queries", type=int, default=N_QUERIES)
+    parser.add_argument("--documents", type=int, default=N_DOCUMENTS)
+    parser.add_argument("--k", type=int, default=K)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=1, help="Hilos de PyTorch y ONNX Runtime (1 = un núcleo por consulta).")
+    args = parser.parse_args()
+
+    import torch
+    torch.set_num_threads(args.threads)
+    onnx_dir = args.onnx_dir or (ONNX_MODEL_DIR if os.getenv("RAG_ONNX_MODEL_DIR") else onnx_model_dir_for(args.model))
+    print(f"INFO: Cargando '{args.model}' (PyTorch) y '{onnx_dir}' (ONNX int8)...")
+    reference = SentenceTransformerEncoder(args.model)
+    candidate = OnnxEncoder(onnx_dir, threads=args.threads)
+
+    queries = load_queries(TRAIN_DATA, args.queries)
+    documents = load_rag_corpus(RAG_CORPUS)
+    documents = random.Random(SEED).sample(documents, min(args.documents, len(documents)))
+
+    print(f"\n=== Paridad ({len(queries)} consultas, {len(documents)} documentos de rag_corpus) ===")
+    ok = parity(reference, candidate, queries, documents, args.k)
+    print(f"\n=== Latencia en CPU ({args.threads} hilo(s)) ===")
+    latency(reference, queries, args.batch_size)
+    latency(candidate, queries, args.batch_size)
+
+    if not ok:
+        print(f"\nERROR: El modelo ONNX no alcanza la paridad (coseno medio >= {MIN_MEAN_COSINE}, mínimo >= {MIN_COSINE}).")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
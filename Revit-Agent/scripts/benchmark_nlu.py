@@ -0,0 +1,228 @@
+import os
+import re
+import sys
+import json
+import time
+
+# --- CONFIGURACIÓN ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, SCRIPT_DIR)
+
+from shared_libs.nlu.intent_classifier import INTENTS, classify_intent
+from shared_libs.nlu.slot_filler import ALL_SLOTS_PATTERNS, INTENT_SLOTS_MAPPING, extract_slots
+from shared_libs.nlu.matchers import IntentMatcher
+from shared_libs.nlu.keyword_engine import KeywordIntentEngine
+from shared_libs.nlu.utterance import Utterance
+from shared_libs.nlu.artifact import build_partitions, build_slot_matchers
+from build_nlu_patterns import build_intent_patterns
+
+TRAIN_DATA = os.path.join(REPO_ROOT, "Revit-Agent", "agent-revit-orchestrator", "data", "train_data.jsonl")
+REPEATS = 3
+MIN_PARTITION_AGREEMENT = 0.995
+
+
+# --- 1. Implementación de Referencia ---
+def classify_intent_reference(text: str, intents: dict) -> str:
+    """Bucle original: todas las intenciones y patrones en orden, con la caché de `re`."""
+    text = text.lower()
+    for intent, block in intents.items():
+        for pat in block["patterns"]:
+            if re.search(pat, text, re.IGNORECASE):
+                return intent
+    return "Unknown"
+
+
+def extract_slots_reference(text: str, intent: str) -> dict:
+    """Extracción original: un re.findall sin compilar por cada slot de la intención."""
+    extracted_slots = {}
+    for slot_name in INTENT_SLOTS_MAPPING.get(intent, []):
+        pattern = ALL_SLOTS_PATTERNS.get(slot_name)
+        if not pattern:
+            continue
+        processed_matches = []
+        for match in re.findall(pattern, text, re.IGNORECASE):
+            if isinstance(match, tuple):
+                non_empty_groups = [group for group in match if group]
+                if non_empty_groups:
+                    processed_matches.append(non_empty_groups[0])
+            else:
+                processed_matches.append(match)
+        if processed_matches:
+            extracted_slots[slot_name] = processed_matches
+    return extracted_slots
+
+
+def load_prompts(path: str) -> list:
+    prompts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                prompt = (json.loads(line).get("prompt") or "").strip()
+            except json.JSONDecodeError:
+                continue
+            if prompt:
+                prompts.append(prompt)
+    return prompts
+
+
+def best_time(fn, prompts: list) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for p in prompts:
+            fn(p)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# --- 2. Benchmark de Intenciones ---
+def benchmark_intents(name: str, intents: dict, prompts: list):
+    n_patterns = sum(len(b["patterns"]) for b in intents.values())
+    print(f"\n--- Intenciones: {name} ({len(intents)} intenciones, {n_patterns} patrones) ---")
+
+    start = time.perf_counter()
+    matcher = IntentMatcher(intents)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Compilación del matcher: {build_ms:.1f} ms ({len(matcher.unanchored)} patrones sin ancla)")
+
+    mismatches = [p for p in prompts if matcher.classify(p) != classify_intent_reference(p, intents)]
+    if mismatches:
+        print(f"❌ {len(mismatches)} decisiones distintas. Ejemplo: '{mismatches[0]}'")
+    else:
+        print(f"✅ Mismas decisiones en los {len(prompts)} prompts.")
+
+    ref_s = best_time(lambda p: classify_intent_reference(p, intents), prompts)
+    new_s = best_time(matcher.classify, prompts)
+    for label, secs in (("Referencia", ref_s), ("Compilado", new_s)):
+        print(f"{label:<11}: {secs * 1e6 / len(prompts):8.1f} µs/llamada  {len(prompts) / secs:10.0f} llamadas/s")
+    print(f"Aceleración: x{ref_s / new_s:.1f}")
+    return not mismatches
+
+
+def benchmark_keyword_engine(prompts: list):
+    """El motor de palabras clave debe decidir igual que las regex generadas por build_nlu_patterns.py."""
+    generated = build_intent_patterns()
+    print(f"\n--- Motor de palabras clave vs regex generadas ({len(generated)} intenciones) ---")
+    engine = KeywordIntentEngine()
+    matcher = IntentMatcher(generated)
+
+    mismatches = [p for p in prompts if engine.classify(p) != matcher.classify(p)]
+    if mismatches:
+        print(f"❌ {len(mismatches)} decisiones distintas. Ejemplo: '{mismatches[0]}'")
+    else:
+        print(f"✅ Mismas decisiones en los {len(prompts)} prompts.")
+
+    ref_s = best_time(lambda p: classify_intent_reference(p, generated), prompts)
+    regex_s = best_time(matcher.classify, prompts)
+    kw_s = best_time(engine.classify, prompts)
+    for label, secs in (("Referencia", ref_s), ("Compilado", regex_s), ("Keywords", kw_s)):
+        print(f"{label:<11}: {secs * 1e6 / len(prompts):8.1f} µs/llamada  {len(prompts) / secs:10.0f} llamadas/s")
+    return not mismatches
+
+
+# --- 3. Benchmark de Slots ---
+def benchmark_slots(prompts: list):
+    print(f"\n--- Slots: extractores compilados con prefiltro vs findall por slot ---")
+    intents = [i for i, slots in INTENT_SLOTS_MAPPING.items() if slots]
+    # La paridad se comprueba con los extractores combinados, como la referencia, aunque el
+    # runtime use los conjuntos por idioma (NLU_LANGUAGE_PARTITIONS=1): ésos se miden en la sección 4.
+    combined = build_slot_matchers(ALL_SLOTS_PATTERNS)
+
+    def extract_combined(text: str, intent: str) -> dict:
+        matcher = combined.get(intent)
+        return matcher.extract(text) if matcher else {}
+
+    # Paridad: cada prompt contra TODAS las intenciones, no sólo la clasificada.
+    mismatches = [
+        (p, i) for p in prompts for i in intents
+        if extract_combined(p, i) != extract_slots_reference(p, i)
+    ]
+    if mismatches:
+        p, i = mismatches[0]
+        print(f"❌ {len(mismatches)} extracciones distintas. Ejemplo: [{i}] '{p}'")
+    else:
+        print(f"✅ Misma salida en {len(prompts) * len(intents)} pares (prompt, intención).")
+
+    # Rendimiento con la intención real de cada prompt, como en producción: el Utterance
+    # llega ya tokenizado por el clasificador (se crea de nuevo en cada repetición).
+    pairs = [(p, classify_intent(p, fallback=False)) for p in prompts]
+    ref_s = best_time(lambda pair: extract_slots_reference(*pair), pairs)
+    new_s = float("inf")
+    for _ in range(REPEATS):
+        shared = [(Utterance(p), intent) for p, intent in pairs]
+        for utterance, _ in shared:
+            classify_intent(utterance, fallback=False)
+        start = time.perf_counter()
+        for utterance, intent in shared:
+            extract_slots(utterance, intent)
+        new_s = min(new_s, time.perf_counter() - start)
+    for label, secs in (("Referencia", ref_s), ("Compilado", new_s)):
+        print(f"{label:<11}: {secs * 1e6 / len(pairs):8.1f} µs/llamada  {len(pairs) / secs:10.0f} llamadas/s")
+    print(f"Aceleración: x{ref_s / new_s:.1f}")
+    return not mismatches
+
+
+# --- 4. Conjuntos por Idioma ---
+def _run_nlu(intent_matcher, slot_matchers: dict, utterance):
+    intent = intent_matcher.classify(utterance)
+    matcher = slot_matchers.get(intent)
+    return intent, (matcher.extract(utterance) if matcher else {})
+
+
+def benchmark_language_partitions(prompts: list):
+    """
+    Patrones por idioma frente al conjunto combinado. El léxico se aprende con la mitad de los
+    prompts y la concordancia se mide en la otra mitad (los textos dudosos usan el combinado).
+    """
+    print(f"\n--- Conjuntos por idioma (ES / EN) vs combinado ---")
+    train, held_out = prompts[::2], prompts[1::2]
+    combined = (IntentMatcher(INTENTS), build_slot_matchers(ALL_SLOTS_PATTERNS))
+    partitions = {
+        language: (p["intent_matcher"], p["slot_matchers"])
+        for language, p in build_partitions(INTENTS, ALL_SLOTS_PATTERNS, train).items()
+    }
+
+    def partitioned(utterance):
+        return _run_nlu(*partitions.get(utterance.language, combined), utterance)
+
+    utterances = [Utterance(p) for p in held_out]
+    routed = {}
+    mismatches = []
+    for utterance in utterances:
+        routed[utterance.language] = routed.get(utterance.language, 0) + 1
+        if partitioned(utterance) != _run_nlu(*combined, utterance):
+            mismatches.append(utterance.text)
+    print("Reparto: " + ", ".join(f"{lang}={n}" for lang, n in sorted(routed.items())))
+    agreement = 1 - len(mismatches) / len(utterances)
+    print(f"Concordancia (intención + slots) en {len(utterances)} prompts no vistos: {agreement:.2%}")
+    for text in mismatches[:3]:
+        print(f"   Distinto: '{text}'")
+
+    # Rendimiento de extremo a extremo con Utterances nuevos: el partido incluye la detección.
+    timings = {}
+    for label, fn in (("Combinado", lambda u: _run_nlu(*combined, u)), ("Por idioma", partitioned)):
+        best = float("inf")
+        for _ in range(REPEATS):
+            fresh = [Utterance(p) for p in held_out]
+            start = time.perf_counter()
+            for utterance in fresh:
+                fn(utterance)
+            best = min(best, time.perf_counter() - start)
+        timings[label] = best
+        print(f"{label:<11}: {best * 1e6 / len(held_out):8.1f} µs/instrucción  {len(held_out) / best:10.0f} instrucciones/s")
+    print(f"Aceleración: x{timings['Combinado'] / timings['Por idioma']:.2f}")
+    return agreement >= MIN_PARTITION_AGREEMENT
+
+
+if __name__ == "__main__":
+    prompts = load_prompts(TRAIN_DATA)
+    print(f"INFO: {len(prompts)} prompts cargados de '{TRAIN_DATA}'.")
+
+    ok = benchmark_intents("patterns.yml", INTENTS, prompts)
+    ok &= benchmark_intents("generadas por build_nlu_patterns.py", build_intent_patterns(), prompts)
+    ok &= benchmark_keyword_engine(prompts)
+    ok &= benchmark_slots(prompts)
+    ok &= benchmark_language_partitions(prompts)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import numpy as np
+import faiss
+from sentence_transformers import SentenceTransformer
+
+# --- CONFIGURACIÓN ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, SCRIPT_DIR)
+
+from shared_libs.vectordb.ann_index import make_config, build_index, factory_string, search, ExactVectors, prepare_vectors
+from shared_libs.utils.build_vector_db import API_CATALOG_PATH, MODEL_NAME, load_api_documents
+from benchmark_ann import TRAIN_DATA, RAG_CORPUS, load_rag_corpus, load_queries, index_size, recall_at_k
+
+N_QUERIES = 500
+K = 10
+
+# Candidatos frente al IndexFlatL2 actual (vectores float32 sin normalizar).
+CANDIDATES = [
+    {"type": "flat", "metric": "cosine", "storage": "fp32"},
+    {"type": "flat", "metric": "cosine", "storage": "fp16"},
+    {"type": "flat", "metric": "cosine", "storage": "sq8"},
+    {"type": "flat", "metric": "cosine", "storage": "sq8", "rescore": 2},
+    {"type": "flat", "metric": "cosine", "storage": "sq8", "rescore": 4},
+    {"type": "hnsw", "metric": "cosine", "storage": "fp16"},
+    {"type": "hnsw", "metric": "cosine", "storage": "sq8"},
+    {"type": "hnsw", "metric": "cosine", "storage": "sq8", "rescore": 4},
+]
+
+
+# --- 1. Medición ---
+def timed_search(index, config, queries, k, exact=None):
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    start = time.perf_counter()
+    for i in range(len(queries)):
+        _, found = search(index, config, queries[i:i + 1], k, exact)
+        ids[i] = found[0]
+    return ids, (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def benchmark_collection(name: str, vectors, queries, k: int, workdir: str) -> list:
+    print(f"\n=== {name}: {len(vectors)} vectores de {vectors.shape[1]} dimensiones, recall@{k} frente a IndexFlatL2 ===")
+    norms = np.linalg.norm(vectors, axis=1)
+    print(f"  Norma de los vectores: min {norms.min():.4f}, max {norms.max():.4f} "
+          f"(si es ~1, L2 y coseno ordenan igual y la pérdida es sólo de la cuantización).")
+
+    baseline_config = make_config(type="flat")
+    baseline = build_index(vectors, baseline_config)
+    truth, baseline_us = timed_search(baseline, baseline_config, queries, k)
+    baseline_bytes = index_size(baseline)
+    rows = [{"collection": name, "config": baseline_config, "factory": "Flat (L2)", "bytes": baseline_bytes,
+             "disk_bytes": 0, "us_per_query": baseline_us, "recall": 1.0}]
+
+    for overrides in CANDIDATES:
+        config = make_config(**overrides)
+        index = build_index(vectors, config)
+        exact, disk_bytes = None, 0
+        if config["rescore"]:
+            # Los vectores exactos van a disco mapeados en memoria: no cuentan como memoria residente fija.
+            path = os.path.join(workdir, f"{name}.f32")
+            prepare_vectors(vectors, config).tofile(path)
+            exact, disk_bytes = ExactVectors(path, vectors.shape[1]), os.path.getsize(path)
+        found, us = timed_search(index, config, queries, k, exact)
+        rows.append({"collection": name, "config": config,
+                     "factory": factory_string(config, vectors.shape[1], len(vectors)), "bytes": index_size(index),
+                     "disk_bytes": disk_bytes, "us_per_query": us, "recall": recall_at_k(found, truth)})
+
+    print(f"  {'índice':<16} {'rescore':>7} {'recall':>7} {'MB RAM':>8} {'x menos':>8} {'MB disco':>9} {'µs/cons.':>9}")
+    for row in rows:
+        print(f"  {row['factory']:<16} {row['config']['rescore'] or '-':>7} {row['recall']:>7.3f} "
+              f"{row['bytes'] / 1e6:>8.2f} {baseline_bytes / row['bytes']:>7.1f}x "
+              f"{row['disk_bytes'] / 1e6:>9.2f} {row['us_per_query']:>9.1f}")
+    return rows
+
+
+# --- 2. Ejecución ---
+def main():
+    parser = argparse.ArgumentParser(description="Memoria y recall de los índices coseno fp16/sq8 (con y sin re-puntuación) frente a IndexFlatL2.")
+    parser.add_argument("--queries", type=int, default=N_QUERIES)
+    parser.add_argument("--k", type=int, default=K)
+    parser.add_argument("--json", help="Guarda todas las mediciones en este archivo.")
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(1)
+    print(f"INFO: Cargando el modelo '{MODEL_NAME}'...")
+    model = SentenceTransformer(MODEL_NAME, device="cpu")
+    queries = np.asarray(model.encode(load_queries(TRAIN_DATA, args.queries), batch_size=64), dtype=np.float32)
+
+    collections = {"rag_corpus": load_rag_corpus(RAG_CORPUS)}
+    if os.path.exists(API_CATALOG_PATH):
+        collections["api"] = load_api_documents(API_CATALOG_PATH)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, documents in collections.items():
+            print(f"INFO: Codificando {len(documents)} documentos de '{name}'...")
+            vectors = np.asarray(model.encode(documents, batch_size=128, show_progress_bar=True), dtype=np.float32)
+            results.extend(benchmark_collection(name, vectors, queries, args.k, workdir))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nINFO: Mediciones guardadas en '{args.json}'.")
+
+
+if __name__ == "__main__":
+    main()
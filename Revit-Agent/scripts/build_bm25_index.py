@@ -0,0 +1,93 @@
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+# --- CONFIGURACIÓN ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from shared_libs.vectordb.bm25 import BM25Index
+from shared_libs.vectordb.index_service import COLLECTIONS, collection_paths, record_text
+
+K = 5
+N_QUERIES = 300
+SEED = 1234
+
+# Títulos de la referencia: "NewFamilyInstance Method (XYZ, ...)", "BuiltInCategory Enumeration"...
+_TITLE_IDENTIFIER_RE = re.compile(r'^([A-Za-z_][A-Za-z0-9_]*) (?:Method|Properties|Property|Class|Enumeration|Constructor|Event|Structure|Interface|Member|Field)s?\b')
+
+
+# --- 1. Colecciones ---
+def build_collection(name: str, documents: list, path: str) -> BM25Index:
+    """Sólo el índice BM25 de una colección (lo mismo que escribe build_vector_db.py, sin tocar los embeddings)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    start = time.perf_counter()
+    index = BM25Index.build(documents)
+    index.save(path)
+    print(f"INFO: '{name}': {len(documents)} documentos, {len(index.vocabulary)} términos, "
+          f"{len(index.doc_ids)} entradas en {time.perf_counter() - start:.2f} s "
+          f"-> {path} ({os.path.getsize(path) / 1e6:.2f} MB)")
+    return index
+
+
+# --- 2. Evaluación con Identificadores ---
+def identifier_queries(titles: list, n: int) -> list:
+    """
+    (identificador, IDs relevantes): los identificadores compuestos de los títulos de rag_corpus
+    (`NewFamilyInstance`, `OST_...`), que son los que la búsqueda densa suele fallar.
+    Relevantes = documentos cuyo título empieza por ese identificador.
+    """
+    relevant = {}
+    for doc_id, title in enumerate(titles):
+        match = _TITLE_IDENTIFIER_RE.match(title)
+        if match and (len(re.findall(r'[A-Z][a-z]+', match[1])) >= 2 or "_" in match[1]):
+            relevant.setdefault(match[1], set()).add(doc_id)
+    identifiers = sorted(relevant)
+    sample = random.Random(SEED).sample(identifiers, min(n, len(identifiers)))
+    return [(identifier, relevant[identifier]) for identifier in sample]
+
+
+def evaluate(index: BM25Index, queries: list, k: int):
+    precision, hit_at_1, latencies = 0.0, 0, []
+    for query, relevant in queries:
+        start = time.perf_counter()
+        hits = index.search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids = [doc_id for doc_id, _ in hits]
+        precision += sum(doc_id in relevant for doc_id in ids) / min(k, len(relevant))
+        hit_at_1 += bool(ids) and ids[0] in relevant
+    latencies.sort()
+    n = len(queries)
+    print(f"  {n} consultas de identificador: precisión@{k} {precision / n:.3f}, acierto@1 {hit_at_1 / n:.3f}, "
+          f"p50 {latencies[n // 2]:.2f} ms, p99 {latencies[min(n - 1, int(n * 0.99))]:.2f} ms")
+
+
+# --- 3. Ejecución ---
+def main():
+    parser = argparse.ArgumentParser(description="Construye los índices BM25 (búsqueda por identificadores) de las colecciones del RAG.")
+    parser.add_argument("--collection", choices=list(COLLECTIONS) + ["all"], default="all")
+    parser.add_argument("--evaluate", action="store_true", help="Mide precisión@k con identificadores de los títulos de rag_corpus.")
+    parser.add_argument("--k", type=int, default=K)
+    args = parser.parse_args()
+
+    names = list(COLLECTIONS) if args.collection == "all" else [args.collection]
+    for name in names:
+        spec = COLLECTIONS[name]
+        try:
+            records = spec["loader"](spec["source"])
+        except FileNotFoundError:
+            print(f"ADVERTENCIA: No se encontró {spec['source']}; se omite la colección '{name}'.")
+            continue
+        path = collection_paths(name)["bm25"]
+        build_collection(name, [record_text(record, spec["sparse"]) for record in records], path)
+        if name == "rag_corpus" and args.evaluate:
+            titles = [record["title"] for record in records]
+            evaluate(BM25Index.load(path), identifier_queries(titles, N_QUERIES), args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+# --- CONFIGURACIÓN ---
+# Ejecutar después de build_nlu_artifact.py: las etiquetas salen de los patrones vigentes.
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from shared_libs.nlu.intent_classifier import classify_intents
+from shared_libs.nlu.artifact import RUNTIME
+from shared_libs.nlu.embedding_fallback import (
+    CENTROIDS_PATH, EMBEDDING_MODEL, MIN_SCORE, MIN_MARGIN, IntentCentroids, save_centroids
+)
+
+TRAIN_DATA = os.path.join(REPO_ROOT, "Revit-Agent", "agent-revit-orchestrator", "data", "train_data.jsonl")
+# Intenciones con menos ejemplos no tienen un centroide fiable y no se incluyen.
+MIN_EXAMPLES = 5
+
+
+def load_prompts(path: str) -> list:
+    prompts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                prompt = (json.loads(line).get("prompt") or "").strip()
+            except json.JSONDecodeError:
+                continue
+            if prompt:
+                prompts.append(prompt)
+    return prompts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera la matriz de centroides de intención para el respaldo por embeddings.")
+    parser.add_argument("--data", default=TRAIN_DATA, help="JSONL con los prompts de entrenamiento.")
+    parser.add_argument("--output", default=CENTROIDS_PATH, help="Ruta de la matriz (.npy); los metadatos van en un .json al lado.")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    args = parser.parse_args()
+
+    prompts = load_prompts(args.data)
+    # Las etiquetas son las decisiones de las regex (sin el respaldo, que es lo que se construye).
+    intents = classify_intents(prompts, fallback=False)
+    by_intent = {}
+    for prompt, intent in zip(prompts, intents):
+        if intent != "Unknown":
+            by_intent.setdefault(intent, []).append(prompt)
+    unknown = [p for p, i in zip(prompts, intents) if i == "Unknown"]
+    labels = sorted(i for i, examples in by_intent.items() if len(examples) >= MIN_EXAMPLES)
+    print(f"INFO: {len(prompts)} prompts, {len(prompts) - len(unknown)} etiquetados por las regex, "
+          f"{len(labels)} intenciones con al menos {MIN_EXAMPLES} ejemplos.")
+
+    print(f"INFO: Cargando el modelo '{args.model}'...")
+    model = SentenceTransformer(args.model, device="cpu")
+    start = time.perf_counter()
+    centroids = []
+    for intent in labels:
+        vectors = model.encode(by_intent[intent], batch_size=64, normalize_embeddings=True, convert_to_numpy=True)
+        centroid = vectors.mean(axis=0)
+        centroids.append(centroid / np.linalg.norm(centroid))
+    matrix = np.vstack(centroids).astype(np.float32)
+    print(f"INFO: Centroides calculados en {time.perf_counter() - start:.1f} s ({matrix.shape[0]} x {matrix.shape[1]}).")
+
+    save_centroids(matrix, labels, {
+        "model": args.model,
+        "built_at": time.time(),
+        "nlu_version": RUNTIME.state.version,
+        "examples": {intent: len(by_intent[intent]) for intent in labels},
+    }, args.output)
+    print(f"✅ Centroides guardados en '{args.output}'.")
+
+    # Comprobación: con los umbrales actuales, cuántos prompts etiquetados recupera el respaldo
+    # con la misma intención que las regex, y cuántos 'Unknown' dejaría de serlo.
+    loaded = IntentCentroids.load(args.output)
+    labeled = [(p, intent) for intent in labels for p in by_intent[intent]]
+    vectors = model.encode([p for p, _ in labeled], batch_size=64, normalize_embeddings=True, convert_to_numpy=True)
+    start = time.perf_counter()
+    decisions = loaded.best(vectors)
+    per_call_us = (time.perf_counter() - start) * 1e6 / max(len(labeled), 1)
+    agree = sum(d == i for (d, _), (_, i) in zip(decisions, labeled))
+    print(f"Coincidencia con las regex (umbral {MIN_SCORE}, margen {MIN_MARGIN}): {agree}/{len(labeled)} "
+          f"({agree / max(len(labeled), 1):.1%}); puntuación: {per_call_us:.1f} µs/texto.")
+    if unknown:
+        rescued = sum(d != "Unknown" for d, _ in loaded.best(
+            model.encode(unknown, batch_size=64, normalize_embeddings=True, convert_to_numpy=True)))
+        print(f"Prompts 'Unknown' para las regex que el respaldo clasifica: {rescued}/{len(unknown)}.")
+
+
+if __name__ == "__main__":
+    main()
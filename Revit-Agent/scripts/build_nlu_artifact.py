@@ -0,0 +1,80 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+# --- CONFIGURACIÓN ---
+# Ejecutar después de build_nlu_patterns.py (o de cualquier edición de patterns.yml).
+# Los orquestadores en marcha detectan el artefacto nuevo y lo cargan sin reiniciar.
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from shared_libs.nlu.artifact import (
+    PATTERNS_PATH, ARTIFACT_PATH, LANGUAGE_PARTITIONS, ArtifactError,
+    build_artifact, save_artifact, load_artifact, state_from_patterns
+)
+
+# Instrucciones de las que se aprende qué palabras de los patrones son de cada idioma.
+CORPUS_PATH = os.path.join(REPO_ROOT, "Revit-Agent", "agent-revit-orchestrator", "data", "train_data.jsonl")
+
+
+def load_corpus(path: str) -> list:
+    """Prompts de un JSONL; sin corpus el artefacto no lleva conjuntos por idioma."""
+    if not path or not os.path.exists(path):
+        print(f"ADVERTENCIA: No se encontró el corpus '{path}'; se genera sin conjuntos por idioma.")
+        return []
+    prompts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                prompt = (json.loads(line).get("prompt") or "").strip()
+            except json.JSONDecodeError:
+                continue
+            if prompt:
+                prompts.append(prompt)
+    return prompts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Valida patterns.yml y genera el artefacto precompilado de la NLU.")
+    parser.add_argument("--patterns", default=PATTERNS_PATH, help="Archivo de patrones de entrada.")
+    parser.add_argument("--output", default=ARTIFACT_PATH, help="Ruta del artefacto.")
+    parser.add_argument("--corpus", default=CORPUS_PATH,
+                        help="JSONL con prompts para los conjuntos por idioma ('' para no generarlos).")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    print(f"INFO: Validando y compilando '{args.patterns}'...")
+    start = time.perf_counter()
+    try:
+        artifact = build_artifact(args.patterns, corpus=corpus)
+    except ArtifactError as e:
+        print(f"❌ patterns.yml tiene errores; no se publica el artefacto:\n{e}")
+        sys.exit(1)
+    save_artifact(artifact, args.output)
+    build_s = time.perf_counter() - start
+    print(f"✅ Artefacto versión {artifact['version']} guardado en '{args.output}' ({build_s * 1000:.0f} ms).")
+    for language, partition in artifact["partitions"].items():
+        print(f"   Conjunto '{language}': {partition['pruned_alternatives']} alternativas de otro idioma podadas.")
+    if artifact["partitions"] and not LANGUAGE_PARTITIONS:
+        print("   (Los conjuntos por idioma sólo se usan con NLU_LANGUAGE_PARTITIONS=1.)")
+
+    # Comprobación de arranque en frío: cargar el artefacto frente a compilar desde el YAML
+    # (vaciando la caché de `re` para que ninguno de los dos se beneficie del otro).
+    re.purge()
+    start = time.perf_counter()
+    state = load_artifact(args.output)
+    load_ms = (time.perf_counter() - start) * 1000
+    re.purge()
+    start = time.perf_counter()
+    state_from_patterns(args.patterns)
+    yaml_ms = (time.perf_counter() - start) * 1000
+    print(f"Carga del artefacto: {load_ms:.0f} ms | Compilación desde patterns.yml: {yaml_ms:.0f} ms "
+          f"({len(state.intents)} intenciones, {len(state.slots)} slots).")
+
+
+if __name__ == "__main__":
+    main()
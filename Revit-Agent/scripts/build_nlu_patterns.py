@@ -5,55 +5,18 @@ import yaml
 # --- Configuración de Rutas Relativas al Script ---
 # Esto hace que el script funcione sin importar desde dónde lo llames
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-REPO_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..'))
+REPO_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
 SHARED_LIBS_PATH = os.path.join(REPO_ROOT, 'shared_libs')
 PATTERNS_FILE_PATH = os.path.join(SHARED_LIBS_PATH, 'nlu', 'patterns.yml')
 
 # Añadimos la raíz del proyecto al path para que pueda encontrar el paquete "shared_libs"
 sys.path.insert(0, REPO_ROOT)
 
-from shared_libs.nlu.language_assets import SYNONYMS
+from shared_libs.nlu.language_assets import SYNONYMS, ACTION_MAP, ENTITY_KEYWORDS
 
 def build_intent_patterns():
-    # ... (EL RESTO DE LA FUNCIÓN SE QUEDA EXACTAMENTE IGUAL) ...
-    # ... (No he pegado el resto para no ser repetitivo, copia y pega el tuyo) ...
-    # Mapeo de verbos principales (claves de SYNONYMS) a un nombre de Intención base
-    ACTION_MAP = {
-        "crear": "Create", "genera": "Create", "dibuja": "Create", "construir": "Create",
-        "inserta": "Insert", "coloca": "Insert", "añade": "Insert",
-        "duplica": "Duplicate", "copia": "Duplicate", "clona": "Duplicate",
-        "cambia": "Change", "modifica": "Change", "ajusta": "Change",
-        "setea": "Set", "configura": "Set", "asigna": "Set", "define": "Set",
-        "obtén": "Query", "extrae": "Query", "recupera": "Query", "lista": "Query", "encuentra": "Query",
-        "borra": "Delete", "elimina": "Delete",
-        "rota": "Rotate", "gira": "Rotate",
-        "fija": "Pin", "bloquea": "Pin",
-        "une": "Join",
-        "exporta": "Export",
-        "oculta": "Hide",
-        "muestra": "Show",
-        "tag": "Tag",
-        # Añadir más mapeos base si es necesario...
-    }
-
-    # Palabras clave de objetos que definen la especificidad de la intención
-    # Esto es crucial para diferenciar CreateWall de CreateFloor
-    ENTITY_KEYWORDS = {
-        'Wall': r'\b(muro|pared|wall)s?\b',
-        'FamilyInstance': r'\b(instancia|familia|mobiliario|mueble|puerta|ventana|columna|pilar|viga|truss|celosía)s?\b',
-        'Level': r'\b(nivel|planta|level)es\b',
-        'Grid': r'\b(eje|rejilla|grid)s?\b',
-        'Floor': r'\b(suelo|piso|losa|placa|floor|slab)s?\b',
-        'Schedule': r'\b(tabla|planificación|schedule|cómputo)s?\b',
-        'Workset': r'\b(workset|subproyecto)s?\b',
-        'Opening': r'\b(agujero|hueco|apertura|opening|shaft)s?\b',
-        'Dimension': r'\b(cota|dimensión|dimension)es\b',
-        'Parameter': r'\b(parámetro|propiedad|comentario|marca|valor|parameter|property|comment|mark|value)s?\b',
-        'Type': r'\b(tipo|type)s?\b',
-        'Geometry': r'\b(geometr(í|i)a)s?\b',
-        'View': r'\b(vista|view)s?\b',
-    }
-
+    # ACTION_MAP y ENTITY_KEYWORDS viven en language_assets para que el motor de
+    # palabras clave (nlu/keyword_engine.py) use exactamente el mismo vocabulario.
     intents = {}
 
     # Generar intenciones específicas (ej. CreateWall, DeleteFloor)
@@ -95,6 +58,7 @@ def update_patterns_file(new_intents):
         yaml.dump(data, f, allow_unicode=True, sort_keys=False, indent=2)
 
     print(f"✅ Archivo '{PATTERNS_FILE_PATH}' actualizado con {len(new_intents)} intenciones generadas.")
+    print("INFO: Ejecuta scripts/build_nlu_artifact.py para validar y publicar los patrones en los orquestadores.")
 
 if __name__ == "__main__":
     generated_intents = build_intent_patterns()
@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import inspect
+import argparse
+
+import torch
+from transformers import AutoModel, AutoTokenizer
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from sentence_transformers import SentenceTransformer, models as st_models
+
+# --- CONFIGURACIÓN ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from shared_libs.vectordb.encoder import MODEL_NAME, ONNX_MODEL_FILE, ONNX_META_FILE, onnx_model_dir_for
+
+OPSET = 14
+# torch >= 2.9 exporta por defecto con dynamo (requiere onnxscript y no usa dynamic_axes):
+# se pide el exportador TorchScript cuando existe la opción.
+EXPORT_OPTIONS = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+
+
+# --- 1. Exportación ---
+def uses_mean_pooling(pooling) -> bool:
+    """Sólo media: 'pooling_mode' desde sentence-transformers 6, 'pooling_mode_*_tokens' antes."""
+    config = pooling.get_config_dict()
+    if "pooling_mode" in config:
+        mode = config["pooling_mode"]
+        return [mode] == ["mean"] if isinstance(mode, str) else list(mode) == ["mean"]
+    modes = {key for key, value in config.items() if key.startswith("pooling_mode_") and value}
+    return modes == {"pooling_mode_mean_tokens"}
+
+
+class HiddenStates(torch.nn.Module):
+    """El transformer con las entradas por nombre y sólo last_hidden_state como salida (transformers 4 y 5)."""
+    def __init__(self, model, input_names: list):
+        super().__init__()
+        self.model = model
+        self.input_names = input_names
+
+    def forward(self, *inputs):
+        return self.model(**dict(zip(self.input_names, inputs)))[0]
+
+
+def export(model_name: str, output_dir: str):
+    """
+    Exporta el transformer del SentenceTransformer a ONNX (ejes de lote y secuencia dinámicos),
+    cuantiza los pesos a int8 (cuantización dinámica: las activaciones se cuantizan al vuelo, no
+    hace falta calibrar) y guarda el tokenizador y los parámetros de pooling que usa OnnxEncoder.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    pooling = next(m for m in st_model if isinstance(m, st_models.Pooling))
+    if not uses_mean_pooling(pooling):
+        raise ValueError(f"'{model_name}' no usa pooling por media; OnnxEncoder sólo implementa ese.")
+    normalize = any(isinstance(m, st_models.Normalize) for m in st_model)
+    # get_embedding_dimension desde sentence-transformers 6.
+    dimension = getattr(st_model, "get_embedding_dimension", None) or st_model.get_sentence_embedding_dimension
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    dummy = tokenizer(["Crea un muro de 3 metros en el nivel 1"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+
+    fp32_path = os.path.join(output_dir, "model_fp32.onnx")
+    int8_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(HiddenStates(model, input_names), tuple(dummy[name] for name in input_names), fp32_path,
+                          input_names=input_names, output_names=["last_hidden_state"],
+                          dynamic_axes=dynamic_axes, opset_version=OPSET, do_constant_folding=True, **EXPORT_OPTIONS)
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8, per_channel=True)
+    tokenizer.save_pretrained(output_dir)
+
+    meta = {
+        "model": model_name,
+        "dimension": dimension(),
+        "max_length": st_model.max_seq_length,
+        "pad_id": tokenizer.pad_token_id,
+        "pad_token": tokenizer.pad_token,
+        "pooling": "mean",
+        "normalize": normalize,
+        "opset": OPSET,
+        "quantization": "dynamic-int8",
+    }
+    with open(os.path.join(output_dir, ONNX_META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"INFO: '{model_name}' exportado a '{output_dir}': fp32 {os.path.getsize(fp32_path) / 1e6:.1f} MB, "
+          f"int8 {os.path.getsize(int8_path) / 1e6:.1f} MB (max_length {meta['max_length']}, normalize {normalize}).")
+    print("INFO: Compruebe la paridad con scripts/benchmark_encoder.py antes de usar RAG_ENCODER_BACKEND=onnx.")
+
+
+# --- 2. Ejecución ---
+def main():
+    parser = argparse.ArgumentParser(description="Exporta MiniLM a ONNX con pesos int8 para el encoder de consultas en CPU.")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--output", help="Directorio de salida (por defecto, shared_libs/vectordb/models/<modelo>-onnx-int8).")
+    args = parser.parse_args()
+    export(args.model, args.output or onnx_model_dir_for(args.model))
+
+
+if __name__ == "__main__":
+    main()
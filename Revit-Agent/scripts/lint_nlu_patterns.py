@@ -0,0 +1,128 @@
+import os
+import re
+import sys
+import math
+import time
+import argparse
+
+# --- CONFIGURACIÓN ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, SCRIPT_DIR)
+
+# Entradas de prueba: prefijo + una "bomba" repetida hasta la longitud deseada. Las bombas
+# cubren los cuantificadores problemáticos típicos: comillas sin cerrar, rutas sin extensión,
+# números sin unidad, espacios y palabras clave densas.
+GENERIC_PUMPS = ["x ", "a", " ", "1", "1.", "1 ", "'a", "\"a ", "a\\", "c:\\a ", "-1,", "( 1, "]
+SHORT_FRACTION = 4   # se mide a MAX_INPUT_CHARS y a MAX_INPUT_CHARS / SHORT_FRACTION
+SUPERLINEAR_SLOPE = 1.5
+REPEATS = 3
+
+
+# --- 1. Generación de Entradas ---
+def pattern_words(pattern: str) -> list:
+    """Palabras literales del patrón (las de sus alternativas), en orden y sin repetir."""
+    words = []
+    for word in re.findall(r'(?<!\\)[^\W\d_]{2,}', pattern):
+        if word.lower() not in words:
+            words.append(word.lower())
+    return words
+
+
+def worst_case_inputs(pattern: str, length: int) -> dict:
+    """{descripción: texto} con entradas de longitud `length` dirigidas a este patrón."""
+    words = pattern_words(pattern)[:3]
+    prefixes = [""] + [w + " " for w in words[:1]]
+    pumps = list(GENERIC_PUMPS)
+    if words:
+        pumps.append(" ".join(words) + " ")
+        pumps.append(words[0] + " x ")
+    inputs = {}
+    for prefix in prefixes:
+        for pump in pumps:
+            repeats = max(1, (length - len(prefix)) // len(pump))
+            inputs[f"{prefix!r} + {pump!r} * n"] = (prefix + pump * repeats)[:length]
+    return inputs
+
+
+# --- 2. Medición ---
+def time_call(fn, text: str) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def lint_pattern(compiled, pattern: str, kind: str, max_chars: int) -> dict:
+    """Peor entrada para el patrón: tiempo a longitud máxima y pendiente log-log del crecimiento."""
+    # Las intenciones se evalúan con search sobre el texto en minúsculas; los slots con findall.
+    if kind == "intent":
+        fn = lambda text: compiled.search(text.lower())
+    else:
+        fn = compiled.findall
+    short_chars = max_chars // SHORT_FRACTION
+    short_inputs = worst_case_inputs(pattern, short_chars)
+
+    worst = None
+    for label, text in worst_case_inputs(pattern, max_chars).items():
+        long_ms = time_call(fn, text)
+        if worst is not None and long_ms <= worst["ms"]:
+            continue
+        short_ms = max(time_call(fn, short_inputs[label]), 1e-4)
+        slope = math.log(max(long_ms, 1e-4) / short_ms) / math.log(max_chars / short_chars)
+        worst = {"input": label, "ms": long_ms, "slope": slope}
+    return worst
+
+
+# --- 3. Informe ---
+def collect_patterns(include_generated: bool) -> list:
+    from shared_libs.nlu.intent_classifier import INTENTS
+    from shared_libs.nlu.slot_filler import ALL_SLOTS_PATTERNS
+
+    patterns = [("intent", name, pat) for name, block in INTENTS.items() for pat in block.get("patterns", [])]
+    patterns += [("slot", name, pat) for name, pat in ALL_SLOTS_PATTERNS.items()]
+    if include_generated:
+        from build_nlu_patterns import build_intent_patterns
+        patterns += [("generated", name, pat) for name, block in build_intent_patterns().items()
+                     for pat in block["patterns"]]
+    return patterns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Busca patrones de la NLU con tiempo super-lineal (ReDoS).")
+    parser.add_argument("--engine", choices=["re", "linear"], help="Motor a evaluar (por defecto, NLU_REGEX_ENGINE).")
+    parser.add_argument("--generated", action="store_true", help="Incluir las regex de build_nlu_patterns.py.")
+    parser.add_argument("--show", type=int, default=15, help="Patrones a listar, de peor a mejor.")
+    args = parser.parse_args()
+    if args.engine:
+        os.environ["NLU_REGEX_ENGINE"] = args.engine
+
+    from shared_libs.nlu.regex_engine import REGEX_ENGINE, TIME_BUDGET_MS, MAX_INPUT_CHARS, compile_pattern, engine_name
+
+    print(f"INFO: motor '{REGEX_ENGINE}', entradas de {MAX_INPUT_CHARS} caracteres, presupuesto {TIME_BUDGET_MS:.0f} ms.")
+    results = []
+    for kind, name, pattern in collect_patterns(args.generated):
+        compiled = compile_pattern(pattern, re.IGNORECASE)
+        worst = lint_pattern(compiled, pattern, kind, MAX_INPUT_CHARS)
+        results.append({"kind": kind, "name": name, "engine": engine_name(compiled), **worst})
+
+    results.sort(key=lambda r: r["ms"], reverse=True)
+    print(f"\n{'tipo':<10} {'patrón':<28} {'motor':<13} {'ms':>9} {'pendiente':>9}  peor entrada")
+    for r in results[:args.show]:
+        print(f"{r['kind']:<10} {r['name'][:28]:<28} {r['engine']:<13} {r['ms']:9.2f} {r['slope']:9.2f}  {r['input']}")
+
+    superlinear = [r for r in results if r["slope"] > SUPERLINEAR_SLOPE and r["ms"] > 1]
+    over_budget = [r for r in results if r["ms"] > TIME_BUDGET_MS]
+    print(f"\n{len(results)} patrones analizados. Super-lineales: {len(superlinear)}. Sobre presupuesto: {len(over_budget)}.")
+    for r in over_budget:
+        print(f"❌ {r['kind']} '{r['name']}': {r['ms']:.1f} ms > {TIME_BUDGET_MS:.0f} ms con {r['input']}")
+    if not over_budget:
+        print("✅ Ningún patrón supera el presupuesto con entradas de longitud máxima.")
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
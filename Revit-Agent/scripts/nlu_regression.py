@@ -0,0 +1,274 @@
+import os
+import re
+import sys
+import json
+import glob
+import time
+import random
+import hashlib
+import logging
+import argparse
+import platform
+
+# --- CONFIGURACIÓN ---
+# Benchmark y regresión de la NLU sobre los datasets del proyecto. Sólo CPU y sin servicios:
+# el respaldo por embeddings queda fuera (necesita el modelo) y se mide la NLU por patrones.
+#   python nlu_regression.py                    -> compara con la línea base guardada
+#   python nlu_regression.py --update-baseline  -> acepta los resultados actuales como nueva base
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, SCRIPT_DIR)
+
+from shared_libs.nlu.intent_classifier import INTENTS, classify_intent
+from shared_libs.nlu.slot_filler import ALL_SLOTS_PATTERNS, extract_slots
+from shared_libs.nlu.artifact import RUNTIME, INTENT_ENGINE
+from shared_libs.nlu.regex_engine import REGEX_ENGINE, TIME_BUDGET_MS, MAX_INPUT_CHARS
+from shared_libs.nlu.utterance import Utterance
+from create_final_datasets import get_random_value
+from lint_nlu_patterns import worst_case_inputs
+
+DATASETS = [os.path.join(REPO_ROOT, "Revit-Agent", "agent-revit-orchestrator", "data", "train_data.jsonl")]
+DATASETS += sorted(glob.glob(os.path.join(REPO_ROOT, "Revit-Agent", "agent-revit-coder", "data", "*.jsonl")))
+BASELINE_PATH = os.path.join(SCRIPT_DIR, "nlu_baseline.json")
+MAX_THROUGHPUT_REGRESSION = 0.20   # caída de llamadas/s tolerada frente a la línea base
+REPEATS = 3
+TEMPLATE_SEED = 1234               # relleno determinista de las plantillas con {variables}
+PERCENTILES = (50, 90, 99, 99.9)
+WORST_SHOWN = 5
+
+# Instrucción del usuario dentro de los formatos de entrenamiento del Coder.
+_PLACEHOLDER_RE = re.compile(r'\{(\w+)\}')
+_TEXT_FORMATS = [
+    re.compile(r'<</SYS>>\s*(.*?)\s*\[/INST\]', re.DOTALL),       # llama
+    re.compile(r'\[INST\]\s*(.*?)\s*\[/INST\]', re.DOTALL),       # mistral
+    re.compile(r'### Instruction:\s*(.*?)\s*### Response:', re.DOTALL),  # starcoder
+]
+
+
+# --- 1. Carga de Datasets ---
+def prompt_from_record(obj: dict):
+    if obj.get("prompt"):
+        return obj["prompt"]
+    if obj.get("prompt_template"):
+        # Valores de create_final_datasets.py, en orden de aparición (con la semilla fija de load_dataset).
+        return _PLACEHOLDER_RE.sub(lambda m: str(get_random_value(m.group(1))), obj["prompt_template"])
+    text = obj.get("text") or ""
+    for fmt in _TEXT_FORMATS:
+        m = fmt.search(text)
+        if m:
+            return m.group(1)
+    return None
+
+
+def load_dataset(path: str) -> list:
+    random.seed(TEMPLATE_SEED)
+    prompts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            prompt = prompt_from_record(obj) if isinstance(obj, dict) else None
+            if prompt and prompt.strip():
+                prompts.append(prompt.strip())
+    return prompts
+
+
+def dataset_name(path: str) -> str:
+    return os.path.relpath(path, os.path.join(REPO_ROOT, "Revit-Agent")).replace(os.sep, "/")
+
+
+# --- 2. Medición ---
+def measure(fn, items: list, repeats: int = REPEATS) -> dict:
+    """
+    Latencia por llamada (la mejor de `repeats` para cada elemento) y rendimiento (la mejor
+    pasada completa). `fn` recibe el índice del elemento, para que cada pasada use objetos nuevos.
+    """
+    best_per_item = [float("inf")] * len(items)
+    best_total = float("inf")
+    clock = time.perf_counter
+    for _ in range(repeats):
+        total = 0.0
+        for i in range(len(items)):
+            start = clock()
+            fn(i)
+            elapsed = clock() - start
+            total += elapsed
+            if elapsed < best_per_item[i]:
+                best_per_item[i] = elapsed
+        best_total = min(best_total, total)
+    ordered = sorted(best_per_item)
+    stats = {f"p{p:g}_us": ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1e6 for p in PERCENTILES}
+    stats["max_us"] = ordered[-1] * 1e6
+    stats["calls_per_s"] = len(items) / best_total if best_total else float("inf")
+    stats["slowest"] = sorted(range(len(items)), key=best_per_item.__getitem__, reverse=True)[:WORST_SHOWN]
+    return stats
+
+
+def benchmark_dataset(prompts: list, repeats: int) -> dict:
+    """Decisiones de la NLU y latencias de classify_intent y extract_slots (como en el orquestador)."""
+    intents = [classify_intent(p, fallback=False) for p in prompts]
+    slots = [extract_slots(p, i) for p, i in zip(prompts, intents)]
+
+    intent_stats = measure(lambda i: classify_intent(prompts[i], fallback=False), prompts, repeats)
+    # extract_slots recibe el Utterance que ya usó el clasificador; se prepara fuera del cronómetro.
+    shared = {}
+
+    def run_slots(i):
+        extract_slots(shared[i], intents[i])
+
+    slot_stats = None
+    for _ in range(repeats):
+        for i, p in enumerate(prompts):
+            shared[i] = Utterance(p)
+            classify_intent(shared[i], fallback=False)
+        stats = measure(run_slots, prompts, repeats=1)
+        if slot_stats is None or stats["calls_per_s"] > slot_stats["calls_per_s"]:
+            slot_stats = stats
+    return {"intents": intents, "slots": slots, "classify_intent": intent_stats, "extract_slots": slot_stats}
+
+
+def worst_case_report(limit_ms: float = TIME_BUDGET_MS) -> list:
+    """Entradas adversarias de longitud máxima (las del linter) contra la NLU completa."""
+    patterns = [p for block in INTENTS.values() for p in block.get("patterns", [])] + list(ALL_SLOTS_PATTERNS.values())
+    inputs = {}
+    for pattern in patterns:
+        inputs.update(worst_case_inputs(pattern, MAX_INPUT_CHARS))
+    # Los cortes por presupuesto son el comportamiento esperado aquí: no se registran uno a uno.
+    logging.getLogger("NLU").setLevel(logging.ERROR)
+    results = []
+    for label, text in inputs.items():
+        start = time.perf_counter()
+        utterance = Utterance(text)
+        intent = classify_intent(utterance, fallback=False)
+        extract_slots(utterance, intent)
+        results.append(((time.perf_counter() - start) * 1000, label))
+    results.sort(reverse=True)
+    print(f"\n--- Peores casos: {len(inputs)} entradas adversarias de {MAX_INPUT_CHARS} caracteres ---")
+    for ms, label in results[:WORST_SHOWN]:
+        mark = "❌" if ms > 2 * limit_ms else "  "
+        print(f"{mark} {ms:8.2f} ms  {label}")
+    return results
+
+
+# --- 3. Línea Base ---
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+def slots_key(slots: dict) -> str:
+    return hashlib.sha1(json.dumps(slots, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:8]
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "regex_engine": REGEX_ENGINE,
+        "intent_engine": INTENT_ENGINE,
+        "nlu_version": RUNTIME.state.version,
+    }
+
+
+def print_stats(name: str, stats: dict):
+    pct = "  ".join(f"p{p:g}={stats[f'p{p:g}_us']:.0f}" for p in PERCENTILES)
+    print(f"  {name:<16} {stats['calls_per_s']:9.0f} llamadas/s  {pct}  max={stats['max_us']:.0f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark y regresión de la NLU sobre los datasets del proyecto (sólo CPU).")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Guardar los resultados actuales como línea base.")
+    parser.add_argument("--max-regression", type=float, default=MAX_THROUGHPUT_REGRESSION,
+                        help="Caída de rendimiento tolerada (0.2 = 20%%) antes de fallar.")
+    parser.add_argument("--min-agreement", type=float, default=0.0,
+                        help="Concordancia mínima de intención y slots con la base (por defecto sólo se informa).")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--skip-worst-case", action="store_true")
+    args = parser.parse_args()
+
+    env = environment()
+    print(f"INFO: NLU versión {env['nlu_version']}, motor regex '{env['regex_engine']}', "
+          f"intenciones '{env['intent_engine']}', {env['cpus']} CPU.")
+
+    decisions = {}
+    throughput = {"classify_intent": [0, 0.0], "extract_slots": [0, 0.0]}   # [llamadas, segundos]
+    per_dataset = {}
+    for path in DATASETS:
+        prompts = load_dataset(path)
+        if not prompts:
+            continue
+        name = dataset_name(path)
+        result = benchmark_dataset(prompts, args.repeats)
+        print(f"\n--- {name}: {len(prompts)} prompts ---")
+        for stage in ("classify_intent", "extract_slots"):
+            stats = result[stage]
+            print_stats(stage, stats)
+            throughput[stage][0] += len(prompts)
+            throughput[stage][1] += len(prompts) / stats["calls_per_s"]
+        slowest = result["classify_intent"]["slowest"][0]
+        print(f"  Más lento (clasificación): '{prompts[slowest][:90]}'")
+        unknown = sum(i == "Unknown" for i in result["intents"])
+        per_dataset[name] = {"prompts": len(prompts), "unknown": unknown}
+        for p, intent, slots in zip(prompts, result["intents"], result["slots"]):
+            decisions[prompt_key(p)] = [intent, slots_key(slots)]
+
+    totals = {stage: calls / secs for stage, (calls, secs) in throughput.items()}
+    print(f"\n--- Total: {len(decisions)} prompts distintos ---")
+    for stage, calls_per_s in totals.items():
+        print(f"  {stage:<16} {calls_per_s:9.0f} llamadas/s")
+
+    worst = [] if args.skip_worst_case else worst_case_report()
+
+    current = {
+        "environment": env,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "throughput": totals,
+        "worst_case_ms": round(worst[0][0], 2) if worst else None,
+        "datasets": per_dataset,
+        "decisions": decisions,
+    }
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+        print(f"\n✅ Línea base guardada en '{args.baseline}'.")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nADVERTENCIA: No hay línea base en '{args.baseline}'. Genérela con --update-baseline.")
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    print(f"\n--- Comparación con la línea base del {baseline['created_at']} ---")
+    changed = [k for k in ("regex_engine", "intent_engine", "cpus", "machine") if baseline["environment"].get(k) != env[k]]
+    if changed:
+        print(f"ADVERTENCIA: La base se midió con otro entorno ({', '.join(changed)}); los tiempos no son comparables.")
+
+    ok = True
+    common = [k for k in decisions if k in baseline["decisions"]]
+    if common:
+        same_intent = sum(decisions[k][0] == baseline["decisions"][k][0] for k in common) / len(common)
+        same_slots = sum(decisions[k] == baseline["decisions"][k] for k in common) / len(common)
+        print(f"Concordancia en {len(common)} prompts: intención {same_intent:.2%} | intención + slots {same_slots:.2%}")
+        if min(same_intent, same_slots) < args.min_agreement:
+            print(f"❌ Concordancia por debajo de {args.min_agreement:.2%}.")
+            ok = False
+    for stage, calls_per_s in totals.items():
+        base = baseline["throughput"].get(stage)
+        if not base:
+            continue
+        change = calls_per_s / base - 1
+        regressed = change < -args.max_regression
+        ok &= not regressed
+        print(f"{'❌' if regressed else '✅'} {stage}: {calls_per_s:.0f} llamadas/s vs {base:.0f} ({change:+.1%})")
+    if worst and baseline.get("worst_case_ms"):
+        print(f"   Peor caso: {worst[0][0]:.1f} ms vs {baseline['worst_case_ms']:.1f} ms (sólo informativo: es una única medición).")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+# nlu/artifact.py
+import os
+import re
+import time
+import yaml
+import pickle
+import hashlib
+import logging
+import threading
+
+from shared_libs.utils.metrics import REGISTRY
+from shared_libs.nlu.matchers import IntentMatcher, SlotMatcher
+from shared_libs.nlu.keyword_engine import KeywordIntentEngine
+from shared_libs.nlu.slot_mapping import INTENT_SLOTS_MAPPING
+from shared_libs.nlu.language_partitions import LANGUAGES, build_lexicon, partition_patterns
+
+logger = logging.getLogger("NLU")
+
+# --- 1. Configuración ---
+NLU_DIR = os.path.dirname(os.path.abspath(__file__))
+PATTERNS_PATH = os.path.join(NLU_DIR, 'patterns.yml')
+# Artefacto generado por `scripts/build_nlu_artifact.py` (después de build_nlu_patterns.py).
+ARTIFACT_PATH = os.getenv("NLU_ARTIFACT_PATH", os.path.join(NLU_DIR, 'nlu_artifact.pkl'))
+ARTIFACT_FORMAT = 2   # se incrementa si cambia la estructura del artefacto o de los matchers
+POLL_SECONDS = float(os.getenv("NLU_ARTIFACT_POLL_SECONDS", "2"))
+
+# Motor de intenciones: 'regex' (patterns.yml) o 'keywords' (taxonomía verbo × entidad de
+# build_nlu_patterns.py resuelta con una sola pasada de palabras clave).
+INTENT_ENGINE = os.getenv("NLU_INTENT_ENGINE", "regex").lower()
+# Conjuntos de patrones por idioma (ES / EN) del artefacto; desactivados por defecto ('1' los
+# activa). Cambian un 0.04% de las decisiones y sólo compensan con NLU_REGEX_ENGINE=re (x1.05-1.20);
+# con el motor lineal, el de por defecto, la detección de idioma cuesta más de lo que ahorran (x0.84).
+LANGUAGE_PARTITIONS = os.getenv("NLU_LANGUAGE_PARTITIONS", "0") == "1"
+
+RELOADS = REGISTRY.counter("nlu_artifact_reloads_total", "Recargas del artefacto de la NLU, por resultado.")
+ARTIFACT_BUILT_AT = REGISTRY.gauge("nlu_artifact_built_at", "Fecha (epoch) de construcción del artefacto de la NLU en uso.")
+
+
+class ArtifactError(ValueError):
+    pass
+
+
+# --- 2. Patrones y Validación ---
+def load_patterns(path: str = PATTERNS_PATH):
+    """Devuelve (intenciones, slots) de patterns.yml."""
+    with open(path, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f) or {}
+    return cfg.get("intents") or {}, cfg.get("slots") or {}
+
+
+def validate_patterns(intents: dict, slots: dict, mapping: dict = INTENT_SLOTS_MAPPING):
+    """Devuelve (errores, advertencias). Con errores no se debe publicar el artefacto."""
+    errors, warnings = [], []
+    for intent, block in intents.items():
+        patterns = (block or {}).get("patterns") or []
+        if not patterns:
+            errors.append(f"La intención '{intent}' no tiene patrones.")
+        for pattern in patterns:
+            try:
+                re.compile(pattern, re.IGNORECASE)
+            except (re.error, TypeError) as e:
+                errors.append(f"Patrón inválido en la intención '{intent}': {e}")
+    for name, pattern in slots.items():
+        try:
+            re.compile(pattern, re.IGNORECASE)
+        except (re.error, TypeError) as e:
+            errors.append(f"Patrón inválido en el slot '{name}': {e}")
+    for intent, slot_names in mapping.items():
+        for name in slot_names:
+            if name not in slots:
+                warnings.append(f"El slot '{name}' de '{intent}' no tiene patrón en patterns.yml.")
+    return errors, warnings
+
+
+# --- 3. Estado de la NLU ---
+class NLUState:
+    """
+    Instantánea de todo lo que necesita la NLU. Nunca se modifica: una recarga crea otra
+    y sustituye la referencia, así que una petición en curso sigue con la que leyó al empezar.
+
+    `partitions` tiene, por idioma, los matchers compilados de los mismos patrones sin las
+    alternativas del otro idioma. Los textos de idioma dudoso ('unknown') usan los combinados.
+    """
+    def __init__(self, version: str, built_at: float, intents: dict, slots: dict,
+                 intent_matcher, slot_matchers: dict, source: str, partitions: dict = None):
+        self.version = version
+        self.built_at = built_at
+        self.intents = intents
+        self.slots = slots
+        self.intent_matcher = intent_matcher
+        self.slot_matchers = slot_matchers
+        self.source = source
+        self.partitions = partitions or {}
+
+    def intent_matcher_for(self, utterance):
+        if not self.partitions:
+            return self.intent_matcher
+        partition = self.partitions.get(utterance.language)
+        return partition["intent_matcher"] if partition else self.intent_matcher
+
+    def slot_matchers_for(self, utterance) -> dict:
+        if not self.partitions:
+            return self.slot_matchers
+        partition = self.partitions.get(utterance.language)
+        return partition["slot_matchers"] if partition else self.slot_matchers
+
+
+def build_slot_matchers(slots: dict, mapping: dict = INTENT_SLOTS_MAPPING) -> dict:
+    # Los slots del mapeo que no tienen patrón en patterns.yml se ignoran.
+    return {
+        intent: SlotMatcher([(name, slots[name]) for name in slot_names if slots.get(name)])
+        for intent, slot_names in mapping.items()
+        if slot_names
+    }
+
+
+_keyword_engine = None
+
+
+def _intent_matcher(regex_matcher):
+    # El motor de palabras clave no depende de patterns.yml: se construye una sola vez.
+    global _keyword_engine
+    if INTENT_ENGINE != "keywords":
+        return regex_matcher
+    if _keyword_engine is None:
+        _keyword_engine = KeywordIntentEngine()
+    return _keyword_engine
+
+
+def patterns_version(patterns_bytes: bytes, mapping: dict = INTENT_SLOTS_MAPPING) -> str:
+    digest = hashlib.sha256(patterns_bytes)
+    digest.update(repr(sorted(mapping.items())).encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def state_from_patterns(path: str = PATTERNS_PATH) -> NLUState:
+    """
+    Compila todo a partir de patterns.yml (arranque sin artefacto). No hay conjuntos por
+    idioma: se aprenden de un corpus al generar el artefacto.
+    """
+    try:
+        with open(path, "rb") as f:
+            version = patterns_version(f.read())
+        intents, slots = load_patterns(path)
+    except FileNotFoundError:
+        logger.error(f"El archivo de patrones no fue encontrado en {path}")
+        version, intents, slots = "sin-patrones", {}, {}
+    return NLUState(version, time.time(), intents, slots,
+                    _intent_matcher(IntentMatcher(intents)), build_slot_matchers(slots), source=path)
+
+
+def build_partitions(intents: dict, slots: dict, corpus, mapping: dict = INTENT_SLOTS_MAPPING) -> dict:
+    """
+    Matchers por idioma. Qué alternativas son de cada idioma se aprende de `corpus` (textos de
+    instrucciones, p. ej. los prompts de train_data.jsonl): ver nlu/language_partitions.py.
+    """
+    lexicon = build_lexicon(corpus)
+    partitions = {}
+    for language in LANGUAGES:
+        language_intents, language_slots, pruned = partition_patterns(intents, slots, language, lexicon)
+        partitions[language] = {
+            "intent_matcher": IntentMatcher(language_intents),
+            "slot_matchers": build_slot_matchers(language_slots, mapping),
+            "pruned_alternatives": pruned,
+        }
+    return partitions
+
+
+def _active_partitions(partitions: dict) -> dict:
+    if not LANGUAGE_PARTITIONS:
+        return {}
+    return {
+        language: {**partition, "intent_matcher": _intent_matcher(partition["intent_matcher"])}
+        for language, partition in partitions.items()
+    }
+
+
+# --- 4. Artefacto ---
+def build_artifact(path: str = PATTERNS_PATH, mapping: dict = INTENT_SLOTS_MAPPING, corpus=None) -> dict:
+    """
+    Valida patterns.yml y precalcula los matchers. Lanza ArtifactError si hay errores.
+    Con `corpus` (textos de instrucciones) se añaden también los matchers por idioma.
+    """
+    with open(path, "rb") as f:
+        patterns_bytes = f.read()
+    intents, slots = load_patterns(path)
+    errors, warnings = validate_patterns(intents, slots, mapping)
+    if errors:
+        raise ArtifactError("\n".join(errors))
+    for warning in warnings:
+        logger.warning(warning)
+    return {
+        "format": ARTIFACT_FORMAT,
+        "version": patterns_version(patterns_bytes, mapping),
+        "built_at": time.time(),
+        "intents": intents,
+        "slots": slots,
+        "intent_slots_mapping": mapping,
+        "intent_matcher": IntentMatcher(intents),
+        "slot_matchers": build_slot_matchers(slots, mapping),
+        "partitions": build_partitions(intents, slots, corpus, mapping) if corpus else {},
+    }
+
+
+def save_artifact(artifact: dict, path: str = ARTIFACT_PATH):
+    # Se escribe aparte y se renombra: quien vigila el archivo nunca ve uno a medio escribir.
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_artifact(path: str = ARTIFACT_PATH) -> NLUState:
+    """
+    Carga un artefacto propio (es un pickle: no cargar archivos de origen desconocido).
+    Las regex se recompilan con el motor de este proceso; el análisis de los patrones no.
+    """
+    with open(path, "rb") as f:
+        artifact = pickle.load(f)
+    if not isinstance(artifact, dict) or artifact.get("format") != ARTIFACT_FORMAT:
+        raise ArtifactError(f"Formato de artefacto no soportado en '{path}'. Vuelva a generarlo.")
+    if artifact["intent_slots_mapping"] != INTENT_SLOTS_MAPPING:
+        raise ArtifactError(f"'{path}' se generó con otro mapeo intención -> slots. Vuelva a generarlo.")
+    return NLUState(artifact["version"], artifact["built_at"], artifact["intents"], artifact["slots"],
+                    _intent_matcher(artifact["intent_matcher"]), artifact["slot_matchers"], source=path,
+                    partitions=_active_partitions(artifact["partitions"]))
+
+
+# --- 5. Recarga en Caliente ---
+class NLURuntime:
+    """
+    Mantiene el estado de la NLU en uso. Las peticiones sólo leen `self.state` (una lectura de
+    atributo, sin locks); el hilo vigilante carga el artefacto nuevo y sustituye la referencia.
+    """
+    def __init__(self, artifact_path: str = ARTIFACT_PATH, patterns_path: str = PATTERNS_PATH):
+        self.artifact_path = artifact_path
+        self.patterns_path = patterns_path
+        self._mtime = None
+        self._watcher = None
+        self.state = self._initial_state()
+        ARTIFACT_BUILT_AT.set(self.state.built_at)
+
+    def _initial_state(self) -> NLUState:
+        try:
+            self._mtime = os.stat(self.artifact_path).st_mtime_ns
+            state = load_artifact(self.artifact_path)
+        except FileNotFoundError:
+            return state_from_patterns(self.patterns_path)
+        except Exception as e:
+            logger.error(f"No se pudo cargar el artefacto de la NLU ({e}); se compila patterns.yml.")
+            return state_from_patterns(self.patterns_path)
+
+        if os.path.exists(self.patterns_path) and os.path.getmtime(self.patterns_path) > os.path.getmtime(self.artifact_path):
+            logger.warning(f"patterns.yml es más reciente que '{self.artifact_path}': ejecute scripts/build_nlu_artifact.py.")
+        logger.info(f"NLU cargada del artefacto versión {state.version}.")
+        return state
+
+    def reload_if_changed(self) -> bool:
+        try:
+            mtime = os.stat(self.artifact_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        # Se recuerda el mtime antes de cargar: un artefacto roto se reporta una sola vez.
+        self._mtime = mtime
+        try:
+            state = load_artifact(self.artifact_path)
+        except Exception as e:
+            RELOADS.inc(result="error")
+            logger.error(f"Artefacto de la NLU inválido, se mantiene la versión {self.state.version}: {e}")
+            return False
+
+        previous, self.state = self.state, state
+        ARTIFACT_BUILT_AT.set(state.built_at)
+        RELOADS.inc(result="ok")
+        logger.info(f"NLU recargada: versión {previous.version} -> {state.version}.")
+        return True
+
+    def start_watching(self, interval: float = POLL_SECONDS):
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="nlu-artifact-watcher", daemon=True)
+        self._watcher.start()
+
+    def _watch(self, interval: float):
+        while True:
+            time.sleep(interval)
+            self.reload_if_changed()
+
+
+RUNTIME = NLURuntime()
@@ -0,0 +1,172 @@
+# nlu/embedding_fallback.py
+import os
+import json
+import time
+import logging
+import threading
+
+from shared_libs.utils.metrics import REGISTRY
+from shared_libs.nlu.utterance import Utterance
+
+try:
+    import numpy as np  # dependencia del RAG; sin ella el respaldo queda desactivado
+except ImportError:
+    np = None
+
+logger = logging.getLogger("NLU")
+
+# --- 1. Configuración ---
+# Respaldo para los textos que ninguna regex reconoce: en lugar de 'Unknown' (plantilla DEFAULT)
+# se elige la intención cuyo centroide de embeddings es más parecido al texto.
+NLU_DIR = os.path.dirname(os.path.abspath(__file__))
+# Generados por `scripts/build_intent_centroids.py`: matriz (intenciones x dim) float32, filas
+# normalizadas, y sus metadatos (etiquetas de cada fila, modelo, etc.).
+CENTROIDS_PATH = os.getenv("NLU_CENTROIDS_PATH", os.path.join(NLU_DIR, 'intent_centroids.npy'))
+# El mismo modelo que el índice FAISS de la API (shared_libs/utils/build_vector_db.py).
+EMBEDDING_MODEL = os.getenv("NLU_EMBEDDING_MODEL", 'sentence-transformers/all-MiniLM-L6-v2')
+EMBEDDING_FALLBACK = os.getenv("NLU_EMBEDDING_FALLBACK", "1") != "0"
+# Similitud coseno mínima con el mejor centroide y ventaja mínima sobre el segundo.
+MIN_SCORE = float(os.getenv("NLU_EMBEDDING_MIN_SCORE", "0.55"))
+MIN_MARGIN = float(os.getenv("NLU_EMBEDDING_MIN_MARGIN", "0.02"))
+
+FALLBACK_RESULTS = REGISTRY.counter("nlu_embedding_fallback_total", "Textos sin regex resueltos por embeddings, por resultado.")
+FALLBACK_LATENCY = REGISTRY.histogram("nlu_embedding_fallback_ms", "Duración del respaldo por embeddings (ms).")
+
+
+# --- 2. Centroides ---
+def meta_path_for(path: str) -> str:
+    return os.path.splitext(path)[0] + '.json'
+
+
+class IntentCentroids:
+    """
+    Matriz de centroides abierta con memmap: los procesos que la cargan comparten las páginas
+    del archivo y no hay que deserializar nada al arrancar.
+    """
+    def __init__(self, matrix, labels: list, meta: dict):
+        if matrix.shape[0] != len(labels):
+            raise ValueError(f"La matriz tiene {matrix.shape[0]} filas y hay {len(labels)} intenciones.")
+        self.matrix = matrix
+        self.labels = labels
+        self.meta = meta
+
+    @classmethod
+    def load(cls, path: str = CENTROIDS_PATH):
+        with open(meta_path_for(path), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        matrix = np.load(path, mmap_mode="r")
+        return cls(matrix, meta["labels"], meta)
+
+    def best(self, vectors):
+        """
+        Para una matriz de embeddings normalizados (n x dim) devuelve [(intención, puntuación)],
+        o 'Unknown' si la mejor similitud o la ventaja sobre la segunda no llegan al mínimo.
+        Todas las puntuaciones salen de un único producto de matrices.
+        """
+        scores = np.asarray(vectors, dtype=np.float32) @ self.matrix.T
+        rows = np.arange(len(scores))
+        winners = scores.argmax(axis=1)
+        top = scores[rows, winners]
+        if scores.shape[1] > 1:
+            margins = top - np.partition(scores, -2, axis=1)[:, -2]
+        else:
+            margins = np.full(len(scores), np.inf)
+        return [
+            (self.labels[w], float(s)) if s >= MIN_SCORE and m >= MIN_MARGIN else ("Unknown", float(s))
+            for w, s, m in zip(winners, top, margins)
+        ]
+
+
+def save_centroids(matrix, labels: list, meta: dict, path: str = CENTROIDS_PATH):
+    """Escribe la matriz y sus metadatos (aparte y renombrando, como el artefacto de la NLU)."""
+    meta = {**meta, "labels": list(labels), "dimension": int(matrix.shape[1])}
+    meta_path = meta_path_for(path)
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, np.ascontiguousarray(matrix, dtype=np.float32))
+    with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    os.replace(f"{meta_path}.tmp", meta_path)
+
+
+# --- 3. Clasificador de Respaldo ---
+class EmbeddingFallback:
+    """
+    Carga perezosa del modelo y de los centroides. Si falta alguno (sin numpy, sin
+    sentence-transformers o sin `intent_centroids.npy`) se avisa una vez y el respaldo
+    devuelve siempre 'Unknown', como antes.
+    """
+    def __init__(self, centroids_path: str = CENTROIDS_PATH, model_name: str = EMBEDDING_MODEL):
+        self.centroids_path = centroids_path
+        self.model_name = model_name
+        self.model = None
+        self.centroids = None
+        self.available = EMBEDDING_FALLBACK
+        self._lock = threading.Lock()
+
+    def _load(self, wait: bool = True) -> bool:
+        if self.centroids is not None or not self.available:
+            return self.available
+        # Mientras otro hilo carga el modelo (warm_up) las peticiones no esperan: siguen como 'Unknown'.
+        if not self._lock.acquire(blocking=wait):
+            return False
+        try:
+            if self.centroids is not None or not self.available:
+                return self.available
+            if np is None:
+                raise ImportError("numpy no está instalado")
+            from shared_libs.vectordb.encoder import get_encoder
+            centroids = IntentCentroids.load(self.centroids_path)
+            if centroids.meta.get("model") != self.model_name:
+                raise ValueError(f"los centroides se generaron con '{centroids.meta.get('model')}'")
+            # El mismo encoder que el RAG si el modelo coincide: una sola copia por proceso.
+            self.model = get_encoder(self.model_name)
+            self.centroids = centroids
+        except Exception as e:
+            self.available = False
+            logger.warning(f"Respaldo por embeddings desactivado ({e}); los textos sin regex quedan como 'Unknown'.")
+            return False
+        finally:
+            self._lock.release()
+        logger.info(f"Respaldo por embeddings listo: {len(self.centroids.labels)} intenciones, modelo '{self.model_name}'.")
+        return True
+
+    def warm_up(self, background: bool = True):
+        """Carga el modelo antes de la primera petición (en un hilo, para no retrasar el arranque)."""
+        if background:
+            threading.Thread(target=self._load, name="nlu-embedding-warmup", daemon=True).start()
+        else:
+            self._load()
+
+    def embed(self, utterances: list):
+        """Embeddings normalizados del texto de cada Utterance; se guardan en el propio Utterance."""
+        key = ("embedding", self.model_name)
+        missing = [u for u in utterances if u.cached(key) is None]
+        if missing:
+            vectors = self.model.encode([u.normalized for u in missing], batch_size=64, normalize=True)
+            for utterance, vector in zip(missing, vectors):
+                utterance.remember(key, vector.astype(np.float32, copy=False))
+        return np.stack([u.cached(key) for u in utterances])
+
+    def classify_batch(self, texts) -> list:
+        """Una intención (o 'Unknown') por texto: una sola codificación y un solo matmul por lote."""
+        utterances = [Utterance.of(text) for text in texts]
+        if not utterances:
+            return []
+        if not self._load(wait=False):
+            FALLBACK_RESULTS.inc(len(utterances), result="unavailable")
+            return ["Unknown"] * len(utterances)
+        start = time.perf_counter()
+        results = self.centroids.best(self.embed(utterances))
+        FALLBACK_LATENCY.observe((time.perf_counter() - start) * 1000)
+        intents = []
+        for intent, _ in results:
+            FALLBACK_RESULTS.inc(result="unknown" if intent == "Unknown" else "matched")
+            intents.append(intent)
+        return intents
+
+    def classify(self, text) -> str:
+        return self.classify_batch([text])[0]
+
+
+FALLBACK = EmbeddingFallback()
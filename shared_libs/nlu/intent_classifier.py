@@ -1,20 +1,56 @@
-import re, yaml
-import os 
+import logging
 
-PATTERNS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'patterns.yml')
-try:
-    with open(PATTERNS_PATH, "r", encoding="utf-8") as f:
-        cfg = yaml.safe_load(f)
-        INTENTS = cfg["intents"]
-except FileNotFoundError:
-    print(f"Error: El archivo de patrones no fue encontrado en {PATTERNS_PATH}")
-    INTENTS = {}
+from shared_libs.nlu.artifact import RUNTIME, INTENT_ENGINE, PATTERNS_PATH
+from shared_libs.nlu.regex_engine import NLUBudgetExceeded, BUDGET_EXCEEDED, start_budget
+from shared_libs.nlu.utterance import Utterance
+from shared_libs.nlu.parallel import map_chunks
+from shared_libs.nlu.embedding_fallback import FALLBACK
 
-def classify_intent(text: str) -> str:
-    text = text.lower()
-    # recorre intents y patrones
-    for intent, block in INTENTS.items():
-        for pat in block["patterns"]:
-            if re.search(pat, text, re.IGNORECASE):
-                return intent
-    return "Unknown"
\ No newline at end of file
+# Los patrones se compilan una sola vez (o se cargan ya analizados del artefacto de la NLU)
+# y RUNTIME los sustituye en caliente cuando cambia el artefacto. INTENTS es la vista del
+# estado al importar, para scripts y benchmarks.
+INTENTS = RUNTIME.state.intents
+
+logger = logging.getLogger("NLU")
+
+def _classify_patterns(text) -> str:
+    # `text` puede ser un Utterance ya preprocesado (lo comparten clasificador y slots).
+    # Sólo se evalúan, en el orden del YAML, los patrones cuyas palabras clave aparecen en el texto.
+    # Un texto patológico no puede bloquear al worker: se recorta y, si agota el presupuesto
+    # de tiempo, la instrucción sigue adelante como 'Unknown'.
+    # Con NLU_LANGUAGE_PARTITIONS=1, si el idioma se detecta con confianza se usan los patrones de ese idioma.
+    utterance = Utterance.of(text)
+    try:
+        return RUNTIME.state.intent_matcher_for(utterance).classify(utterance, deadline=start_budget())
+    except NLUBudgetExceeded:
+        BUDGET_EXCEEDED.inc(stage="intent")
+        logger.warning(f"Clasificación cortada por presupuesto de tiempo ({len(utterance.raw)} caracteres).")
+        return "Unknown"
+
+def classify_intent(text, fallback: bool = True) -> str:
+    """
+    Intención del texto según patterns.yml. Si ningún patrón coincide y `fallback` está activo,
+    se prueba con la intención de centroide de embeddings más parecido (nlu/embedding_fallback.py).
+    """
+    utterance = Utterance.of(text)
+    intent = _classify_patterns(utterance)
+    if intent == "Unknown" and fallback:
+        intent = FALLBACK.classify(utterance)
+    return intent
+
+def _classify_chunk(texts: list) -> list:
+    return [_classify_patterns(text) for text in texts]
+
+def classify_intents(texts, workers: int = None, fallback: bool = True) -> list:
+    """
+    Versión por lotes de `classify_intent`: mismas decisiones, en el orden de entrada.
+    Con `workers` > 1 (o 0 = una por CPU) los lotes grandes se reparten en un pool de procesos.
+    Los textos que quedan en 'Unknown' pasan juntos por el respaldo, en este proceso y en un solo lote.
+    """
+    texts = list(texts)
+    intents = map_chunks(_classify_chunk, texts, workers)
+    if fallback:
+        unknown = [i for i, intent in enumerate(intents) if intent == "Unknown"]
+        for i, intent in zip(unknown, FALLBACK.classify_batch([texts[i] for i in unknown])):
+            intents[i] = intent
+    return intents
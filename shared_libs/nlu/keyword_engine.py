@@ -0,0 +1,120 @@
+# nlu/keyword_engine.py
+import re
+
+from shared_libs.nlu.language_assets import SYNONYMS, ACTION_MAP, ENTITY_KEYWORDS
+from shared_libs.nlu.utterance import Utterance
+
+# --- 1. Expansión de Palabras Clave ---
+# Los patrones de ENTITY_KEYWORDS son regex finitas (alternativas, grupos y '?'), así que
+# se pueden expandir a la lista exacta de palabras que aceptan.
+TOKEN_RE = re.compile(r'\w+')
+
+
+def _expand_sequence(pattern: str, i: int, stop: str):
+    """Expande una secuencia hasta `stop`. Devuelve (formas, posición final)."""
+    forms = [""]
+    while i < len(pattern) and pattern[i] not in stop:
+        ch = pattern[i]
+        if ch == '(':
+            options, i = _expand_alternation(pattern, i + 1)
+            i += 1  # ')'
+        elif ch == '\\':
+            if pattern[i + 1] == 'b':
+                i += 2
+                continue
+            raise ValueError(f"Escape no soportado en '{pattern}'.")
+        elif re.match(r'\w', ch):
+            options, i = [ch], i + 1
+        else:
+            raise ValueError(f"Sintaxis no soportada ('{ch}') en '{pattern}'.")
+
+        if i < len(pattern) and pattern[i] == '?':
+            options = options + [""]
+            i += 1
+        forms = [f + o for f in forms for o in options]
+    return forms, i
+
+
+def _expand_alternation(pattern: str, i: int):
+    forms = []
+    while True:
+        branch, i = _expand_sequence(pattern, i, "|)")
+        forms.extend(branch)
+        if i >= len(pattern) or pattern[i] == ')':
+            return forms, i
+        i += 1  # '|'
+
+
+def expand_keyword_pattern(pattern: str) -> list:
+    """
+    Lista de palabras completas que acepta un patrón como `\\b(muro|pared)s?\\b`.
+    Lanza ValueError si el patrón usa algo más que literales, grupos, '|' y '?'.
+    """
+    forms, i = _expand_sequence(pattern, 0, ")")
+    if i != len(pattern):
+        raise ValueError(f"Paréntesis desbalanceados en '{pattern}'.")
+    return sorted({f.lower() for f in forms if f})
+
+
+# --- 2. Motor de Palabras Clave ---
+class KeywordIntentEngine:
+    """
+    Alternativa a las regex generadas por `scripts/build_nlu_patterns.py`
+    (`\\b(verbo|sinónimos)\\b.*\\s(entidad)` para cada par verbo × entidad).
+
+    Todas las palabras clave (verbos, sinónimos y entidades) se compilan en una única tabla.
+    Como todas deben coincidir como palabra completa, el autómata multi-patrón se reduce a un
+    diccionario sobre los tokens `\\w+`: el texto se recorre una sola vez, se recogen los aciertos
+    de verbo y entidad con sus posiciones y la intención se resuelve por tabla. El coste depende
+    de la longitud del texto, no del número de intenciones.
+    """
+    def __init__(self, action_map: dict = ACTION_MAP, entity_keywords: dict = ENTITY_KEYWORDS,
+                 synonyms: dict = SYNONYMS):
+        self.verbs = {}      # palabra -> {intención base}
+        self.entities = {}   # palabra -> {entidad}
+        self.rank = {}       # (base, entidad) -> nombre de la intención y su orden de generación
+        order = {}
+
+        for verb, base in action_map.items():
+            for word in [verb] + synonyms.get(verb, []):
+                self.verbs.setdefault(word.lower(), set()).add(base)
+            for entity in entity_keywords:
+                # El mismo orden en que build_intent_patterns inserta las intenciones.
+                name = f"{base}{entity}"
+                order.setdefault(name, len(order))
+                self.rank[(base, entity)] = (order[name], name)
+
+        for entity, pattern in entity_keywords.items():
+            for word in expand_keyword_pattern(pattern):
+                self.entities.setdefault(word, set()).add(entity)
+
+    @property
+    def intent_names(self) -> list:
+        return [name for _, name in sorted(set(self.rank.values()))]
+
+    def classify(self, utterance, deadline: float = None) -> str:
+        # Una sola pasada lineal sobre los tokens: `deadline` se acepta por compatibilidad
+        # con IntentMatcher, pero este motor no necesita presupuesto.
+        text = Utterance.of(utterance).lower
+        verbs, entities, rank = self.verbs, self.entities, self.rank
+        last_verb_end = {}   # base -> fin del último verbo visto
+        best = None
+
+        for m in TOKEN_RE.finditer(text):
+            word = m.group()
+            hit_entities = entities.get(word)
+            if hit_entities and last_verb_end and text[m.start() - 1].isspace():
+                for base, verb_end in last_verb_end.items():
+                    # `.*` no cruza saltos de línea; el `\s` previo a la entidad sí puede serlo.
+                    if '\n' in text[verb_end:m.start() - 1]:
+                        continue
+                    for entity in hit_entities:
+                        candidate = rank[(base, entity)]
+                        if best is None or candidate < best:
+                            best = candidate
+            hit_bases = verbs.get(word)
+            if hit_bases:
+                for base in hit_bases:
+                    last_verb_end[base] = m.end()
+
+        return best[1] if best else "Unknown"
@@ -0,0 +1,90 @@
+# nlu/language.py
+import os
+import math
+import re
+from collections import Counter
+
+from shared_libs.nlu.language_assets import LANGUAGE_SAMPLES
+
+# --- 1. Configuración ---
+# Por debajo de esta confianza el idioma es 'unknown' y la NLU usa el conjunto de patrones
+# combinado (ES + EN) en lugar del de un solo idioma.
+MIN_CONFIDENCE = float(os.getenv("NLU_LANGUAGE_MIN_CONFIDENCE", "0.9"))
+
+# Palabras vacías más frecuentes en las instrucciones. 'a' no cuenta para el inglés:
+# también es la preposición española más común.
+STOPWORDS = {
+    "es": {"el", "la", "los", "las", "un", "una", "unos", "unas", "de", "del", "en", "con", "por", "para",
+           "y", "que", "su", "sus", "al", "todos", "todas", "cada", "entre", "sobre", "hacia", "como"},
+    "en": {"the", "an", "of", "in", "on", "at", "with", "by", "for", "and", "to", "that", "its",
+           "all", "each", "every", "between", "from", "into", "as", "this", "these"},
+}
+
+# La puntuación es log-odds de 'es' frente a 'en' (positiva = español).
+STOPWORD_WEIGHT = 2.0   # por cada palabra vacía neta de un idioma
+FAST_MARGIN = 4.0       # con este margen sólo por palabras vacías no se miran los trigramas
+NGRAM_SCALE = 1.0       # peso del promedio de trigramas (por raíz del número de trigramas)
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def _trigrams(word: str):
+    padded = f" {word} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+# --- 2. Detector ---
+class LanguageDetector:
+    """
+    Detector ES/EN pensado para ir delante de la NLU (microsegundos por texto).
+
+    Primero cuenta palabras vacías: en la mayoría de las instrucciones basta. Si el margen es
+    pequeño (textos cortos o mezclados) suma la evidencia de los trigramas de caracteres de
+    cada palabra, con pesos log-odds aprendidos de LANGUAGE_SAMPLES. La tabla de trigramas es
+    un dict: `hash()` de str cambia entre procesos y una tabla de cubetas fija daría resultados
+    distintos en cada worker del pool.
+    """
+    def __init__(self, samples: dict = LANGUAGE_SAMPLES, stopwords: dict = STOPWORDS):
+        self.stopwords = {}
+        for word in stopwords["es"] - stopwords["en"]:
+            self.stopwords[word] = STOPWORD_WEIGHT
+        for word in stopwords["en"] - stopwords["es"]:
+            self.stopwords[word] = -STOPWORD_WEIGHT
+
+        counts = {}
+        for lang in ("es", "en"):
+            counts[lang] = Counter(
+                gram for sentence in samples[lang] for word in _WORD_RE.findall(sentence.lower())
+                if not word.isdigit() for gram in _trigrams(word)
+            )
+        es, en = counts["es"], counts["en"]
+        vocabulary = set(es) | set(en)
+        es_total = sum(es.values()) + len(vocabulary)
+        en_total = sum(en.values()) + len(vocabulary)
+        self.weights = {
+            gram: math.log((es[gram] + 1) / es_total) - math.log((en[gram] + 1) / en_total)
+            for gram in vocabulary
+        }
+
+    def score(self, words: list) -> float:
+        """Log-odds de español frente a inglés para una lista de palabras en minúsculas."""
+        stopwords = self.stopwords
+        score = sum(stopwords.get(word, 0.0) for word in words)
+        if abs(score) >= FAST_MARGIN:
+            return score
+        weights = self.weights
+        grams = [weights.get(gram, 0.0) for word in words if not word.isdigit() for gram in _trigrams(word)]
+        if grams:
+            score += NGRAM_SCALE * sum(grams) / math.sqrt(len(grams))
+        return score
+
+    def detect(self, words: list):
+        """Devuelve (idioma, confianza): 'es' o 'en' y la probabilidad estimada de acertar."""
+        score = self.score(words)
+        if score == 0:
+            return "unknown", 0.5
+        confidence = 1 / (1 + math.exp(-abs(score)))
+        return ("es" if score > 0 else "en"), confidence
+
+
+DETECTOR = LanguageDetector()
@@ -40,4 +40,76 @@ SYNONYMS = {
     "delete":    ["remove", "erase", "clear"],
     "place":     ["insert", "position", "put"],
     "tag":       ["label", "mark", "annotate"],
-}
\ No newline at end of file
+}
+
+# —— 2) Vocabulario para generar intenciones (scripts/build_nlu_patterns.py) ——
+# Mapeo de verbos principales (claves de SYNONYMS) a un nombre de Intención base
+ACTION_MAP = {
+    "crear": "Create", "genera": "Create", "dibuja": "Create", "construir": "Create",
+    "inserta": "Insert", "coloca": "Insert", "añade": "Insert",
+    "duplica": "Duplicate", "copia": "Duplicate", "clona": "Duplicate",
+    "cambia": "Change", "modifica": "Change", "ajusta": "Change",
+    "setea": "Set", "configura": "Set", "asigna": "Set", "define": "Set",
+    "obtén": "Query", "extrae": "Query", "recupera": "Query", "lista": "Query", "encuentra": "Query",
+    "borra": "Delete", "elimina": "Delete",
+    "rota": "Rotate", "gira": "Rotate",
+    "fija": "Pin", "bloquea": "Pin",
+    "une": "Join",
+    "exporta": "Export",
+    "oculta": "Hide",
+    "muestra": "Show",
+    "tag": "Tag",
+    # Añadir más mapeos base si es necesario...
+}
+
+# Palabras clave de objetos que definen la especificidad de la intención
+# Esto es crucial para diferenciar CreateWall de CreateFloor
+ENTITY_KEYWORDS = {
+    'Wall': r'\b(muro|pared|wall)s?\b',
+    'FamilyInstance': r'\b(instancia|familia|mobiliario|mueble|puerta|ventana|columna|pilar|viga|truss|celosía)s?\b',
+    'Level': r'\b(nivel|planta|level)es\b',
+    'Grid': r'\b(eje|rejilla|grid)s?\b',
+    'Floor': r'\b(suelo|piso|losa|placa|floor|slab)s?\b',
+    'Schedule': r'\b(tabla|planificación|schedule|cómputo)s?\b',
+    'Workset': r'\b(workset|subproyecto)s?\b',
+    'Opening': r'\b(agujero|hueco|apertura|opening|shaft)s?\b',
+    'Dimension': r'\b(cota|dimensión|dimension)es\b',
+    'Parameter': r'\b(parámetro|propiedad|comentario|marca|valor|parameter|property|comment|mark|value)s?\b',
+    'Type': r'\b(tipo|type)s?\b',
+    'Geometry': r'\b(geometr(í|i)a)s?\b',
+    'View': r'\b(vista|view)s?\b',
+}
+
+# —— 3) Muestras para el detector de idioma (nlu/language.py) ——
+# Frases típicas de cada idioma: de ellas salen los perfiles de trigramas de caracteres.
+# Conviene que cubran verbos, entidades y unidades; no hace falta que sean muchas.
+LANGUAGE_SAMPLES = {
+    "es": [
+        "Crea un muro del tipo genérico en el nivel 1 desde el punto inicial hasta el final.",
+        "Genera una nueva planta de piso rectangular con losas y vigas estructurales.",
+        "Selecciona todas las puertas y ventanas de la vista activa y cambia su comentario.",
+        "Coloca una instancia de la familia de mobiliario en la habitación seleccionada.",
+        "Obtén la lista de parámetros compartidos del proyecto actual y exporta la tabla.",
+        "Elimina los ejes duplicados, oculta las líneas de referencia y bloquea los vínculos.",
+        "Dibuja una tubería de acero con un diámetro de cincuenta milímetros hacia arriba.",
+        "Añade una cota alineada entre los muros y asigna el valor a la propiedad marca.",
+        "Rota la columna noventa grados, une la geometría y mueve el elemento a la izquierda.",
+        "Encuentra las habitaciones sin área, cuenta cuántas hay y calcula su volumen.",
+        "Establece la elevación de la cubierta, modifica el espesor del suelo y actualiza la hoja.",
+        "Importa el archivo, copia los subproyectos y configura la visibilidad de las categorías.",
+    ],
+    "en": [
+        "Create a wall of the generic type on level 1 from the start point to the end point.",
+        "Generate a new rectangular floor plan with structural slabs and beams.",
+        "Select all the doors and windows in the active view and change their comment.",
+        "Place a furniture family instance in the selected room.",
+        "Get the list of shared parameters from the current project and export the schedule.",
+        "Delete the duplicated grids, hide the reference lines and pin the links.",
+        "Draw a steel pipe with a diameter of fifty millimeters going upward.",
+        "Add an aligned dimension between the walls and assign the value to the mark property.",
+        "Rotate the column ninety degrees, join the geometry and move the element to the left.",
+        "Find the rooms without area, count how many there are and calculate their volume.",
+        "Set the roof elevation, modify the floor thickness and update the sheet.",
+        "Import the file, copy the worksets and configure the visibility of the categories.",
+    ],
+}
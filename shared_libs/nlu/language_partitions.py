@@ -0,0 +1,119 @@
+# nlu/language_partitions.py
+import re
+from collections import Counter
+
+from shared_libs.nlu.matchers import _scan, _word_forms, _WORD_FORMS_RE
+from shared_libs.nlu.utterance import Utterance
+
+# --- 1. Configuración ---
+LANGUAGES = ("es", "en")
+# Una palabra se considera de otro idioma si aparece en al menos tantas instrucciones de ese
+# idioma y en ninguna del idioma de la partición.
+MIN_WORD_COUNT = 3
+
+_SEPARATOR_RE = re.compile(r'\\s[*+?]?| ')
+
+
+# --- 2. Léxico por Idioma ---
+def build_lexicon(texts) -> dict:
+    """
+    Cuenta en cuántas instrucciones de cada idioma aparece cada palabra (en minúsculas).
+    Sólo cuentan los textos cuyo idioma se detecta con confianza.
+    """
+    lexicon = {lang: Counter() for lang in LANGUAGES}
+    for text in texts:
+        utterance = Utterance.of(text)
+        if utterance.language in lexicon:
+            lexicon[utterance.language].update(utterance.tokens)
+    return lexicon
+
+
+def _foreign(words: set, language: str, lexicon: dict) -> bool:
+    """Si ninguna forma aparece en `language` y alguna es habitual en otro idioma."""
+    if any(lexicon[language][w] for w in words):
+        return False
+    return any(sum(lexicon[other][w] for w in words) >= MIN_WORD_COUNT
+               for other in LANGUAGES if other != language)
+
+
+# --- 3. Poda de Patrones ---
+def _alternative_words(alternative: str, plural: bool):
+    """
+    Formas de cada palabra de una alternativa literal (`crea`, `muros?`, `en\\s*el`),
+    o None si la alternativa no es una secuencia de palabras.
+    """
+    pieces = _SEPARATOR_RE.split(alternative)
+    if not all(piece and _WORD_FORMS_RE.fullmatch(piece) for piece in pieces):
+        return None
+    words = [_word_forms(piece) for piece in pieces]
+    if any(forms is None for forms in words):
+        return None
+    if plural:
+        words[-1] = words[-1] | {form + "s" for form in words[-1]}
+    return words
+
+
+def prune_pattern(pattern: str, language: str, lexicon: dict):
+    """
+    Quita de los grupos de alternativas literales las que sólo se usan en otro idioma
+    (`(crea|genera|create)` -> `(create)` en la partición inglesa). Devuelve (patrón, nº podadas).
+    Un grupo nunca se vacía y lo que no es literal se conserva tal cual.
+    """
+    scan = _scan(pattern)
+    opens, groups = [], []
+    for pos, ch, _ in scan:
+        if ch == '(':
+            opens.append(pos)
+        elif ch == ')' and opens:
+            start = opens.pop()
+            if not any(start < p < pos and c in '()' for p, c, _ in scan):
+                groups.append((start, pos))
+
+    pruned = 0
+    for start, end in sorted(groups, reverse=True):
+        body_start = start + 1
+        if pattern.startswith('?:', body_start):
+            body_start += 2
+        elif pattern.startswith('?', body_start):
+            continue
+        after = end + 3 if pattern.startswith('s?', end + 1) else end + 1
+        inside_word = pattern[start - 1:start].isalnum() and pattern[start - 2:start - 1] != '\\'
+        if inside_word or pattern[after:after + 1].isalnum():
+            continue   # grupo dentro de una palabra, como `geometr(í|i)a`
+        body = pattern[body_start:end]
+        cuts = [pos for pos, ch, _ in _scan(body) if ch == '|']
+        if not cuts:
+            continue
+        bounds = [-1] + cuts + [len(body)]
+        alternatives = [body[a + 1:b] for a, b in zip(bounds, bounds[1:])]
+        plural = after == end + 3
+        kept = []
+        for alternative in alternatives:
+            words = _alternative_words(alternative, plural)
+            if words is not None and any(_foreign(forms, language, lexicon) for forms in words):
+                continue
+            kept.append(alternative)
+        if kept and len(kept) < len(alternatives):
+            pruned += len(alternatives) - len(kept)
+            pattern = pattern[:body_start] + "|".join(kept) + pattern[end:]
+    return pattern, pruned
+
+
+def partition_patterns(intents: dict, slots: dict, language: str, lexicon: dict):
+    """Intenciones y slots de patterns.yml podados para `language`. Devuelve (intents, slots, nº podadas)."""
+    pruned = 0
+    language_intents = {}
+    for intent, block in intents.items():
+        patterns = []
+        for pattern in (block or {}).get("patterns") or []:
+            pattern, n = prune_pattern(pattern, language, lexicon)
+            patterns.append(pattern)
+            pruned += n
+        language_intents[intent] = {**(block or {}), "patterns": patterns}
+    language_slots = {}
+    for name, pattern in slots.items():
+        if pattern:
+            pattern, n = prune_pattern(pattern, language, lexicon)
+            pruned += n
+        language_slots[name] = pattern
+    return language_intents, language_slots, pruned
@@ -0,0 +1,301 @@
+# nlu/matchers.py
+import re
+
+from shared_libs.nlu.regex_engine import compile_pattern, check_budget, source_pattern
+from shared_libs.nlu.utterance import Utterance
+
+# --- 1. Análisis de Patrones ---
+# Un grupo de alternativas literales "ancla" un patrón: si ninguna de sus palabras aparece
+# como token del texto, el patrón no puede coincidir y no hace falta evaluarlo.
+# Se aceptan grupos (capturantes o `(?:`) precedidos por \b y seguidos de \b o \s
+# (opcionalmente con plural 's?').
+_ANCHOR_GROUP_RE = re.compile(r'\\b\((?:\?:)?(?!\?)((?:[^()\\]|\\.)*)\)(s\?)?(?=\\b|\\s(?![*?{]))')
+_WORD_FORMS_RE = re.compile(r'(?:\w|\[\w+\])\??(?:(?:\w|\[\w+\])\??)*')
+_LEADING_LOOKAHEAD = '(?=.*'
+
+
+def _scan(pattern: str):
+    """
+    Recorre los metacaracteres del patrón (sin escapes ni clases de caracteres)
+    y devuelve [(posición, carácter, profundidad de paréntesis antes del carácter)].
+    """
+    out = []
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if in_class:
+            in_class = ch != ']'
+        elif ch == '[':
+            in_class = True
+        else:
+            out.append((i, ch, depth))
+            if ch == '(':
+                depth += 1
+            elif ch == ')':
+                depth -= 1
+        i += 1
+    return out
+
+
+def _depth_at(scan: list, position: int) -> int:
+    depth = 0
+    for pos, ch, d in scan:
+        if pos >= position:
+            return d
+        depth = d + (1 if ch == '(' else -1 if ch == ')' else 0)
+    return depth
+
+
+def _mandatory_region(pattern: str, scan: list):
+    """
+    Zonas del patrón cuyo contenido es obligatorio: el nivel superior y, si el patrón
+    empieza por un lookahead `(?=.*...)` sin alternativas, el interior de ese lookahead.
+    Devuelve (profundidades válidas, fin del lookahead inicial).
+    """
+    if any(ch == '|' and d == 0 for _, ch, d in scan):
+        return set(), 0
+    if not pattern.startswith(_LEADING_LOOKAHEAD):
+        return {0}, 0
+    end = next((pos for pos, ch, d in scan if ch == ')' and d == 1), len(pattern))
+    if any(ch == '|' and d == 1 and pos < end for pos, ch, d in scan):
+        return {0}, 0
+    return {0, 1}, end
+
+
+def _word_forms(word: str):
+    """Formas de una palabra con sufijos opcionales y clases simples (`muros?`, `roj[oa]`)."""
+    forms = [""]
+    for m in re.finditer(r'(\w|\[(\w+)\])(\?)?', word):
+        options = list(m.group(2) or m.group(1))
+        if m.group(3):
+            options.append("")
+        forms = [f + o for f in forms for o in options]
+    return {f.lower() for f in forms} if all(forms) else None
+
+
+def _alternative_anchor(alternative: str):
+    """Palabras completas con las que debe empezar la alternativa, o None si no es literal."""
+    if _WORD_FORMS_RE.fullmatch(alternative):
+        return _word_forms(alternative)
+    # Sólo un separador obligatorio (`\s`, `\s+` o un espacio) delimita la palabra inicial;
+    # con `\s*` o `\s?` la palabra podría continuar pegada a la siguiente.
+    leading = re.match(r'(\w+)(?:\\s(?![*?{])| )', alternative)
+    return {leading.group(1).lower()} if leading else None
+
+
+def extract_anchor_tokens(pattern: str):
+    """
+    Devuelve el conjunto de tokens de los que el patrón necesita al menos uno,
+    o None si no se puede garantizar (el patrón se evaluará siempre).
+    """
+    scan = _scan(pattern)
+    valid_depths, lookahead_end = _mandatory_region(pattern, scan)
+    for m in _ANCHOR_GROUP_RE.finditer(pattern):
+        depth = _depth_at(scan, m.start())
+        if depth not in valid_depths or (depth == 1 and m.end() > lookahead_end):
+            continue
+        anchors = [_alternative_anchor(alt) for alt in m.group(1).split('|')]
+        if any(a is None for a in anchors):
+            continue
+        tokens = set().union(*anchors)
+        if m.group(2):
+            tokens |= {a + 's' for a in tokens}
+        return tokens
+    return None
+
+
+# --- 2. Clasificador de Intenciones Compilado ---
+class IntentMatcher:
+    """
+    Evalúa los patrones de intención compilados una sola vez.
+
+    Un índice token -> patrones preselecciona los candidatos a partir de las palabras del
+    texto; sólo se ejecutan sus regex (más las que no tienen ancla) y en el orden del YAML,
+    por lo que se conserva la semántica de "la primera coincidencia gana".
+    """
+    def __init__(self, intents: dict, flags=re.IGNORECASE):
+        self.flags = flags
+        self.rules = []              # [(intent, patrón compilado)] en el orden del YAML
+        self.unanchored = []         # índices de reglas que siempre se evalúan
+        self.index = {}              # token -> [índices de reglas]
+        for intent, block in intents.items():
+            for pat in block.get("patterns", []):
+                rule_id = len(self.rules)
+                self.rules.append((intent, compile_pattern(pat, flags)))
+                anchors = extract_anchor_tokens(pat)
+                if anchors is None:
+                    self.unanchored.append(rule_id)
+                    continue
+                for token in anchors:
+                    self.index.setdefault(token, []).append(rule_id)
+
+    # Al serializar (artefacto de la NLU) se guarda el texto de los patrones y el análisis;
+    # las regex se recompilan al cargar con el motor configurado en ese proceso.
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["rules"] = [(intent, source_pattern(regex, self.flags)) for intent, regex in self.rules]
+        return state
+
+    def __setstate__(self, state):
+        state["rules"] = [(intent, compile_pattern(pattern, state["flags"])) for intent, pattern in state["rules"]]
+        self.__dict__.update(state)
+
+    def candidates(self, tokens) -> list:
+        selected = set(self.unanchored)
+        for token in tokens:
+            rule_ids = self.index.get(token)
+            if rule_ids:
+                selected.update(rule_ids)
+        return sorted(selected)
+
+    def classify(self, utterance, deadline: float = None) -> str:
+        """`utterance` es un texto o un Utterance; se usan sus vistas `lower` y `tokens`."""
+        utterance = Utterance.of(utterance)
+        text = utterance.lower
+        rules = self.rules
+        for rule_id in self.candidates(utterance.tokens):
+            check_budget(deadline)
+            intent, regex = rules[rule_id]
+            if regex.search(text):
+                return intent
+        return "Unknown"
+
+
+# --- 3. Extractor de Slots Compilado ---
+# Átomos de una regex: escapes, clases de caracteres completas o un carácter suelto.
+_ATOM_RE = re.compile(r'\\.|\[\^?\]?(?:[^\]\\]|\\.)*\]|.', re.DOTALL)
+_SIMPLE_CLASS_RE = re.compile(r'\[[^\]\\^-]+\]')
+_KEYWORD_SLOT_RE = re.compile(r'\\b\((?:\?:)?((?:[^()\\]|\\.)*)\)\\b')
+
+
+def keyword_slot_forms(pattern: str):
+    """
+    Si el patrón es sólo una lista de palabras completas, `\\b(muros?|paredes?|...)\\b`,
+    devuelve el conjunto de formas que acepta; si no, None.
+    """
+    m = _KEYWORD_SLOT_RE.fullmatch(pattern)
+    if not m:
+        return None
+    forms = set()
+    for alternative in m.group(1).split('|'):
+        words = _word_forms(alternative) if _WORD_FORMS_RE.fullmatch(alternative) else None
+        if words is None:
+            return None
+        forms |= words
+    return forms
+
+
+def required_class(pattern: str):
+    """
+    Clase de caracteres (`\\d` o una clase simple como `['"]`) que aparece en toda coincidencia
+    del patrón: no es opcional ni está dentro de alternativas, lookaheads negativos o grupos
+    opcionales. Devuelve su texto, o None si no hay ninguna.
+    """
+    scan = _scan(pattern)
+    if any(ch == '|' and d == 0 for _, ch, d in scan):
+        return None
+    groups, stack = [], []
+    for pos, ch, _ in scan:
+        if ch == '(':
+            stack.append(pos)
+        elif ch == ')' and stack:
+            groups.append((stack.pop(), pos))
+
+    def optional(open_pos, close_pos):
+        if pattern.startswith(('(?!', '(?<!'), open_pos):
+            return True
+        if pattern[close_pos + 1:close_pos + 2] in ('?', '*') or pattern.startswith('{0', close_pos + 1):
+            return True
+        inner = _depth_at(scan, open_pos) + 1
+        return any(ch == '|' and d == inner and open_pos < pos < close_pos for pos, ch, d in scan)
+
+    for m in _ATOM_RE.finditer(pattern):
+        atom = m.group()
+        if atom != r'\d' and not _SIMPLE_CLASS_RE.fullmatch(atom):
+            continue
+        if pattern[m.end():m.end() + 1] in ('?', '*') or pattern.startswith('{0', m.end()):
+            continue
+        if not any(o < m.start() < c and optional(o, c) for o, c in groups):
+            return atom
+    return None
+
+
+class SlotMatcher:
+    """
+    Extrae los slots de una intención con sus patrones compilados una sola vez.
+
+    Antes de evaluar un slot se comprueba, con los tokens del texto (calculados una única
+    vez por llamada), si el slot puede coincidir: los que necesitan una palabra clave, un
+    número o unas comillas ausentes en el texto se descartan sin ejecutar su regex. La salida es la misma
+    que la del bucle original de `re.findall` por slot.
+
+    Los slots que son sólo una lista de palabras (`element_category`, `color_name`...) ni
+    siquiera ejecutan su regex: sus valores son los tokens del texto que están en la lista.
+    """
+    def __init__(self, slot_patterns: list, flags=re.IGNORECASE):
+        self.flags = flags
+        self.rules = []   # [(slot, patrón compilado, tokens ancla, clase obligatoria, formas)]
+        self.classes = {}  # texto de la clase obligatoria -> regex compilada
+        for name, pattern in slot_patterns:
+            forms = keyword_slot_forms(pattern) if flags & re.IGNORECASE else None
+            required = required_class(pattern)
+            if required is not None:
+                self.classes.setdefault(required, re.compile(required, flags))
+            self.rules.append((name, compile_pattern(pattern, flags), extract_anchor_tokens(pattern),
+                               required, forms))
+
+    # Igual que IntentMatcher: se serializa el análisis y las regex se recompilan al cargar.
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["rules"] = [(name, source_pattern(regex, self.flags), *analysis) for name, regex, *analysis in self.rules]
+        state["classes"] = list(self.classes)
+        return state
+
+    def __setstate__(self, state):
+        flags = state["flags"]
+        state["rules"] = [(name, compile_pattern(pattern, flags), *analysis) for name, pattern, *analysis in state["rules"]]
+        state["classes"] = {required: re.compile(required, flags) for required in state["classes"]}
+        self.__dict__.update(state)
+
+    @staticmethod
+    def _keyword_values(regex, forms: set, words: list) -> list:
+        # Una palabra no ASCII que no está en la lista aún podría coincidir por las
+        # equivalencias de mayúsculas Unicode de IGNORECASE; se confirma con la regex.
+        return [word for word in words
+                if word.lower() in forms or (not word.isascii() and regex.fullmatch(word))]
+
+    def extract(self, utterance, deadline: float = None) -> dict:
+        """
+        `utterance` es un texto o un Utterance. Los tokens, las palabras y la presencia de
+        cada clase obligatoria se guardan en el Utterance y las comparten todas las intenciones.
+        """
+        utterance = Utterance.of(utterance)
+        text = utterance.text
+        extracted_slots = {}
+        for name, regex, anchors, required, forms in self.rules:
+            check_budget(deadline)
+            if forms is not None:
+                values = self._keyword_values(regex, forms, utterance.words)
+                if values:
+                    extracted_slots[name] = values
+                continue
+            if anchors is not None and utterance.tokens.isdisjoint(anchors):
+                continue
+            if required is not None and not utterance.contains(self.classes[required]):
+                continue
+            processed_matches = []
+            for match in regex.findall(text):
+                if isinstance(match, tuple):
+                    non_empty_groups = [group for group in match if group]
+                    if non_empty_groups:
+                        processed_matches.append(non_empty_groups[0])
+                else:
+                    processed_matches.append(match)
+            if processed_matches:
+                extracted_slots[name] = processed_matches
+        return extracted_slots
@@ -0,0 +1,54 @@
+# nlu/parallel.py
+import os
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+
+# --- 1. Configuración ---
+# Por debajo de este tamaño el coste de enviar los textos a otros procesos supera lo que se gana.
+MIN_PARALLEL_ITEMS = int(os.getenv("NLU_MIN_PARALLEL_ITEMS", "2000"))
+CHUNK_SIZE = int(os.getenv("NLU_CHUNK_SIZE", "500"))
+
+_executors = {}
+
+
+# --- 2. Pool de Procesos ---
+def _executor(workers: int) -> ProcessPoolExecutor:
+    """
+    Un pool por número de workers, creado la primera vez y reutilizado en las siguientes
+    llamadas: cada proceso compila los patrones al importar la NLU y ya no vuelve a hacerlo.
+    """
+    executor = _executors.get(workers)
+    if executor is None:
+        executor = _executors[workers] = ProcessPoolExecutor(max_workers=workers)
+    return executor
+
+
+@atexit.register
+def shutdown_pools():
+    for executor in _executors.values():
+        executor.shutdown(cancel_futures=True)
+    _executors.clear()
+
+
+def resolve_workers(workers) -> int:
+    """None o 1 -> en proceso; 0 o negativo -> un worker por CPU."""
+    if workers is None:
+        return 1
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def map_chunks(fn, items: list, workers=None, chunk_size: int = CHUNK_SIZE) -> list:
+    """
+    Aplica `fn` (que recibe y devuelve una lista) por trozos y concatena los resultados
+    en el orden de entrada. Sólo reparte entre procesos si hay trabajo suficiente.
+    `fn` debe ser una función de nivel de módulo para poder enviarse al pool.
+    """
+    workers = resolve_workers(workers)
+    if workers <= 1 or len(items) < MIN_PARALLEL_ITEMS:
+        return fn(items)
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    results = []
+    # `map` devuelve los trozos en el orden en que se enviaron, terminen cuando terminen.
+    for chunk_result in _executor(workers).map(fn, chunks):
+        results.extend(chunk_result)
+    return results
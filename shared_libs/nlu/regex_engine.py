@@ -0,0 +1,128 @@
+# nlu/regex_engine.py
+import os
+import re
+import time
+import logging
+
+from shared_libs.utils.metrics import REGISTRY
+
+try:
+    import re2  # google-re2: coincidencia en tiempo lineal (opcional)
+except ImportError:
+    re2 = None
+
+logger = logging.getLogger("NLU")
+
+# --- 1. Configuración ---
+# Motor de regex de la NLU:
+#   'linear' -> (por defecto) tiempo lineal donde se pueda: una reescritura exacta de los lookaheads
+#               `(?=.*\b(...)\b).*\b(...)\b` de las intenciones (sin dependencias) y, si está
+#               instalado google-re2, RE2 para los patrones que soporta. Lo que ninguno de los dos
+#               cubre sigue en 're' y lo reporta `scripts/lint_nlu_patterns.py`.
+#   're'     -> módulo estándar para todo. Con backtracking: los lookaheads son cuadráticos.
+# Ojo: en RE2 `\b` y `\w` son sólo ASCII; en palabras con tildes los límites pueden diferir de 're'.
+REGEX_ENGINE = os.getenv("NLU_REGEX_ENGINE", "linear").lower()
+# Presupuesto por llamada (clasificación o extracción) y longitud máxima del texto analizado.
+# El presupuesto se comprueba entre patrones: una regex en curso no se puede interrumpir, así que
+# el límite de longitud es lo que acota el peor caso de cada patrón individual.
+TIME_BUDGET_MS = float(os.getenv("NLU_TIME_BUDGET_MS", "50"))
+MAX_INPUT_CHARS = int(os.getenv("NLU_MAX_INPUT_CHARS", "2000"))
+
+BUDGET_EXCEEDED = REGISTRY.counter("nlu_budget_exceeded_total", "Llamadas de NLU cortadas por el presupuesto de tiempo, por etapa.")
+INPUTS_TRUNCATED = REGISTRY.counter("nlu_inputs_truncated_total", "Textos recortados a NLU_MAX_INPUT_CHARS antes de la NLU.")
+
+
+class NLUBudgetExceeded(TimeoutError):
+    pass
+
+
+# --- 2. Presupuesto por Llamada ---
+def clip_input(text: str) -> str:
+    if len(text) <= MAX_INPUT_CHARS:
+        return text
+    INPUTS_TRUNCATED.inc()
+    return text[:MAX_INPUT_CHARS]
+
+
+def start_budget(budget_ms: float = None) -> float:
+    """Instante (monotonic) en que vence el presupuesto de la llamada."""
+    return time.monotonic() + (TIME_BUDGET_MS if budget_ms is None else budget_ms) / 1000
+
+
+def check_budget(deadline: float):
+    if deadline is not None and time.monotonic() > deadline:
+        raise NLUBudgetExceeded("La NLU superó su presupuesto de tiempo.")
+
+
+# --- 3. Reescritura de Lookaheads ---
+# `(?=.*\b(A)\b).*\b(B)s?\b` con A y B listas de palabras equivale a "alguna línea contiene una
+# palabra de A y otra de B, en cualquier orden" (`.` no cruza saltos de línea). Con `re` se
+# reintenta el `.*` desde cada posición (cuadrático); línea a línea son dos búsquedas lineales.
+_WORD_LIST = r'\\b\([\w|?\[\]]+\)(?:s\?)?\\b'
+_COOCCURRENCE_RE = re.compile(rf'\(\?=\.\*({_WORD_LIST})\)\.\*({_WORD_LIST})')
+
+
+class CooccurrencePattern:
+    """Reescritura lineal de `(?=.*A).*B`; sólo implementa `search`, que es lo que usa la NLU."""
+    def __init__(self, pattern: str, first: str, second: str, flags: int):
+        self.pattern = pattern
+        self.first = re.compile(first, flags)
+        self.second = re.compile(second, flags)
+
+    def search(self, text: str):
+        start = 0
+        while start <= len(text):
+            end = text.find('\n', start)
+            if end < 0:
+                end = len(text)
+            if self.first.search(text, start, end):
+                match = self.second.search(text, start, end)
+                if match:
+                    return match
+            start = end + 1
+        return None
+
+
+# --- 4. Compilación ---
+def _inline_flags(flags: int) -> str:
+    return "".join(f for flag, f in ((re.IGNORECASE, "i"), (re.DOTALL, "s"), (re.MULTILINE, "m")) if flags & flag)
+
+
+def _compile_re2(pattern: str, flags: int):
+    inline = _inline_flags(flags)
+    try:
+        return re2.compile(f"(?{inline}){pattern}" if inline else pattern)
+    except re2.error:
+        return None
+
+
+def compile_pattern(pattern: str, flags: int = re.IGNORECASE, engine: str = None):
+    """Compila un patrón de la NLU con el motor configurado (ver REGEX_ENGINE)."""
+    if (engine or REGEX_ENGINE) == "linear":
+        m = _COOCCURRENCE_RE.fullmatch(pattern)
+        if m:
+            return CooccurrencePattern(pattern, m.group(1), m.group(2), flags)
+        if re2 is not None:
+            compiled = _compile_re2(pattern, flags)
+            if compiled is not None:
+                return compiled
+    return re.compile(pattern, flags)
+
+
+def source_pattern(compiled, flags: int) -> str:
+    """Texto original del patrón, sin los flags en línea que se añaden para RE2."""
+    pattern = compiled.pattern
+    prefix = f"(?{_inline_flags(flags)})"
+    if engine_name(compiled) == "re2" and prefix != "(?)" and pattern.startswith(prefix):
+        return pattern[len(prefix):]
+    return pattern
+
+
+def engine_name(compiled) -> str:
+    if isinstance(compiled, CooccurrencePattern):
+        return "cooccurrence"
+    return "re" if isinstance(compiled, re.Pattern) else "re2"
+
+
+if REGEX_ENGINE == "linear" and re2 is None:
+    logger.info("NLU_REGEX_ENGINE=linear sin 'google-re2' instalado: sólo se reescriben los lookaheads de intención.")
@@ -1,208 +1,59 @@
 # nlu/slot_filler.py
-import re
-import os
-import yaml
+import logging
 
-# --- 1. Carga de Configuración ---
-# Cargar todos los patrones de slots definidos en el archivo YML.
-# Usamos la última versión de los slots que creamos, con unidades imperiales incluidas.
-PATTERNS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'patterns.yml')
-try:
-    with open(PATTERNS_PATH, "r", encoding="utf-8") as f:
-        cfg = yaml.safe_load(f)
-        ALL_SLOTS_PATTERNS = cfg["slots"]
-        
-except FileNotFoundError:
-    print("Error: 'nlu/patterns.yml' no encontrado. Asegúrate de que el archivo existe en la carpeta nlu/.")
-    ALL_SLOTS_PATTERNS = {}
-
-# --- 2. Mapeo de Inteligencia: Intención -> Slots Relevantes ---
-# Este es el cerebro del orquestador. Define qué información buscar para cada acción.
-INTENT_SLOTS_MAPPING = {
-    # --- Creación de Elementos ---
-    'CreateWall': [
-        'element_category', 'dimension_length', 'dimension_height', 'dimension_thickness',
-        'family_type', 'level_name', 'coordinates_xyz', 'structural_usage'
-    ],
-    'InsertFamilyInstance': [
-        'element_category', 'family_type', 'level_name', 'coordinates_xy',
-        'coordinates_xyz', 'target_host', 'dimension_width', 'dimension_height', 
-        'dimension_compound', 'structural_usage'
-    ],
-    'CreateLevel': [
-        'new_name_definition', 'level_name', 'dimension_offset', 'level_elevation'
-    ],
-    'CreateGrid': [
-        'quantity', 'element_category', 'orientation', 'dimension_spacing'
-    ],
-    'CreateFloor': [
-        'element_category', 'dimension_compound', 'dimension_thickness', 'level_name'
-    ],
-    'CreateRoof': [
-        'element_category', 'level_name' # La geometría es más compleja, a menudo implícita
-    ],
-    'CreatePipe': [
-        'element_category', 'dimension_diameter'
-    ],
-    'CreateDuct': [
-        'element_category', 'dimension_compound' # para ancho x alto
-    ],
-    'CreateRailing': [
-        'element_category', 'target_host' # "en una escalera"
-    ],
-    'CreateOpening': [
-        'action_on_selection', 'target_host', 'dimension_compound', 'dimension_length'
-    ],
-    'CreateColumnsAtIntersections': [
-        'element_category', 'family_type', 'all_elements' # "en todos los cruces"
-    ],
-    'CreateBeamBetweenColumns': [
-        'element_category', 'orientation' # "alineadas horizontalmente"
-    ],
-    'CreateSheet': [
-        'element_category', 'new_name_definition', 'parameter_value' # para número de plano
-    ],
-    'CreateSchedule': [
-        'element_category', 'new_name_definition', 'parameter_name' # para los campos
-    ],
-    'CreateWorkset': [
-        'quantity', 'element_category', 'new_name_definition'
-    ],
-    'CreateMaterial': [
-        'material_name', 'color_name'
-    ],
-    'CreateView': [
-        'view_name', 'new_name_definition', 'level_name', 'orientation', 'coordinates_xyz'
-    ],
-
-    # --- Modificación de Elementos ---
-    'SetElementParameter': [
-        'all_elements', 'element_category', 'level_name', 'parameter_name', 
-        'parameter_value', 'action_on_selection', 'family_type'
-    ],
-    'ChangeElementType': [
-        'all_elements', 'action_on_selection', 'element_category', 'family_type'
-    ],
-    'RenameElements': [
-        'all_elements', 'element_category', 'view_name', 'new_name_definition', 
-        'name_prefix', 'action_on_selection'
-    ],
-    'MoveElement': [
-        'action_on_selection', 'element_category', 'dimension_generic_with_unit', 'direction_vector'
-    ],
-    'RotateElement': [
-        'action_on_selection', 'angle_degrees'
-    ],
-    'PinElements': [
-        'all_elements', 'action_on_selection', 'element_category'
-    ],
-    'DeleteElements': [
-        'all_elements', 'element_category', 'active_context', 'level_name'
-    ],
-    'DuplicateType': [
-        'element_category', 'family_type', 'new_name_definition', 'dimension_thickness'
-    ],
-    'DuplicateView': [
-        'active_context', 'view_name', 'new_name_definition'
-    ],
-    'CopyElements': [
-        'all_elements', 'element_category', 'level_name' # Captura nivel origen y destino
-    ],
+from shared_libs.nlu.artifact import RUNTIME, PATTERNS_PATH
+from shared_libs.nlu.slot_mapping import INTENT_SLOTS_MAPPING
+from shared_libs.nlu.regex_engine import NLUBudgetExceeded, BUDGET_EXCEEDED, start_budget
+from shared_libs.nlu.utterance import Utterance
+from shared_libs.nlu.parallel import map_chunks
 
-    # --- Acciones de Vista y Documento ---
-    'ChangeViewProperties': [
-        'active_context', 'all_elements', 'view_name', 'parameter_value' # "escala a 50", "detalle a 'Medio'"
-    ],
-    'ChangeElementVisibility': [
-        'active_context', 'action_on_selection', 'element_category', 'all_elements'
-    ],
-    'ApplyViewTemplate': [
-        'active_context', 'view_name', 'all_elements'
-    ],
-    'ExportFile': [
-        'active_context', 'file_format', 'file_path', 'view_name', 'element_category'
-    ],
-    'LoadFamily': [
-        'file_path'
-    ],
-    'SyncWithCentral': [
-        'parameter_value' # para el comentario
-    ],
-    'PlaceViewOnSheet': [
-        'view_name', 'level_name' # level_name puede capturar 'Planta Baja'
-    ],
-
-    # --- Acciones Geométricas y de Anotación ---
-    'JoinGeometry': [
-        'element_category' # Espera dos categorías
-    ],
-    'PaintFace': [
-        'material_name', 'element_category', 'orientation' # "cara interior"
-    ],
-    'CreateDimension': [
-        'action_on_selection', 'element_category'
-    ],
-    'TagElement': [
-        'all_elements', 'active_context', 'element_category'
-    ],
-    
-    # --- Consultas ---
-    'QueryElements': [
-        'all_elements', 'element_category', 'level_name', 'parameter_name', 'parameter_value'
-    ],
-    
-    'Unknown': []
-}
+logger = logging.getLogger("NLU")
 
+# --- 1. Carga de Configuración ---
+# Los patrones de slots vienen de patterns.yml, o del artefacto de la NLU ya analizados, y el
+# mapeo intención -> slots de slot_mapping.py. Cada intención tiene su extractor compilado en
+# RUNTIME.state.slot_matchers, que se sustituye entero cuando se recarga el artefacto.
+# ALL_SLOTS_PATTERNS es la vista del estado al importar, para scripts y benchmarks.
+ALL_SLOTS_PATTERNS = RUNTIME.state.slots
 
-# --- 3. Función de Extracción ---
-def extract_slots(text: str, intent: str) -> dict:
+# --- 2. Función de Extracción ---
+def extract_slots(text, intent: str) -> dict:
     """
     Extrae las entidades (slots) relevantes de un texto, basado en una intención dada.
+    `text` puede ser un Utterance ya preprocesado (p. ej. el mismo que recibió classify_intent).
     Siempre devuelve los valores de los slots como una lista.
     """
-    relevant_slot_names = INTENT_SLOTS_MAPPING.get(intent, [])
-    if not relevant_slot_names:
+    utterance = Utterance.of(text)
+    # Extractores del idioma del texto, o los combinados si el idioma es dudoso.
+    matcher = RUNTIME.state.slot_matchers_for(utterance).get(intent)
+    if matcher is None:
         return {}
 
-    extracted_slots = {}
-    
-    # Iterar SÓLO sobre los slots relevantes y buscar sus patrones.
-    for slot_name in relevant_slot_names:
-        pattern = ALL_SLOTS_PATTERNS.get(slot_name)
-        if not pattern:
-            # Esta advertencia es útil durante el desarrollo
-            # print(f"Advertencia: El slot '{slot_name}' definido en el mapeo no tiene un patrón en patterns.yml.")
-            continue
-
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        
-        if matches:
-            # 'processed_matches' siempre será la lista final para este slot
-            processed_matches = []
-            for match in matches:
-                if isinstance(match, tuple):
-                    # Limpia la tupla de grupos de captura vacíos (ej. de los OR en regex)
-                    non_empty_groups = [group for group in match if group]
-                    # Si la tupla limpia no está vacía, la añadimos.
-                    # A menudo, los patrones complejos capturan solo un valor real por tupla.
-                    if non_empty_groups:
-                        # Unimos los grupos si son parte de un número (ej. '10' y '.5')
-                        # Esta es una simplificación; por ahora, tomamos el primer grupo no vacío.
-                        processed_matches.append(non_empty_groups[0])
-                else:
-                    # Si no es una tupla, es un string simple
-                    processed_matches.append(match)
+    # El texto se tokeniza una sola vez y sólo se evalúan los slots que pueden coincidir.
+    # Como antes, de cada coincidencia con varios grupos se toma el primer grupo no vacío,
+    # y el valor de cada slot es siempre una lista, ej: ['muro'] o ['muros', 'suelos'].
+    try:
+        return matcher.extract(utterance, deadline=start_budget())
+    except NLUBudgetExceeded:
+        # Mejor sin slots que con un worker bloqueado: el Coder aún recibe el texto completo.
+        BUDGET_EXCEEDED.inc(stage="slots")
+        logger.warning(f"Extracción de slots cortada por presupuesto de tiempo ({len(utterance.raw)} caracteres).")
+        return {}
 
-            # ---- LA CORRECCIÓN CLAVE ESTÁ AQUÍ ----
-            # Si la lista de resultados no está vacía, la asignamos al slot.
-            # El valor siempre será una lista, ej: ['muro'] o ['muros', 'suelos']
-            if processed_matches:
-                extracted_slots[slot_name] = processed_matches
+def _extract_chunk(pairs: list) -> list:
+    return [extract_slots(text, intent) for text, intent in pairs]
 
-    return extracted_slots
+def extract_slots_batch(texts, intents, workers: int = None) -> list:
+    """
+    Versión por lotes de `extract_slots`: un dict de slots por texto, en el orden de entrada.
+    `workers` funciona igual que en `classify_intents`.
+    """
+    texts, intents = list(texts), list(intents)
+    if len(texts) != len(intents):
+        raise ValueError(f"Se recibieron {len(texts)} textos y {len(intents)} intenciones.")
+    return map_chunks(_extract_chunk, list(zip(texts, intents)), workers)
 
-# --- 4. Bloque de Prueba ---
+# --- 3. Bloque de Prueba ---
 if __name__ == '__main__':
     # Simula la clasificación de intención
     test_cases = [
@@ -0,0 +1,139 @@
+# nlu/slot_mapping.py
+
+# --- 1. Mapeo de Inteligencia: Intención -> Slots Relevantes ---
+# Este es el cerebro del orquestador. Define qué información buscar para cada acción.
+INTENT_SLOTS_MAPPING = {
+    # --- Creación de Elementos ---
+    'CreateWall': [
+        'element_category', 'dimension_length', 'dimension_height', 'dimension_thickness',
+        'family_type', 'level_name', 'coordinates_xyz', 'structural_usage'
+    ],
+    'InsertFamilyInstance': [
+        'element_category', 'family_type', 'level_name', 'coordinates_xy',
+        'coordinates_xyz', 'target_host', 'dimension_width', 'dimension_height', 
+        'dimension_compound', 'structural_usage'
+    ],
+    'CreateLevel': [
+        'new_name_definition', 'level_name', 'dimension_offset', 'level_elevation'
+    ],
+    'CreateGrid': [
+        'quantity', 'element_category', 'orientation', 'dimension_spacing'
+    ],
+    'CreateFloor': [
+        'element_category', 'dimension_compound', 'dimension_thickness', 'level_name'
+    ],
+    'CreateRoof': [
+        'element_category', 'level_name' # La geometría es más compleja, a menudo implícita
+    ],
+    'CreatePipe': [
+        'element_category', 'dimension_diameter'
+    ],
+    'CreateDuct': [
+        'element_category', 'dimension_compound' # para ancho x alto
+    ],
+    'CreateRailing': [
+        'element_category', 'target_host' # "en una escalera"
+    ],
+    'CreateOpening': [
+        'action_on_selection', 'target_host', 'dimension_compound', 'dimension_length'
+    ],
+    'CreateColumnsAtIntersections': [
+        'element_category', 'family_type', 'all_elements' # "en todos los cruces"
+    ],
+    'CreateBeamBetweenColumns': [
+        'element_category', 'orientation' # "alineadas horizontalmente"
+    ],
+    'CreateSheet': [
+        'element_category', 'new_name_definition', 'parameter_value' # para número de plano
+    ],
+    'CreateSchedule': [
+        'element_category', 'new_name_definition', 'parameter_name' # para los campos
+    ],
+    'CreateWorkset': [
+        'quantity', 'element_category', 'new_name_definition'
+    ],
+    'CreateMaterial': [
+        'material_name', 'color_name'
+    ],
+    'CreateView': [
+        'view_name', 'new_name_definition', 'level_name', 'orientation', 'coordinates_xyz'
+    ],
+
+    # --- Modificación de Elementos ---
+    'SetElementParameter': [
+        'all_elements', 'element_category', 'level_name', 'parameter_name', 
+        'parameter_value', 'action_on_selection', 'family_type'
+    ],
+    'ChangeElementType': [
+        'all_elements', 'action_on_selection', 'element_category', 'family_type'
+    ],
+    'RenameElements': [
+        'all_elements', 'element_category', 'view_name', 'new_name_definition', 
+        'name_prefix', 'action_on_selection'
+    ],
+    'MoveElement': [
+        'action_on_selection', 'element_category', 'dimension_generic_with_unit', 'direction_vector'
+    ],
+    'RotateElement': [
+        'action_on_selection', 'angle_degrees'
+    ],
+    'PinElements': [
+        'all_elements', 'action_on_selection', 'element_category'
+    ],
+    'DeleteElements': [
+        'all_elements', 'element_category', 'active_context', 'level_name'
+    ],
+    'DuplicateType': [
+        'element_category', 'family_type', 'new_name_definition', 'dimension_thickness'
+    ],
+    'DuplicateView': [
+        'active_context', 'view_name', 'new_name_definition'
+    ],
+    'CopyElements': [
+        'all_elements', 'element_category', 'level_name' # Captura nivel origen y destino
+    ],
+
+    # --- Acciones de Vista y Documento ---
+    'ChangeViewProperties': [
+        'active_context', 'all_elements', 'view_name', 'parameter_value' # "escala a 50", "detalle a 'Medio'"
+    ],
+    'ChangeElementVisibility': [
+        'active_context', 'action_on_selection', 'element_category', 'all_elements'
+    ],
+    'ApplyViewTemplate': [
+        'active_context', 'view_name', 'all_elements'
+    ],
+    'ExportFile': [
+        'active_context', 'file_format', 'file_path', 'view_name', 'element_category'
+    ],
+    'LoadFamily': [
+        'file_path'
+    ],
+    'SyncWithCentral': [
+        'parameter_value' # para el comentario
+    ],
+    'PlaceViewOnSheet': [
+        'view_name', 'level_name' # level_name puede capturar 'Planta Baja'
+    ],
+
+    # --- Acciones Geométricas y de Anotación ---
+    'JoinGeometry': [
+        'element_category' # Espera dos categorías
+    ],
+    'PaintFace': [
+        'material_name', 'element_category', 'orientation' # "cara interior"
+    ],
+    'CreateDimension': [
+        'action_on_selection', 'element_category'
+    ],
+    'TagElement': [
+        'all_elements', 'active_context', 'element_category'
+    ],
+    
+    # --- Consultas ---
+    'QueryElements': [
+        'all_elements', 'element_category', 'level_name', 'parameter_name', 'parameter_value'
+    ],
+    
+    'Unknown': []
+}
@@ -0,0 +1,132 @@
+# nlu/utterance.py
+import re
+import unicodedata
+
+from shared_libs.nlu.regex_engine import clip_input
+from shared_libs.nlu.language import DETECTOR, MIN_CONFIDENCE
+
+# --- 1. Tablas ---
+TOKEN_RE = re.compile(r'\w+')
+_SPACES_RE = re.compile(r'\s+')
+
+
+def _build_accent_fold() -> dict:
+    """Tabla para str.translate: letra con tilde/diéresis -> letra base (á -> a, Ñ -> N)."""
+    table = {}
+    for code in range(0xC0, 0x250):
+        base = "".join(ch for ch in unicodedata.normalize("NFD", chr(code)) if not unicodedata.combining(ch))
+        if len(base) == 1 and base != chr(code):
+            table[code] = base
+    return table
+
+
+_ACCENT_FOLD = _build_accent_fold()
+
+
+# --- 2. Utterance ---
+class cached_view:
+    """
+    Como functools.cached_property pero sin su lock interno (en 3.11 cuesta más que calcular
+    la vista): el Utterance es de una sola petición y calcular dos veces sería inocuo.
+    """
+    def __init__(self, compute):
+        self.compute = compute
+        self.name = compute.__name__
+        self.__doc__ = compute.__doc__
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        value = obj.__dict__[self.name] = self.compute(obj)
+        return value
+
+
+class Utterance:
+    """
+    Texto de una petición preprocesado una sola vez y compartido por las etapas de la NLU
+    (clasificador, slots y, más adelante, la consulta de recuperación).
+
+    Cada vista se calcula la primera vez que alguien la pide y queda en caché en el objeto.
+    `text` es el texto analizado (recortado a NLU_MAX_INPUT_CHARS) y `folded` tiene la misma
+    longitud, así que las posiciones de `token_spans` valen para ambos.
+    """
+    def __init__(self, text: str):
+        self.raw = text
+        self.text = clip_input(text)
+        self._views = {}
+
+    @classmethod
+    def of(cls, text_or_utterance):
+        """Acepta un texto o un Utterance ya construido (las APIs de la NLU admiten ambos)."""
+        return text_or_utterance if isinstance(text_or_utterance, cls) else cls(text_or_utterance)
+
+    @cached_view
+    def lower(self) -> str:
+        return self.text.lower()
+
+    @cached_view
+    def lower_words(self) -> list:
+        """Tokens `\\w+` en minúsculas y en orden."""
+        return TOKEN_RE.findall(self.lower)
+
+    @cached_view
+    def tokens(self) -> set:
+        """Tokens `\\w+` en minúsculas, para los índices de palabras clave."""
+        return set(self.lower_words)
+
+    @cached_view
+    def token_spans(self) -> list:
+        return [m.span() for m in TOKEN_RE.finditer(self.text)]
+
+    @cached_view
+    def words(self) -> list:
+        """Tokens con sus mayúsculas originales, en orden (los mismos que `token_spans`)."""
+        return TOKEN_RE.findall(self.text)
+
+    @cached_view
+    def folded(self) -> str:
+        """Minúsculas sin tildes, carácter a carácter: `folded[i]` corresponde a `text[i]`."""
+        lower = self.lower
+        if len(lower) != len(self.text):
+            # Algunas mayúsculas se expanden al bajarlas ('İ' -> 'i̇'); se conserva el primer carácter.
+            lower = "".join(ch.lower()[:1] for ch in self.text)
+        return lower.translate(_ACCENT_FOLD)
+
+    @cached_view
+    def normalized(self) -> str:
+        """Texto con los espacios colapsados, para prompts y consultas de recuperación."""
+        return _SPACES_RE.sub(" ", unicodedata.normalize("NFC", self.text)).strip()
+
+    @cached_view
+    def language_guess(self) -> tuple:
+        """(idioma, confianza) según el detector de nlu/language.py."""
+        return DETECTOR.detect(self.lower_words)
+
+    @cached_view
+    def language(self) -> str:
+        """'es' o 'en' si la detección es fiable (NLU_LANGUAGE_MIN_CONFIDENCE); si no, 'unknown'."""
+        language, confidence = self.language_guess
+        return language if confidence >= MIN_CONFIDENCE else "unknown"
+
+    def contains(self, regex) -> bool:
+        """Si `regex` aparece en el texto; se recuerda por patrón (lo reutilizan todas las intenciones)."""
+        key = ("contains", regex.pattern)
+        found = self._views.get(key)
+        if found is None:
+            found = self._views[key] = regex.search(self.text) is not None
+        return found
+
+    def view(self, key, compute):
+        """Caché genérica de vistas derivadas: `compute()` se llama una sola vez por clave."""
+        try:
+            return self._views[key]
+        except KeyError:
+            value = self._views[key] = compute()
+            return value
+
+    def cached(self, key):
+        """Vista ya calculada con `key`, o None (para quien calcula varias por lotes)."""
+        return self._views.get(key)
+
+    def remember(self, key, value):
+        self._views[key] = value
@@ -1,85 +1,52 @@
-import json
 import os
-import numpy as np
-import faiss
-from sentence_transformers import SentenceTransformer
+import sys
+import argparse
 
 # --- Configuración de Rutas ---
 # Nos aseguramos de que las rutas se construyan desde la raíz del proyecto
 REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-API_CATALOG_PATH = os.path.join(REPO_ROOT, 'Revit-Agent', 'agent-revit-orchestrator', 'data', 'revit_api_reflection.json')
-OUTPUT_DIR = os.path.join(REPO_ROOT, 'Revit-Agent', 'agent-revit-orchestrator', 'data')
-FAISS_INDEX_PATH = os.path.join(OUTPUT_DIR, 'faiss_index.bin')
-MAPPING_PATH = os.path.join(OUTPUT_DIR, 'index_to_api.json')
+sys.path.insert(0, REPO_ROOT)
 
-# --- Modelo para crear los vectores ---
-# 'all-MiniLM-L6-v2' es un modelo excelente: rápido, pequeño y muy efectivo para búsqueda semántica.
-MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+from shared_libs.vectordb.ann_index import add_index_arguments, config_from_args
+from shared_libs.vectordb.encoder import MODEL_NAME
+from shared_libs.vectordb.index_service import (
+    COLLECTIONS, VECTOR_DB_DIR, API_CATALOG_PATH, build_collection, collection_paths, load_documents,
+)
 
-def build_vector_database():
-    """
-    Lee el JSON de la API de Revit, lo convierte en vectores y guarda un índice FAISS
-    y un archivo de mapeo.
-    """
-    print("INFO: Cargando catálogo de la API de Revit...")
-    try:
-        with open(API_CATALOG_PATH, 'r', encoding='utf-8') as f:
-            api_catalog = json.load(f)
-    except FileNotFoundError:
-        print(f"ERROR: No se encontró el catálogo de la API en {API_CATALOG_PATH}")
-        return
+# Las rutas del catálogo de la API dentro del servicio de índices (las usan los scripts de benchmark).
+FAISS_INDEX_PATH = collection_paths("api_signatures")["index"]
+METADATA_PATH = collection_paths("api_signatures")["metadata"]
 
-    # 1. Preparar los documentos de texto que vamos a vectorizar
-    documents = []
-    index_to_api_map = {}
-    doc_index = 0
-    for class_info in api_catalog:
-        class_name = class_info.get("type", "UnknownClass")
-        # Incluimos métodos
-        for method in class_info.get("methods", []):
-            # Creamos una descripción textual rica para cada método
-            doc_text = f"Class: {class_name}. Method: {method.get('signature', '')}"
-            documents.append(doc_text)
-            index_to_api_map[doc_index] = doc_text
-            doc_index += 1
-        # Incluimos propiedades
-        for prop in class_info.get("properties", []):
-            doc_text = f"Class: {class_name}. Property: {prop}"
-            documents.append(doc_text)
-            index_to_api_map[doc_index] = doc_text
-            doc_index += 1
-            
-    if not documents:
-        print("ERROR: No se encontraron documentos para indexar en el catálogo de la API.")
-        return
 
-    print(f"INFO: Se prepararon {len(documents)} documentos de la API para ser vectorizados.")
+def load_api_documents(path: str = API_CATALOG_PATH) -> list:
+    """Un documento de texto por método y por propiedad del catálogo de la API."""
+    return load_documents("api_signatures", path)[1]
 
-    # 2. Cargar el modelo de embeddings
-    print(f"INFO: Cargando el modelo de Sentence Transformer: '{MODEL_NAME}'...")
-    model = SentenceTransformer(MODEL_NAME)
 
-    # 3. Crear los vectores (embeddings)
-    print("INFO: Codificando documentos a vectores... (Esto puede tardar un poco la primera vez)")
-    embeddings = model.encode(documents, show_progress_bar=True)
-    embeddings = np.array(embeddings).astype('float32')
-    
-    # 4. Construir y entrenar el índice FAISS
-    dimension = embeddings.shape[1]  # Dimensión de los vectores (ej. 384 para MiniLM)
-    index = faiss.IndexFlatL2(dimension)
-    index.add(embeddings)
-    
-    print(f"INFO: Se ha construido un índice FAISS con {index.ntotal} vectores.")
+def build_vector_database(index_config: dict, collections: list = ("api_signatures",), full: bool = False):
+    """
+    Construye las colecciones pedidas en el directorio del servicio de índices (VECTOR_DB_DIR):
+    índice FAISS, índice BM25, metadatos y su entrada en manifest.json, todas con el mismo
+    modelo ('all-MiniLM-L6-v2', rápido, pequeño y muy efectivo para búsqueda semántica) y el
+    mismo encoder cargado una sola vez.
+
+    Los embeddings se guardan por hash de contenido (<colección>/embeddings/): sólo se codifican
+    los documentos nuevos o modificados. Con `full=True` se vuelve a codificar todo.
+    """
+    print(f"INFO: Colecciones en {VECTOR_DB_DIR} con el modelo '{MODEL_NAME}'.")
+    built = [name for name in collections if build_collection(name, index_config, full=full) is not None]
+    if built:
+        print(f"\n✅ ¡Base de datos vectorial construida con éxito! ({', '.join(built)})")
+    else:
+        print("\nERROR: No se construyó ninguna colección.")
 
-    # 5. Guardar el índice y el mapeo
-    faiss.write_index(index, FAISS_INDEX_PATH)
-    print(f"INFO: Índice FAISS guardado en: {FAISS_INDEX_PATH}")
-    
-    with open(MAPPING_PATH, 'w', encoding='utf-8') as f:
-        json.dump(index_to_api_map, f, ensure_ascii=False, indent=2)
-    print(f"INFO: Mapeo de contenido guardado en: {MAPPING_PATH}")
-    
-    print("\n✅ ¡Base de datos vectorial construida con éxito!")
 
 if __name__ == "__main__":
-    build_vector_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Construye las colecciones del servicio de índices vectoriales.")
+    parser.add_argument("--collection", choices=list(COLLECTIONS) + ["all"], nargs="+", default=["api_signatures"],
+                        help="Colecciones a construir (por defecto, el catálogo de la API).")
+    parser.add_argument("--full", action="store_true", help="Vuelve a codificar todos los documentos.")
+    add_index_arguments(parser)
+    args = parser.parse_args()
+    names = list(COLLECTIONS) if "all" in args.collection else args.collection
+    build_vector_database(config_from_args(args), names, full=args.full)
@@ -0,0 +1,42 @@
+# shared_libs/utils/deadline.py
+import math
+import time
+
+# --- 1. Configuración ---
+# Instante límite absoluto (epoch en segundos, float) a partir del cual nadie leerá la respuesta.
+# Se usa tiempo de pared para que sea comparable entre el plugin, el orquestador y el coder.
+DEADLINE_HEADER = "X-Request-Deadline"
+
+
+# --- 2. Utilidades ---
+def deadline_from_headers(headers, default_timeout: float) -> float:
+    """
+    Lee el deadline enviado por el cliente. Si falta o es inválido (no numérico, NaN o infinito), aplica `default_timeout`
+    a partir de ahora. Nunca se extiende un deadline más allá del timeout por defecto.
+    """
+    fallback = time.time() + default_timeout
+    raw = headers.get(DEADLINE_HEADER) if headers else None
+    if not raw:
+        return fallback
+    try:
+        deadline = float(raw)
+    except ValueError:
+        return fallback
+    # 'nan' o 'inf' pasan por float(); min() con NaN devolvería NaN y el deadline nunca vencería.
+    if not math.isfinite(deadline):
+        return fallback
+    return min(deadline, fallback)
+
+
+def remaining_seconds(deadline: float) -> float:
+    if deadline is None:
+        return float("inf")
+    return deadline - time.time()
+
+
+def is_expired(deadline: float) -> bool:
+    return remaining_seconds(deadline) <= 0
+
+
+def deadline_headers(deadline: float) -> dict:
+    return {DEADLINE_HEADER: f"{deadline:.3f}"} if deadline is not None else {}
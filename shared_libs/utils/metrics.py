@@ -0,0 +1,161 @@
+# shared_libs/utils/metrics.py
+import time
+import bisect
+import threading
+
+from shared_libs.utils.tracing import current_request_id
+
+# --- 1. Configuración ---
+# Límites (en ms) de los buckets de latencia. Cubren desde la NLU (<1 ms) hasta una generación completa.
+DEFAULT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 120000, 300000)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _exemplar(value) -> dict:
+    # El exemplar enlaza una observación con la petición que la produjo.
+    return {"request_id": current_request_id(), "value": value, "timestamp": time.time()}
+
+
+# --- 2. Tipos de Métrica ---
+class Counter:
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._lock = threading.Lock()
+        self._values = {}
+        self._exemplars = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+            self._exemplars[key] = _exemplar(amount)
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "type": "counter",
+                "description": self.description,
+                "series": [
+                    {"labels": dict(key), "value": value, "exemplar": self._exemplars.get(key)}
+                    for key, value in self._values.items()
+                ]
+            }
+
+
+class Gauge:
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "type": "gauge",
+                "description": self.description,
+                "series": [{"labels": dict(key), "value": value} for key, value in self._values.items()]
+            }
+
+
+class Histogram:
+    def __init__(self, name: str, description: str, buckets=DEFAULT_BUCKETS_MS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        # El último bucket (índice len(buckets)) es el +Inf.
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0,
+                          "exemplars": [None] * (len(self.buckets) + 1)}
+                self._series[key] = series
+            series["counts"][idx] += 1
+            series["sum"] += value
+            series["count"] += 1
+            series["exemplars"][idx] = _exemplar(value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            series_out = []
+            for key, series in self._series.items():
+                bounds = [str(b) for b in self.buckets] + ["+Inf"]
+                series_out.append({
+                    "labels": dict(key),
+                    "count": series["count"],
+                    "sum": round(series["sum"], 3),
+                    "buckets": dict(zip(bounds, series["counts"])),
+                    "exemplars": {b: e for b, e in zip(bounds, series["exemplars"]) if e}
+                })
+            return {"type": "histogram", "description": self.description, "series": series_out}
+
+
+# --- 3. Registro ---
+class MetricsRegistry:
+    """
+    Registro en memoria del proceso. Sin dependencias externas: los servicios lo exponen
+    como JSON en su endpoint /metrics.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get_or_create(self, cls, name, description, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, description, **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, description)
+
+    def histogram(self, name: str, description: str = "", buckets=DEFAULT_BUCKETS_MS) -> Histogram:
+        return self._get_or_create(Histogram, name, description, buckets=buckets)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {name: metric.snapshot() for name, metric in metrics.items()}
+
+
+REGISTRY = MetricsRegistry()
+
+
+def observe_spans(spans: list, metric_name: str = "span_duration_ms"):
+    """Vuelca los spans de una traza en el histograma de duraciones por fase."""
+    histogram = REGISTRY.histogram(metric_name, "Duración de cada fase de la petición (ms).")
+    for s in spans:
+        histogram.observe(s["duration_ms"], span=s["name"])
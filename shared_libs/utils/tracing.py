@@ -0,0 +1,76 @@
+# shared_libs/utils/tracing.py
+import time
+import uuid
+import logging
+import contextvars
+from contextlib import contextmanager
+
+# --- 1. Configuración ---
+# Cabecera HTTP con la que el orquestador, el coder y el plugin comparten el ID de la petición.
+REQUEST_ID_HEADER = "X-Request-ID"
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] - %(message)s'
+
+# El ID y los spans viven en contextvars: cada hilo de Flask y cada tarea de FastAPI tienen los suyos.
+_request_id = contextvars.ContextVar("request_id", default="-")
+_spans = contextvars.ContextVar("spans", default=None)
+
+
+# --- 2. Contexto de la Petición ---
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def start_trace(request_id: str = None) -> str:
+    """
+    Abre la traza de la petición actual. Si el cliente ya envió un ID lo reutiliza,
+    así una misma instrucción conserva su ID a través de todos los servicios.
+    """
+    request_id = (request_id or "").strip() or new_request_id()
+    _request_id.set(request_id)
+    _spans.set([])
+    return request_id
+
+
+def current_request_id() -> str:
+    return _request_id.get()
+
+
+def get_spans() -> list:
+    return list(_spans.get() or [])
+
+
+@contextmanager
+def span(name: str):
+    """
+    Mide una fase de la petición. Guarda inicio y fin en tiempo de pared (comparables
+    entre servicios) y la duración medida con el reloj monotónico.
+    """
+    start_wall = time.time()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        spans = _spans.get()
+        if spans is not None:
+            spans.append({
+                "name": name,
+                "start": start_wall,
+                "end": start_wall + duration_ms / 1000,
+                "duration_ms": round(duration_ms, 2)
+            })
+
+
+# --- 3. Logging ---
+class RequestIdFilter(logging.Filter):
+    """Añade el ID de la petición actual a cada registro de log."""
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+def configure_logging(level=logging.INFO):
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, RequestIdFilter) for f in handler.filters):
+            handler.addFilter(RequestIdFilter())
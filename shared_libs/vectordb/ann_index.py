@@ -0,0 +1,258 @@
+# vectordb/ann_index.py
+import os
+import json
+import math
+import time
+
+import faiss
+import numpy as np
+
+# --- 1. Configuración ---
+# Tipos de índice soportados:
+#   flat   -> búsqueda exacta (fuerza bruta). Referencia para medir el recall de los demás.
+#   hnsw   -> grafo HNSW: sin entrenamiento, muy buen recall, ~1.5x la memoria de flat.
+#   ivfpq  -> IVF + Product Quantization: poca memoria, recall aproximado; necesita entrenamiento.
+#   ivfsq8 -> IVF + cuantización escalar de 8 bits: 4x menos memoria que flat, recall alto.
+INDEX_TYPES = ("flat", "hnsw", "ivfpq", "ivfsq8")
+# Métricas: l2 (vectores tal cual), ip (producto interno) y cosine (vectores normalizados + ip).
+METRICS = ("l2", "ip", "cosine")
+# Almacenamiento de los vectores en flat y hnsw: float32, float16 (1/2) o escalar de 8 bits (1/4).
+STORAGE_TYPES = ("fp32", "fp16", "sq8")
+
+DEFAULT_CONFIG = {
+    "type": "flat",
+    "metric": "l2",          # el de los índices existentes (IndexFlatL2)
+    "storage": "fp32",
+    # Re-puntuación exacta: con rescore = r se piden k * r candidatos al índice (cuantizado) y se
+    # reordenan con los vectores float32 guardados junto a él (`<índice>.f32`, mapeado en memoria).
+    "rescore": 0,
+    # HNSW
+    "hnsw_m": 32,
+    "ef_construction": 200,
+    "ef_search": 64,
+    # IVF (nlist = 0 -> 4 * sqrt(n), acotado para que cada lista tenga ejemplos de entrenamiento)
+    "nlist": 0,
+    "nprobe": 16,
+    # PQ: pq_m debe dividir la dimensión (384 para MiniLM -> 48 subvectores de 8 dimensiones)
+    "pq_m": 48,
+    "pq_bits": 8,
+}
+
+# faiss recomienda ~39 vectores de entrenamiento por centroide como mínimo.
+MIN_POINTS_PER_CENTROID = 39
+
+
+def config_path_for(index_path: str) -> str:
+    """La configuración se guarda junto al índice: `<colección>/index.faiss` -> `<colección>/index.faiss.config.json`."""
+    return f"{index_path}.config.json"
+
+
+def make_config(**overrides) -> dict:
+    config = dict(DEFAULT_CONFIG)
+    config.update({k: v for k, v in overrides.items() if v is not None})
+    if config["type"] not in INDEX_TYPES:
+        raise ValueError(f"Tipo de índice no soportado: '{config['type']}'. Opciones: {', '.join(INDEX_TYPES)}.")
+    if config["metric"] not in METRICS:
+        raise ValueError(f"Métrica no soportada: '{config['metric']}'. Opciones: {', '.join(METRICS)}.")
+    if config["storage"] not in STORAGE_TYPES:
+        raise ValueError(f"Almacenamiento no soportado: '{config['storage']}'. Opciones: {', '.join(STORAGE_TYPES)}.")
+    return config
+
+
+def exact_vectors_path_for(index_path: str) -> str:
+    return f"{index_path}.f32"
+
+
+def prepare_vectors(vectors, config: dict):
+    """float32 contiguo y, con metric=cosine, normalizado (lo mismo para documentos y consultas)."""
+    vectors = np.array(vectors, dtype=np.float32, order="C", copy=True, ndmin=2)
+    if config["metric"] == "cosine":
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def _faiss_metric(config: dict):
+    return faiss.METRIC_L2 if config["metric"] == "l2" else faiss.METRIC_INNER_PRODUCT
+
+
+# --- 2. Construcción ---
+def _nlist(config: dict, n_vectors: int) -> int:
+    if config["nlist"]:
+        return config["nlist"]
+    nlist = int(4 * math.sqrt(n_vectors))
+    return max(1, min(nlist, n_vectors // MIN_POINTS_PER_CENTROID))
+
+
+def factory_string(config: dict, dimension: int, n_vectors: int) -> str:
+    kind = config["type"]
+    storage = {"fp32": "Flat", "fp16": "SQfp16", "sq8": "SQ8"}[config["storage"]]
+    if kind == "flat":
+        return storage
+    if kind == "hnsw":
+        return f"HNSW{config['hnsw_m']}" + ("" if storage == "Flat" else f"_{storage}")
+    if kind == "ivfsq8":
+        return f"IVF{_nlist(config, n_vectors)},SQ8"
+    if dimension % config["pq_m"]:
+        raise ValueError(f"pq_m={config['pq_m']} no divide la dimensión {dimension}.")
+    return f"IVF{_nlist(config, n_vectors)},PQ{config['pq_m']}x{config['pq_bits']}"
+
+
+def apply_search_params(index, config: dict):
+    """Parámetros de búsqueda (no siempre los conserva faiss.write_index): efSearch y nprobe."""
+    if config["type"] == "hnsw":
+        index.hnsw.efSearch = config["ef_search"]
+    elif config["type"] in ("ivfpq", "ivfsq8"):
+        faiss.extract_index_ivf(index).nprobe = config["nprobe"]
+    return index
+
+
+_SQ_TYPES = {"fp16": "QT_fp16", "sq8": "QT_8bit"}
+
+
+def build_index(vectors, config: dict):
+    """Construye (y entrena si hace falta) el índice de `config` con los vectores float32 dados."""
+    vectors = prepare_vectors(vectors, config)
+    n_vectors, dimension = vectors.shape
+    metric = _faiss_metric(config)
+    if config["type"] == "hnsw" and config["storage"] != "fp32":
+        # HNSW sobre vectores cuantizados (IndexHNSWSQ); se entrena con los rangos de cada dimensión.
+        qtype = getattr(faiss.ScalarQuantizer, _SQ_TYPES[config["storage"]])
+        index = faiss.IndexHNSWSQ(dimension, qtype, config["hnsw_m"], metric)
+    else:
+        index = faiss.index_factory(dimension, factory_string(config, dimension, n_vectors), metric)
+    if config["type"] == "hnsw":
+        index.hnsw.efConstruction = config["ef_construction"]
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return apply_search_params(index, config)
+
+
+# --- 3. Búsqueda con Re-puntuación Exacta ---
+class ExactVectors:
+    """Los vectores float32 del índice en orden de ID, mapeados en memoria: sólo se leen los candidatos."""
+    def __init__(self, path: str, dimension: int):
+        self.vectors = np.memmap(path, dtype=np.float32, mode="r").reshape(-1, dimension)
+
+    def rescore(self, queries, candidates, k: int, metric: str):
+        """Reordena los candidatos de cada consulta por la métrica exacta. Devuelve (D, I) como faiss."""
+        distances = np.full((len(queries), k), np.inf if metric == "l2" else -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        for row, (query, cand) in enumerate(zip(queries, candidates)):
+            cand = cand[cand >= 0]
+            if not len(cand):
+                continue
+            vectors = self.vectors[cand]
+            if metric == "l2":
+                scores = ((vectors - query) ** 2).sum(axis=1)
+                order = np.argsort(scores)[:k]
+            else:
+                scores = vectors @ query
+                order = np.argsort(-scores)[:k]
+            distances[row, :len(order)] = scores[order]
+            ids[row, :len(order)] = cand[order]
+        return distances, ids
+
+
+def search(index, config: dict, queries, k: int, exact: ExactVectors = None):
+    """
+    `index.search` con las consultas preparadas para la métrica del índice y, si hay re-puntuación,
+    con k * rescore candidatos reordenados por los vectores exactos. Devuelve (D, I) como faiss:
+    distancias para l2, similitudes para ip/cosine.
+    """
+    queries = prepare_vectors(queries, config)
+    if exact is None or not config["rescore"]:
+        return index.search(queries, k)
+    fetch = min(k * config["rescore"], index.ntotal)
+    _, candidates = index.search(queries, fetch)
+    return exact.rescore(queries, candidates, k, config["metric"])
+
+
+def as_distance(value: float, config: dict) -> float:
+    """Valor de `search` como distancia (menor = más parecido) para cualquier métrica."""
+    if config["metric"] == "l2":
+        return float(value)
+    return float(1.0 - value) if config["metric"] == "cosine" else float(-value)
+
+
+# --- 4. Persistencia ---
+def save_index(index, config: dict, path: str, extra: dict = None, vectors=None):
+    """
+    Escribe el índice y, al lado, la configuración con la que se construyó. Con re-puntuación
+    (`config["rescore"]`) también los vectores exactos (`vectors`, en orden de ID) en `<índice>.f32`.
+    """
+    faiss.write_index(index, path)
+    if config["rescore"]:
+        if vectors is None:
+            raise ValueError("rescore > 0 necesita los vectores exactos para guardarlos junto al índice.")
+        prepare_vectors(vectors, config).tofile(f"{exact_vectors_path_for(path)}.tmp")
+        os.replace(f"{exact_vectors_path_for(path)}.tmp", exact_vectors_path_for(path))
+    record = {
+        **config,
+        "factory": factory_string(config, index.d, max(index.ntotal, 1)),
+        "dimension": index.d,
+        "ntotal": index.ntotal,
+        "built_at": time.time(),
+        **(extra or {}),
+    }
+    with open(config_path_for(path), "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False, indent=2)
+
+
+def load_config(path: str) -> dict:
+    """Configuración guardada junto al índice; los índices antiguos (sin ella) son flat/L2."""
+    try:
+        with open(config_path_for(path), "r", encoding="utf-8") as f:
+            return make_config(**json.load(f))
+    except FileNotFoundError:
+        return make_config()
+
+
+def index_is_current(path: str, config: dict, extra: dict) -> bool:
+    """Si el índice guardado ya tiene estos parámetros y estos metadatos (modelo, documentos)."""
+    if not os.path.exists(path):
+        return False
+    saved = load_config(path)
+    return all(saved.get(key) == config[key] for key in DEFAULT_CONFIG) and \
+        all(saved.get(key) == value for key, value in extra.items())
+
+
+def load_index(path: str, mmap: bool = False):
+    """Lee un índice y le aplica los parámetros de búsqueda de su configuración. Devuelve (índice, config)."""
+    flags = faiss.IO_FLAG_MMAP if mmap else 0
+    index = faiss.read_index(path, flags)
+    config = load_config(path)
+    return apply_search_params(index, config), config
+
+
+def load_exact_vectors(path: str, index, config: dict):
+    """Los vectores exactos del índice si se construyó con re-puntuación (si no, None)."""
+    if not config["rescore"]:
+        return None
+    return ExactVectors(exact_vectors_path_for(path), index.d)
+
+
+# --- 5. Opciones de Línea de Comandos ---
+def add_index_arguments(parser):
+    """Opciones comunes de los scripts que construyen índices (build_vector_db.py, create_vector_db.py)."""
+    group = parser.add_argument_group("índice FAISS")
+    group.add_argument("--index-type", choices=INDEX_TYPES, default=DEFAULT_CONFIG["type"])
+    group.add_argument("--metric", choices=METRICS, help="cosine = vectores normalizados + producto interno.")
+    group.add_argument("--storage", choices=STORAGE_TYPES, help="Vectores en flat/hnsw: fp32, fp16 o sq8.")
+    group.add_argument("--rescore", type=int, help="Candidatos por resultado para la re-puntuación exacta (0 = sin ella).")
+    group.add_argument("--hnsw-m", type=int, help=f"Vecinos por nodo de HNSW (por defecto {DEFAULT_CONFIG['hnsw_m']}).")
+    group.add_argument("--ef-construction", type=int)
+    group.add_argument("--ef-search", type=int)
+    group.add_argument("--nlist", type=int, help="Listas de IVF (por defecto 4*sqrt(n)).")
+    group.add_argument("--nprobe", type=int)
+    group.add_argument("--pq-m", type=int)
+    group.add_argument("--pq-bits", type=int)
+    return parser
+
+
+def config_from_args(args) -> dict:
+    return make_config(type=args.index_type, metric=args.metric,
+                       storage=args.storage, rescore=args.rescore,
+                       hnsw_m=args.hnsw_m, ef_construction=args.ef_construction, ef_search=args.ef_search,
+                       nlist=args.nlist, nprobe=args.nprobe,
+                       pq_m=args.pq_m, pq_bits=args.pq_bits)
@@ -0,0 +1,160 @@
+# vectordb/bm25.py
+import os
+import re
+import math
+import heapq
+import pickle
+from array import array
+from collections import Counter
+from operator import itemgetter
+
+# --- 1. Configuración ---
+BM25_FORMAT = 1
+K1 = 1.2
+B = 0.75
+# Términos con IDF menor que esto (presentes en casi todos los documentos, como "class" en el
+# catálogo de la API) no cambian el orden y son los de listas más largas: se omiten al buscar.
+MIN_IDF = 0.05
+# Constante de Reciprocal Rank Fusion: cuanto mayor, menos pesan los primeros puestos.
+RRF_K = 60
+
+# Identificadores con puntos (`Document.Create.NewFamilyInstance`), palabras y números.
+_IDENTIFIER_RE = re.compile(r'[^\W\d]\w*(?:\.[^\W\d]\w*)*|\d+(?:[.,]\d+)?')
+# Trozos de CamelCase: `NewFamilyInstance` -> New, Family, Instance; `XYZPoint` -> XYZ, Point.
+_CAMEL_RE = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+|[^\W\d_A-Za-z]+')
+
+
+def bm25_path_for(index_path: str) -> str:
+    """El índice BM25 de una colección va junto a su índice FAISS: `<colección>/index.faiss.bm25.pkl`."""
+    return f"{index_path}.bm25.pkl"
+
+
+# --- 2. Tokenizador ---
+def tokenize(text: str) -> list:
+    """
+    Términos en minúsculas. Un identificador cuenta entero y por partes, para que la consulta
+    `NewFamilyInstance` acierte exacto y `new family instance` también lo encuentre:
+    `Document.Create` -> document.create, document, create;
+    `OST_StructuralColumns` -> ost_structuralcolumns, ost, structuralcolumns, structural, columns.
+    """
+    tokens = []
+    for identifier in _IDENTIFIER_RE.findall(text):
+        tokens.append(identifier.lower())
+        if identifier[0].isdigit():
+            continue
+        parts = identifier.split(".")
+        if len(parts) > 1:
+            tokens.extend(part.lower() for part in parts)
+        for part in parts:
+            chunks = [chunk for chunk in part.split("_") if chunk]
+            if len(chunks) > 1:
+                tokens.extend(chunk.lower() for chunk in chunks)
+            for chunk in chunks:
+                if not chunk.isascii():
+                    continue   # CamelCase sólo en identificadores de la API, no en texto con tildes
+                pieces = _CAMEL_RE.findall(chunk)
+                if len(pieces) > 1:
+                    tokens.extend(piece.lower() for piece in pieces)
+    return tokens
+
+
+# --- 3. Índice Invertido ---
+class BM25Index:
+    """
+    Índice invertido en arrays compactos (módulo `array`, sin dependencias):
+    `offsets[t]:offsets[t+1]` delimita en `doc_ids`/`tfs` la lista de documentos del término t.
+    Los IDs de documento son las posiciones en la colección, las mismas que en el índice FAISS.
+    """
+    def __init__(self, vocabulary: list, offsets, doc_ids, tfs, doc_lengths, k1: float = K1, b: float = B):
+        self.vocabulary = vocabulary
+        self.terms = {term: i for i, term in enumerate(vocabulary)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        n_docs = len(doc_lengths)
+        avgdl = (sum(doc_lengths) / n_docs) if n_docs else 1.0
+        # Normalización por longitud precalculada: k1 * (1 - b + b * |d| / avgdl).
+        self.norms = array('f', (k1 * (1 - b + b * length / avgdl) for length in doc_lengths))
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    @classmethod
+    def build(cls, documents, k1: float = K1, b: float = B):
+        postings = {}
+        doc_lengths = array('I')
+        for doc_id, text in enumerate(documents):
+            counts = Counter(tokenize(text))
+            doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+        vocabulary = sorted(postings)
+        offsets, doc_ids, tfs = array('I', [0]), array('I'), array('H')
+        for term in vocabulary:
+            for doc_id, tf in postings[term]:
+                doc_ids.append(doc_id)
+                tfs.append(min(tf, 0xFFFF))
+            offsets.append(len(doc_ids))
+        return cls(vocabulary, offsets, doc_ids, tfs, doc_lengths, k1, b)
+
+    def idf(self, df: int) -> float:
+        n_docs = len(self.doc_lengths)
+        return math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int, allowed=None) -> list:
+        """[(doc_id, puntuación)] de los k mejores documentos; `allowed(doc_id)` filtra."""
+        scores = {}
+        k1_plus_1 = self.k1 + 1
+        doc_ids, tfs, norms = self.doc_ids, self.tfs, self.norms
+        for term in set(tokenize(query)):
+            t = self.terms.get(term)
+            if t is None:
+                continue
+            start, end = self.offsets[t], self.offsets[t + 1]
+            idf = self.idf(end - start)
+            if idf < MIN_IDF:
+                continue
+            for i in range(start, end):
+                doc_id = doc_ids[i]
+                tf = tfs[i]
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * k1_plus_1 / (tf + norms[doc_id])
+        if allowed is not None:
+            scores = {doc_id: score for doc_id, score in scores.items() if allowed(doc_id)}
+        return heapq.nlargest(k, scores.items(), key=itemgetter(1))
+
+    # --- Persistencia ---
+    def save(self, path: str):
+        state = {
+            "format": BM25_FORMAT, "k1": self.k1, "b": self.b, "vocabulary": self.vocabulary,
+            "offsets": self.offsets, "doc_ids": self.doc_ids, "tfs": self.tfs, "doc_lengths": self.doc_lengths,
+        }
+        with open(f"{path}.tmp", "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("format") != BM25_FORMAT:
+            raise ValueError(f"Formato de índice BM25 {state.get('format')} no soportado (se esperaba {BM25_FORMAT}).")
+        return cls(state["vocabulary"], state["offsets"], state["doc_ids"], state["tfs"],
+                   state["doc_lengths"], state["k1"], state["b"])
+
+
+# --- 4. Fusión ---
+def reciprocal_rank_fusion(rankings: list, weights: list = None, k: int = RRF_K) -> list:
+    """
+    Combina listas ordenadas de IDs (densa, BM25...) con RRF: sum(w / (k + puesto)).
+    No depende de la escala de cada puntuación (distancias L2 frente a BM25).
+    Devuelve [(id, puntuación)] de mayor a menor.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=itemgetter(1), reverse=True)
@@ -0,0 +1,62 @@
+# vectordb/cache.py
+import threading
+from collections import OrderedDict
+
+from shared_libs.utils.metrics import REGISTRY
+
+# --- 1. Métricas ---
+CACHE_LOOKUPS = REGISTRY.counter("rag_cache_lookups_total", "Consultas a las cachés del RAG, por caché y resultado (hit/miss).")
+CACHE_HIT_RATIO = REGISTRY.gauge("rag_cache_hit_ratio", "Proporción de aciertos acumulada de cada caché del RAG.")
+CACHE_SIZE = REGISTRY.gauge("rag_cache_entries", "Entradas actuales de cada caché del RAG.")
+
+
+# --- 2. LRU ---
+class LRUCache:
+    """
+    LRU acotada y segura entre hilos, con aciertos y fallos exportados a /metrics con la
+    etiqueta `cache=<name>`. `maxsize=0` la desactiva (todo es fallo y no se guarda nada).
+    """
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, default) if self.maxsize else default
+            if value is not default:
+                self._data.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            ratio = self.hits / (self.hits + self.misses)
+        CACHE_LOOKUPS.inc(cache=self.name, result="hit" if value is not default else "miss")
+        CACHE_HIT_RATIO.set(round(ratio, 4), cache=self.name)
+        return value
+
+    def put(self, key, value):
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            size = len(self._data)
+        CACHE_SIZE.set(size, cache=self.name)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        CACHE_SIZE.set(0, cache=self.name)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0}
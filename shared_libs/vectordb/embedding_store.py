@@ -0,0 +1,136 @@
+# vectordb/embedding_store.py
+import os
+import re
+import json
+import hashlib
+
+import numpy as np
+
+# --- 1. Configuración ---
+# Cada modelo tiene su propio almacén dentro del directorio:
+#   <slug>.f32        -> matriz float32 (filas x dim) en bruto, abierta con memmap
+#   <slug>.keys.json  -> hash de contenido de cada fila (en orden), modelo y dimensión
+STORE_DIRNAME = "embeddings"
+
+
+def content_hash(text: str) -> str:
+    """Hash del texto exacto que se vectoriza: si el texto no cambia, su embedding tampoco."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def documents_digest(hashes) -> str:
+    """Huella del conjunto ordenado de documentos de un índice (para saber si hay que reconstruirlo)."""
+    digest = hashlib.sha256()
+    for h in hashes:
+        digest.update(h.encode("ascii"))
+    return digest.hexdigest()
+
+
+def _slug(model_name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+
+
+# --- 2. Almacén ---
+class EmbeddingStore:
+    """
+    Embeddings persistentes indexados por hash de contenido, por modelo.
+
+    `sync(texts, encode)` devuelve la matriz de embeddings de `texts` (en su orden) y sólo
+    llama a `encode` con los textos nuevos o modificados; las filas de los documentos que
+    ya no están se eliminan del almacén.
+    """
+    def __init__(self, directory: str, model_name: str):
+        self.directory = directory
+        self.model_name = model_name
+        slug = _slug(model_name)
+        self.vectors_path = os.path.join(directory, f"{slug}.f32")
+        self.keys_path = os.path.join(directory, f"{slug}.keys.json")
+        self.keys = []
+        self.vectors = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.keys_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return
+        if meta.get("model") != self.model_name or not meta["keys"]:
+            return
+        self.keys = meta["keys"]
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                 shape=(len(self.keys), meta["dimension"]))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        """Olvida los embeddings guardados: el próximo `sync` vuelve a codificarlo todo."""
+        self.keys = []
+        self.vectors = None
+
+    def sync(self, texts: list, encode):
+        """
+        Devuelve (matriz float32 len(texts) x dim, estadísticas). `encode(lista_de_textos)`
+        debe devolver un array (n x dim); sólo recibe los textos cuyo hash no está guardado.
+        """
+        hashes = [content_hash(text) for text in texts]
+        wanted = dict.fromkeys(hashes)   # únicos, en orden de aparición
+        row_of = {key: row for row, key in enumerate(self.keys)}
+
+        reused = [h for h in wanted if h in row_of]
+        first_text = {}
+        for h, text in zip(hashes, texts):
+            first_text.setdefault(h, text)
+        missing = [h for h in wanted if h not in row_of]
+        removed = len(self.keys) - len(reused)
+
+        new_vectors = None
+        if missing:
+            new_vectors = np.asarray(encode([first_text[h] for h in missing]), dtype=np.float32)
+        if missing or removed:
+            self._rewrite(reused, row_of, missing, new_vectors)
+
+        row_of = {key: row for row, key in enumerate(self.keys)}
+        matrix = np.asarray(self.vectors[[row_of[h] for h in hashes]]) if hashes else np.empty((0, 0), np.float32)
+        stats = {"documents": len(texts), "reused": len(reused), "encoded": len(missing), "removed": removed}
+        return matrix, stats
+
+    def _rewrite(self, reused: list, row_of: dict, missing: list, new_vectors):
+        """Escribe el almacén compactado (filas conservadas + nuevas) y lo sustituye renombrando."""
+        os.makedirs(self.directory, exist_ok=True)
+        if new_vectors is not None:
+            dimension = new_vectors.shape[1]
+        else:
+            dimension = self.vectors.shape[1]
+        keys = reused + missing
+        tmp_vectors = f"{self.vectors_path}.tmp"
+        out = np.memmap(tmp_vectors, dtype=np.float32, mode="w+", shape=(max(len(keys), 1), dimension))
+        if reused:
+            out[:len(reused)] = self.vectors[[row_of[h] for h in reused]]
+        if missing:
+            out[len(reused):len(keys)] = new_vectors
+        out.flush()
+        del out
+        with open(f"{self.keys_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dimension": int(dimension), "keys": keys}, f)
+        # Se suelta el memmap anterior antes de reemplazar el archivo.
+        self.vectors = None
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(f"{self.keys_path}.tmp", self.keys_path)
+        self.keys = []
+        self._load()
+
+
+def lazy_encoder(model_name: str, batch_size: int = 64):
+    """Función `encode` para `sync` que sólo carga el modelo (el encoder compartido del proceso) si hay algo que codificar."""
+    def encode(texts):
+        from shared_libs.vectordb.encoder import get_encoder
+        encoder = get_encoder(model_name)
+        return encoder.encode(texts, batch_size=batch_size, show_progress_bar=len(texts) > batch_size)
+    return encode
+
+
+def store_dir_for(index_path: str) -> str:
+    """El almacén vive junto al índice: vector_db/<colección>/index.faiss -> vector_db/<colección>/embeddings/."""
+    return os.path.join(os.path.dirname(os.path.abspath(index_path)), STORE_DIRNAME)
@@ -0,0 +1,130 @@
+# vectordb/encoder.py
+import os
+import json
+import logging
+import threading
+
+try:
+    import numpy as np  # dependencia del RAG; sin ella load_encoder falla y quien lo llama se desactiva
+except ImportError:
+    np = None
+
+logger = logging.getLogger("Retriever")
+
+# --- 1. Configuración ---
+# El modelo de todas las colecciones (index_service.py), del RAG y del respaldo de la NLU.
+MODEL_NAME = os.getenv("RAG_MODEL", 'sentence-transformers/all-MiniLM-L6-v2')
+# Backend de las consultas: "torch" (SentenceTransformer) u "onnx" (MiniLM exportado y cuantizado
+# a int8 con scripts/export_onnx_encoder.py, ejecutado con ONNX Runtime en CPU).
+ENCODER_BACKEND = os.getenv("RAG_ENCODER_BACKEND", "torch")
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+ONNX_MODEL_DIR = os.getenv("RAG_ONNX_MODEL_DIR", os.path.join(MODELS_DIR, 'all-MiniLM-L6-v2-onnx-int8'))
+# Hilos de ONNX Runtime por sesión: las consultas son de una en una, más hilos apenas ayudan.
+ONNX_THREADS = int(os.getenv("RAG_ONNX_THREADS", "1"))
+
+ONNX_MODEL_FILE = "model_int8.onnx"
+ONNX_META_FILE = "encoder.json"
+
+
+def onnx_model_dir_for(model_name: str) -> str:
+    return os.path.join(MODELS_DIR, f"{model_name.split('/')[-1]}-onnx-int8")
+
+
+# --- 2. Backends ---
+class SentenceTransformerEncoder:
+    """El modelo completo en PyTorch (el comportamiento de siempre)."""
+    backend = "torch"
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def encode(self, texts: list, batch_size: int = 64, show_progress_bar: bool = False, normalize: bool = False):
+        vectors = self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                                    show_progress_bar=show_progress_bar, normalize_embeddings=normalize)
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+class OnnxEncoder:
+    """
+    MiniLM exportado a ONNX con pesos int8, tokenizador `tokenizers` (Rust) y el mismo
+    pooling (media con la máscara de atención) y normalización que el SentenceTransformer.
+    Los lotes se agrupan por longitud para rellenar lo mínimo.
+    """
+    backend = "onnx"
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, threads: int = ONNX_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        with open(os.path.join(model_dir, ONNX_META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.model_name = self.meta["model"]
+        self.normalize = self.meta["normalize"]
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.meta["max_length"])
+        self.tokenizer.enable_padding(pad_id=self.meta["pad_id"], pad_token=self.meta["pad_token"])
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(os.path.join(model_dir, ONNX_MODEL_FILE), options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: list, normalize: bool):
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {"input_ids": np.array([e.ids for e in encodings], dtype=np.int64), "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feed["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        hidden = self.session.run(None, feed)[0]
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        if self.normalize or normalize:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+    def encode(self, texts: list, batch_size: int = 64, show_progress_bar: bool = False, normalize: bool = False):
+        if not texts:
+            return np.empty((0, self.meta["dimension"]), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out = np.empty((len(texts), self.meta["dimension"]), dtype=np.float32)
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            out[rows] = self._encode_batch([texts[i] for i in rows], normalize)
+        return out
+
+
+def load_encoder(model_name: str, backend: str = ENCODER_BACKEND, onnx_dir: str = None):
+    """
+    El encoder del backend pedido. Si el modelo ONNX no existe, no corresponde a `model_name`
+    o falta onnxruntime, se avisa y se usa el de PyTorch.
+    """
+    if backend == "onnx":
+        onnx_dir = onnx_dir or (ONNX_MODEL_DIR if os.getenv("RAG_ONNX_MODEL_DIR") else onnx_model_dir_for(model_name))
+        try:
+            encoder = OnnxEncoder(onnx_dir)
+            if encoder.model_name != model_name:
+                raise ValueError(f"el modelo ONNX es de '{encoder.model_name}'")
+            return encoder
+        except Exception as e:
+            logger.warning(f"Encoder ONNX no disponible en '{onnx_dir}' ({e}); se usa SentenceTransformer.")
+    return SentenceTransformerEncoder(model_name)
+
+
+# --- 3. Instancia Compartida ---
+_ENCODERS = {}
+_ENCODERS_LOCK = threading.Lock()
+
+
+def get_encoder(model_name: str = MODEL_NAME, backend: str = ENCODER_BACKEND):
+    """
+    El encoder del proceso: se carga una vez por (modelo, backend) y lo comparten el RAG,
+    el respaldo de la NLU y los scripts de indexación, en lugar de una copia del modelo cada uno.
+    """
+    key = (model_name, backend)
+    with _ENCODERS_LOCK:
+        if key not in _ENCODERS:
+            _ENCODERS[key] = load_encoder(model_name, backend)
+        return _ENCODERS[key]
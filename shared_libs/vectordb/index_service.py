@@ -0,0 +1,394 @@
+# vectordb/index_service.py
+import os
+import re
+import json
+import time
+import logging
+import threading
+
+from shared_libs.vectordb.metadata_store import write_metadata, MetadataStore
+from shared_libs.vectordb.bm25 import BM25Index, bm25_path_for, reciprocal_rank_fusion
+from shared_libs.vectordb.encoder import MODEL_NAME, get_encoder
+
+logger = logging.getLogger("Retriever")
+
+# --- 1. Configuración ---
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+ORCHESTRATOR_DATA_DIR = os.path.join(REPO_ROOT, 'Revit-Agent', 'agent-revit-orchestrator', 'data')
+CODER_DIR = os.path.join(REPO_ROOT, 'Revit-Agent', 'agent-revit-coder')
+# Un directorio para todas las colecciones, compartido por el orquestador, el coder y los scripts:
+#   manifest.json                     -> qué colecciones hay, con qué modelo y configuración
+#   <colección>/index.faiss           -> índice FAISS (+ .config.json y, con --rescore, .f32)
+#   <colección>/index.faiss.bm25.pkl  -> índice BM25 de los mismos documentos
+#   <colección>/metadata.meta         -> campos de cada vector (ID = posición), mapeado en memoria
+#   <colección>/embeddings/           -> embeddings por hash de contenido (embedding_store.py)
+VECTOR_DB_DIR = os.getenv("RAG_VECTOR_DB_DIR", os.path.join(REPO_ROOT, 'Revit-Agent', 'vector_db'))
+MANIFEST_FILE = "manifest.json"
+MANIFEST_FORMAT = 1
+INDEX_FILE = "index.faiss"
+METADATA_FILE = "metadata.meta"
+
+DEFAULT_K = 3
+# Con filtros se piden más vecinos para que queden k después de filtrar.
+FILTER_OVERSAMPLE = 5
+# Búsqueda híbrida: los vecinos densos se fusionan (RRF) con BM25 sobre la misma colección, que
+# acierta los identificadores exactos (`NewFamilyInstance`, `OST_StructuralColumns`).
+RAG_HYBRID = os.getenv("RAG_HYBRID", "1") != "0"
+SPARSE_WEIGHT = float(os.getenv("RAG_SPARSE_WEIGHT", "1.0"))
+# Candidatos de cada lista antes de fusionar.
+HYBRID_CANDIDATES = 20
+
+API_CATALOG_PATH = os.path.join(ORCHESTRATOR_DATA_DIR, 'revit_api_reflection.json')
+REFERENCE_DATASET_PATH = os.path.join(CODER_DIR, 'rag_database', 'revit_api_reference_dataset.jsonl')
+SDK_SAMPLES_PATH = os.path.join(CODER_DIR, 'utils', 'sdk_finetune.jsonl')
+RAG_CORPUS_PATH = os.path.join(CODER_DIR, 'rag_database', 'rag_corpus.jsonl')
+
+
+# --- 2. Fuentes de las Colecciones ---
+def build_api_records(api_catalog: list) -> list:
+    """Un registro (texto a vectorizar + clase, tipo y miembro) por método y por propiedad del catálogo."""
+    records = []
+    for class_info in api_catalog:
+        class_name = class_info.get("type", "UnknownClass")
+        for method in class_info.get("methods", []):
+            signature = method.get('signature', '')
+            records.append({"text": f"Class: {class_name}. Method: {signature}",
+                            "class": class_name, "kind": "method", "member": signature})
+        for prop in class_info.get("properties", []):
+            records.append({"text": f"Class: {class_name}. Property: {prop}",
+                            "class": class_name, "kind": "property", "member": str(prop)})
+    return records
+
+
+def load_api_records(path: str = API_CATALOG_PATH) -> list:
+    """api_signatures: la reflexión de la API de Revit (revit_api_reflection.json)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return build_api_records(json.load(f))
+
+
+def _read_jsonl(path: str):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def load_reference_records(path: str = REFERENCE_DATASET_PATH) -> list:
+    """reference_docs: la referencia de la API ("### Referencia API Revit: <título> ### Descripción:")."""
+    records = []
+    for data in _read_jsonl(path):
+        title = re.sub(r'###\s*Referencia API Revit:\s*', '', data.get("prompt", ""))
+        title = re.sub(r'\s*###\s*Descripción:\s*', '', title).strip()
+        content = data.get("completion", "")
+        if title and content:
+            records.append({"title": title, "content": content})
+    return records
+
+
+def load_sdk_records(path: str = SDK_SAMPLES_PATH) -> list:
+    """sdk_samples: fragmentos de los ejemplos del SDK (utils/extract_sdk_samples.py)."""
+    return [{"title": data["prompt"], "content": data["completion"]}
+            for data in _read_jsonl(path) if data.get("prompt") and data.get("completion")]
+
+
+def load_rag_corpus_records(path: str = RAG_CORPUS_PATH) -> list:
+    """rag_corpus: fragmentos de ~200 palabras de la documentación HTML (utils/generate_rag_corpus.py)."""
+    return [{"id": data.get("id", ""), "title": data.get("title", ""), "text": data.get("text", "")}
+            for data in _read_jsonl(path) if data.get("title") or data.get("text")]
+
+
+# Cada colección: su fuente, los campos que se guardan por vector, los que se vectorizan
+# (`embed`) y los que indexa BM25 (`sparse`).
+COLLECTIONS = {
+    "api_signatures": {"source": API_CATALOG_PATH, "loader": load_api_records,
+                       "fields": ("text", "class", "kind", "member"), "embed": ("text",), "sparse": ("text",)},
+    "reference_docs": {"source": REFERENCE_DATASET_PATH, "loader": load_reference_records,
+                       "fields": ("title", "content"), "embed": ("content",), "sparse": ("title", "content")},
+    "sdk_samples": {"source": SDK_SAMPLES_PATH, "loader": load_sdk_records,
+                    "fields": ("title", "content"), "embed": ("title", "content"), "sparse": ("title", "content")},
+    "rag_corpus": {"source": RAG_CORPUS_PATH, "loader": load_rag_corpus_records,
+                   "fields": ("id", "title", "text"), "embed": ("title", "text"), "sparse": ("title", "text")},
+}
+
+
+def record_text(record: dict, fields) -> str:
+    """El texto de un registro para `fields` ("título. contenido")."""
+    return ". ".join(record[field] for field in fields if record.get(field))
+
+
+def load_documents(name: str, path: str = None):
+    """(registros, textos a vectorizar) de una colección, leídos de su fuente."""
+    spec = COLLECTIONS[name]
+    records = spec["loader"](path or spec["source"])
+    return records, [record_text(record, spec["embed"]) for record in records]
+
+
+# --- 3. Archivos y Manifiesto ---
+def collection_paths(name: str, directory: str = VECTOR_DB_DIR) -> dict:
+    index_path = os.path.join(directory, name, INDEX_FILE)
+    return {"dir": os.path.join(directory, name), "index": index_path,
+            "metadata": os.path.join(directory, name, METADATA_FILE), "bm25": bm25_path_for(index_path)}
+
+
+def load_manifest(directory: str = VECTOR_DB_DIR) -> dict:
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {"format": MANIFEST_FORMAT, "collections": {}}
+    if manifest.get("format") != MANIFEST_FORMAT:
+        raise ValueError(f"Formato de manifiesto {manifest.get('format')} no soportado (se esperaba {MANIFEST_FORMAT}).")
+    return manifest
+
+
+def update_manifest(name: str, entry: dict, directory: str = VECTOR_DB_DIR):
+    """Añade o sustituye la entrada de una colección, pasando por un temporal y renombrando."""
+    manifest = load_manifest(directory)
+    manifest["collections"][name] = entry
+    manifest["updated_at"] = time.time()
+    path = os.path.join(directory, MANIFEST_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+# --- 4. Construcción ---
+def build_collection(name: str, index_config: dict, full: bool = False, source: str = None,
+                     directory: str = VECTOR_DB_DIR, model_name: str = MODEL_NAME, batch_size: int = 128):
+    """
+    Lee la fuente de la colección y escribe su índice FAISS, su índice BM25, sus metadatos y su
+    entrada del manifiesto. Los embeddings se guardan por hash de contenido: sólo se codifican
+    los documentos nuevos o modificados y, si ninguno cambió (mismo modelo y configuración), el
+    índice FAISS no se toca. Con `full=True` se vuelve a codificar todo.
+    Devuelve la entrada del manifiesto, o None si la fuente no existe o está vacía.
+    """
+    from shared_libs.vectordb.ann_index import build_index, save_index, index_is_current
+    from shared_libs.vectordb.embedding_store import (EmbeddingStore, store_dir_for, content_hash,
+                                                      documents_digest, lazy_encoder)
+    spec = COLLECTIONS[name]
+    source = source or spec["source"]
+    try:
+        records, documents = load_documents(name, source)
+    except FileNotFoundError:
+        print(f"ADVERTENCIA: No se encontró la fuente de '{name}' ({source}); se omite.")
+        return None
+    if not records:
+        print(f"ADVERTENCIA: La fuente de '{name}' ({source}) no tiene documentos; se omite.")
+        return None
+    print(f"INFO: '{name}': {len(documents)} documentos de {source}.")
+
+    paths = collection_paths(name, directory)
+    os.makedirs(paths["dir"], exist_ok=True)
+    extra = {"model": model_name, "collection": name,
+             "documents_digest": documents_digest(content_hash(doc) for doc in documents)}
+    if not full and index_is_current(paths["index"], index_config, extra):
+        print(f"INFO: '{name}': el índice FAISS ya está al día (mismos documentos, modelo y configuración).")
+    else:
+        store = EmbeddingStore(store_dir_for(paths["index"]), model_name)
+        if full:
+            store.clear()
+        embeddings, stats = store.sync(documents, lazy_encoder(model_name, batch_size=batch_size))
+        print(f"INFO: '{name}': embeddings {stats['reused']} reutilizados, {stats['encoded']} codificados, "
+              f"{stats['removed']} eliminados del almacén.")
+        index = build_index(embeddings, index_config)
+        save_index(index, index_config, paths["index"], extra=extra, vectors=embeddings)
+        print(f"INFO: '{name}': índice FAISS '{index_config['type']}' con {index.ntotal} vectores en {paths['index']}")
+
+    # Metadatos y BM25 dependen también de campos que no se vectorizan (títulos): se reescriben siempre.
+    write_metadata(paths["metadata"], records, spec["fields"])
+    BM25Index.build(record_text(record, spec["sparse"]) for record in records).save(paths["bm25"])
+
+    entry = {
+        "documents": len(records),
+        "model": model_name,
+        "source": os.path.relpath(source, REPO_ROOT),
+        "fields": list(spec["fields"]),
+        "embed": list(spec["embed"]),
+        "sparse": list(spec["sparse"]),
+        "index": os.path.relpath(paths["index"], directory),
+        "metadata": os.path.relpath(paths["metadata"], directory),
+        "bm25": os.path.relpath(paths["bm25"], directory),
+        "index_config": {key: index_config[key] for key in ("type", "metric", "storage", "rescore")},
+        "documents_digest": extra["documents_digest"],
+        "built_at": time.time(),
+    }
+    update_manifest(name, entry, directory)
+    print(f"✅ '{name}' lista en {paths['dir']}")
+    return entry
+
+
+# --- 5. Consulta ---
+def matches_filters(metadata: dict, filters: dict) -> bool:
+    """`filters` = {campo: valor o lista de valores}; p. ej. {"class": ["Wall", "WallType"], "kind": "method"}."""
+    for field, expected in filters.items():
+        value = metadata.get(field)
+        if isinstance(expected, (list, tuple, set, frozenset)):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+def _load_index(path: str):
+    """Índice mapeado en memoria si FAISS lo permite para su tipo; si no, leído entero."""
+    from shared_libs.vectordb.ann_index import load_index
+    try:
+        return load_index(path, mmap=True)
+    except RuntimeError:
+        return load_index(path)
+
+
+class Collection:
+    """
+    Una colección abierta: índice FAISS, vectores exactos (con --rescore) y metadatos mapeados
+    en memoria. El índice BM25 se carga con la primera búsqueda híbrida.
+    Cada acierto es {"id", "distance", ("score",) + los campos del registro}; "id" es siempre la
+    posición del vector, aunque el registro tenga su propio campo "id" (rag_corpus).
+    """
+    def __init__(self, name: str, entry: dict, directory: str = VECTOR_DB_DIR, model_name: str = MODEL_NAME):
+        from shared_libs.vectordb.ann_index import load_exact_vectors
+        self.name = name
+        self.entry = entry
+        if entry.get("model") != model_name:
+            raise ValueError(f"la colección '{name}' se generó con '{entry.get('model')}', no con '{model_name}'")
+        index_path = os.path.join(directory, entry["index"])
+        self.index, self.config = _load_index(index_path)
+        self.exact = load_exact_vectors(index_path, self.index, self.config)
+        self.store = MetadataStore(os.path.join(directory, entry["metadata"]))
+        if len(self.store) != self.index.ntotal:
+            raise ValueError(f"'{name}': el índice tiene {self.index.ntotal} vectores y los metadatos {len(self.store)} registros")
+        self._bm25_path = os.path.join(directory, entry["bm25"])
+        self._sparse = None
+        self._sparse_lock = threading.Lock()
+
+    def __len__(self):
+        return self.index.ntotal
+
+    @property
+    def sparse(self) -> BM25Index:
+        """El índice BM25 guardado o, si falta o no cuadra con los metadatos, uno en memoria."""
+        if self._sparse is None:
+            with self._sparse_lock:
+                if self._sparse is None:
+                    self._sparse = self._load_sparse()
+        return self._sparse
+
+    def _load_sparse(self) -> BM25Index:
+        if os.path.exists(self._bm25_path):
+            sparse = BM25Index.load(self._bm25_path)
+            if len(sparse) == len(self.store):
+                return sparse
+            logger.warning(f"{self._bm25_path} tiene {len(sparse)} documentos y '{self.name}' {len(self.store)}; "
+                           f"se reconstruye en memoria.")
+        fields = self.entry["sparse"]
+        return BM25Index.build(record_text(self.store.get(i), fields) for i in range(len(self.store)))
+
+    def record(self, doc_id: int) -> dict:
+        return self.store.get(doc_id) or {}
+
+    def search_vectors(self, vectors, k: int, filters: dict = None) -> list:
+        """Vecinos de una matriz de consultas ya codificadas: una sola llamada a `index.search`."""
+        from shared_libs.vectordb.ann_index import search, as_distance
+        fetch = min(k * FILTER_OVERSAMPLE if filters else k, self.index.ntotal)
+        distances, indices = search(self.index, self.config, vectors, fetch, self.exact)
+        results = []
+        for row_distances, row_indices in zip(distances, indices):
+            hits = []
+            for distance, i in zip(row_distances, row_indices):
+                if i < 0:
+                    continue
+                record = self.record(int(i))
+                if filters and not matches_filters(record, filters):
+                    continue
+                hits.append({**record, "id": int(i), "distance": as_distance(distance, self.config)})
+                if len(hits) == k:
+                    break
+            results.append(hits)
+        return results
+
+    def search_hybrid(self, texts: list, vectors, k: int, filters: dict = None) -> list:
+        """Densa + BM25 fusionadas con RRF; cada acierto lleva su distancia densa (o None) y la puntuación fusionada."""
+        candidates = max(k, HYBRID_CANDIDATES)
+        dense = self.search_vectors(vectors, candidates, filters)
+        allowed = (lambda i: matches_filters(self.record(i), filters)) if filters else None
+        results = []
+        for text, dense_hits in zip(texts, dense):
+            sparse_ids = [i for i, _ in self.sparse.search(text, candidates, allowed)]
+            distances = {hit["id"]: hit["distance"] for hit in dense_hits}
+            fused = reciprocal_rank_fusion([[hit["id"] for hit in dense_hits], sparse_ids], [1.0, SPARSE_WEIGHT])
+            results.append([
+                {**self.record(i), "id": i, "distance": distances.get(i), "score": score}
+                for i, score in fused[:k]
+            ])
+        return results
+
+    def search(self, texts: list, vectors, k: int = DEFAULT_K, filters: dict = None, hybrid: bool = RAG_HYBRID) -> list:
+        if hybrid:
+            return self.search_hybrid(texts, vectors, k, filters)
+        return self.search_vectors(vectors, k, filters)
+
+
+# --- 6. Servicio ---
+class VectorIndexService:
+    """
+    Todas las colecciones del manifiesto con un solo encoder por proceso (`get_encoder`).
+    Cada colección se abre una vez, la primera vez que se consulta (o con `open`), y queda
+    mapeada en memoria: los procesos del mismo host comparten las páginas del índice y de los
+    metadatos en lugar de cargar cada uno su copia.
+    """
+    def __init__(self, directory: str = VECTOR_DB_DIR, model_name: str = MODEL_NAME):
+        self.directory = directory
+        self.model_name = model_name
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    @property
+    def encoder(self):
+        return get_encoder(self.model_name)
+
+    def names(self) -> list:
+        """Las colecciones construidas (las del manifiesto)."""
+        return list(load_manifest(self.directory)["collections"])
+
+    def collection(self, name: str) -> Collection:
+        if name in self._collections:
+            return self._collections[name]
+        with self._lock:
+            if name not in self._collections:
+                entry = load_manifest(self.directory)["collections"].get(name)
+                if entry is None:
+                    raise ValueError(f"la colección '{name}' no está en {os.path.join(self.directory, MANIFEST_FILE)} "
+                                     f"(constrúyala con shared_libs/utils/build_vector_db.py --collection {name})")
+                self._collections[name] = Collection(name, entry, self.directory, self.model_name)
+            return self._collections[name]
+
+    def open(self, names: list = None):
+        """Abre las colecciones indicadas (todas las del manifiesto por defecto) y carga el encoder."""
+        for name in names or self.names():
+            self.collection(name)
+        return self.encoder
+
+    def encode(self, texts: list, batch_size: int = 64):
+        return self.encoder.encode(texts, batch_size=batch_size)
+
+    def search(self, queries: list, collections: dict, vectors=None, hybrid: bool = RAG_HYBRID) -> dict:
+        """
+        `collections` = {nombre: k} o {nombre: {"k": k, "filters": {...}}}. Las consultas se
+        codifican una sola vez para todas las colecciones (o se usan `vectors`, ya codificadas).
+        Devuelve {nombre: [aciertos de cada consulta]}.
+        """
+        if vectors is None:
+            vectors = self.encode(queries)
+        results = {}
+        for name, options in collections.items():
+            if not isinstance(options, dict):
+                options = {"k": options}
+            results[name] = self.collection(name).search(queries, vectors, options.get("k", DEFAULT_K),
+                                                         options.get("filters"), hybrid)
+        return results
+
+
+INDEX_SERVICE = VectorIndexService()
@@ -0,0 +1,104 @@
+# vectordb/metadata_store.py
+import os
+import json
+import mmap
+import struct
+
+# --- 1. Formato ---
+# Un archivo por colección, abierto con mmap (los procesos de un mismo host comparten las páginas):
+#   cabecera   MAGIC, nº de registros, nº de campos, longitud del JSON de campos
+#   campos     JSON con los nombres de los campos, rellenado hasta múltiplo de 8 bytes
+#   offsets    uint64 x (registros * campos + 1): el campo f del registro i ocupa
+#              blob[offsets[i*F + f]:offsets[i*F + f + 1]]
+#   blob       los textos en UTF-8, concatenados
+# El ID de un registro es su posición: el mismo ID que su vector en el índice FAISS.
+# Un campo ausente (o vacío) ocupa 0 bytes y no aparece en el registro.
+MAGIC = b"RVMETA01"
+_HEADER = struct.Struct("<8sIII")
+
+
+def _padded(length: int) -> int:
+    return (length + 7) // 8 * 8
+
+
+# --- 2. Escritura ---
+def write_metadata(path: str, records, fields: list):
+    """Escribe los registros (dicts con campos str) en `path`, pasando por un temporal y renombrando."""
+    fields = list(fields)
+    offsets = [0]
+    blob = bytearray()
+    # Se cuentan aparte: sin campos no hay offsets por registro de los que deducir cuántos hay.
+    n_records = 0
+    for record in records:
+        n_records += 1
+        for field in fields:
+            value = record.get(field)
+            if value:
+                blob += str(value).encode("utf-8")
+            offsets.append(len(blob))
+    fields_json = json.dumps(fields, ensure_ascii=False).encode("utf-8")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, n_records, len(fields), len(fields_json)))
+        f.write(fields_json.ljust(_padded(len(fields_json)), b" "))
+        f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        f.write(blob)
+    os.replace(tmp_path, path)
+    return n_records
+
+
+# --- 3. Lectura ---
+class MetadataStore:
+    """
+    Lectura O(1) por ID sobre el archivo mapeado en memoria: sólo se decodifica el campo pedido.
+    Abrir el almacén no lee los textos (no hay nada que parsear al arrancar).
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.n_records, n_fields, fields_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} no es un almacén de metadatos ({magic!r}).")
+        start = _HEADER.size
+        self.fields = json.loads(bytes(self._mm[start:start + fields_len]).decode("utf-8"))
+        self._field_index = {name: i for i, name in enumerate(self.fields)}
+        start += _padded(fields_len)
+        n_offsets = self.n_records * n_fields + 1
+        self._offsets = memoryview(self._mm)[start:start + 8 * n_offsets].cast("Q")
+        self._blob_start = start + 8 * n_offsets
+
+    def __len__(self):
+        return self.n_records
+
+    def _slot(self, slot: int) -> str:
+        start, end = self._offsets[slot], self._offsets[slot + 1]
+        if start == end:
+            return None
+        base = self._blob_start
+        return self._mm[base + start:base + end].decode("utf-8")
+
+    def field(self, record_id: int, name: str, default=None):
+        """Un campo de un registro (o `default` si el registro no lo tiene)."""
+        if not 0 <= record_id < self.n_records:
+            return default
+        value = self._slot(record_id * len(self.fields) + self._field_index[name])
+        return default if value is None else value
+
+    def get(self, record_id: int) -> dict:
+        """El registro completo, sólo con los campos presentes."""
+        if not 0 <= record_id < self.n_records:
+            return None
+        n_fields = len(self.fields)
+        record = {}
+        for f, name in enumerate(self.fields):
+            value = self._slot(record_id * n_fields + f)
+            if value is not None:
+                record[name] = value
+        return record
+
+    def close(self):
+        self._offsets.release()
+        self._mm.close()
+        self._file.close()
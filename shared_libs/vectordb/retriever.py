@@ -0,0 +1,249 @@
+# vectordb/retriever.py
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from shared_libs.utils.metrics import REGISTRY
+from shared_libs.utils.deadline import remaining_seconds
+from shared_libs.vectordb.cache import LRUCache
+from shared_libs.vectordb.index_service import INDEX_SERVICE, RAG_HYBRID
+
+logger = logging.getLogger("Retriever")
+
+# --- 1. Configuración ---
+# La colección del catálogo de la API en el servicio de índices (index_service.py), que genera
+# shared_libs/utils/build_vector_db.py.
+COLLECTION = os.getenv("RAG_COLLECTION", "api_signatures")
+RAG_ENABLED = os.getenv("RAG_ENABLED", "1") != "0"
+# RAG_LAZY=1: el índice y el modelo se cargan con la primera petición en lugar de al arrancar.
+RAG_LAZY = os.getenv("RAG_LAZY", "0") == "1"
+TOP_K = int(os.getenv("RAG_TOP_K", "3"))
+# Tiempo máximo que una petición espera al RAG; pasado ese tiempo sigue sin contexto de API.
+BUDGET_MS = float(os.getenv("RAG_BUDGET_MS", "150"))
+RAG_WORKERS = int(os.getenv("RAG_WORKERS", "2"))
+# Cachés: texto normalizado -> embedding, y (hash del embedding, k, filtros) -> resultados.
+EMBEDDING_CACHE_SIZE = int(os.getenv("RAG_EMBEDDING_CACHE_SIZE", "4096"))
+RESULT_CACHE_SIZE = int(os.getenv("RAG_RESULT_CACHE_SIZE", "4096"))
+
+RETRIEVALS = REGISTRY.counter("rag_retrieval_total", "Búsquedas del RAG por resultado.")
+RETRIEVAL_LATENCY = REGISTRY.histogram("rag_retrieval_ms", "Duración de la búsqueda del RAG (codificación + índice), en ms.")
+
+_SPACES_RE = re.compile(r'\s+')
+_EDGE_PUNCT_RE = re.compile(r'^[\s.,;:!?¡¿"\']+|[\s.,;:!?¡¿"\']+$')
+
+
+def normalize_query(text: str) -> str:
+    """
+    Clave de la caché de embeddings y texto que se codifica. MiniLM no distingue mayúsculas,
+    así que pasar a minúsculas y quitar espacios o puntuación de los extremos no cambia nada.
+    """
+    return _EDGE_PUNCT_RE.sub("", _SPACES_RE.sub(" ", text.lower()))
+
+
+def filters_key(filters: dict) -> str:
+    return json.dumps(filters, sort_keys=True, default=sorted) if filters else ""
+
+
+def _vector_key(vector) -> str:
+    return hashlib.sha1(vector.tobytes()).hexdigest()
+
+
+# --- 2. Recuperador ---
+class Retriever:
+    """
+    Búsqueda semántica en el catálogo de la API dentro del proceso del orquestador.
+
+    La colección (mapeada en memoria, ver index_service.py) y el encoder compartido del proceso
+    se cargan una vez (al arrancar, o con la primera petición si RAG_LAZY=1). Las búsquedas corren en un pool de hilos propio para poder lanzarlas en
+    paralelo a la NLU y esperarlas con un presupuesto de tiempo: si no llegan a tiempo, la
+    petición sigue sin contexto de API. Sin faiss, sin modelo o sin colección se avisa una vez y
+    `retrieve` devuelve siempre [].
+
+    Tres niveles de caché: embeddings por consulta normalizada, resultados por (embedding, k,
+    filtros) y, calculados al cargar, los resultados de la consulta de API de cada intención
+    (`precompute`), que sólo se usan si la búsqueda de la petición no llega a tiempo. Si todo
+    está en caché `submit` resuelve sin pasar por el pool.
+    """
+    def __init__(self, service=INDEX_SERVICE, collection: str = COLLECTION):
+        self.service = service
+        self.collection_name = collection
+        self.collection = None
+        self.model = None
+        self.available = RAG_ENABLED
+        self.embedding_cache = LRUCache("embedding", EMBEDDING_CACHE_SIZE)
+        self.result_cache = LRUCache("results", RESULT_CACHE_SIZE)
+        self.intent_queries = {}
+        self.intent_results = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=RAG_WORKERS, thread_name_prefix="rag")
+
+    @property
+    def ready(self) -> bool:
+        return self.collection is not None
+
+    def _load(self, wait: bool = True) -> bool:
+        if self.collection is not None or not self.available:
+            return self.available
+        if not self._lock.acquire(blocking=wait):
+            return False
+        try:
+            if self.collection is not None or not self.available:
+                return self.available
+            collection = self.service.collection(self.collection_name)
+            self.model = self.service.encoder
+            if RAG_HYBRID:
+                collection.sparse   # BM25 cargado ahora y no en la primera petición
+            self.collection = collection
+        except Exception as e:
+            self.available = False
+            logger.warning(f"RAG desactivado ({e}); los prompts no llevarán contexto de API.")
+            return False
+        finally:
+            self._lock.release()
+        logger.info(f"RAG listo: '{self.collection_name}' con {len(self.collection)} documentos, índice "
+                    f"'{self.collection.config['type']}', modelo '{self.service.model_name}' ({self.model.backend})"
+                    f"{', híbrido con BM25' if RAG_HYBRID else ''}.")
+        self._precompute()
+        return True
+
+    def _precompute(self, k: int = TOP_K):
+        if not self.intent_queries:
+            return
+        intents = list(self.intent_queries)
+        normalized = [normalize_query(self.intent_queries[intent]) for intent in intents]
+        results = self._search(normalized, [None] * len(intents), [None] * len(intents), k, None)
+        self.intent_results = dict(zip(intents, results))
+        logger.info(f"RAG: resultados precalculados para {len(intents)} intenciones.")
+
+    def warm_up(self, background: bool = False, precompute: dict = None):
+        """
+        Carga índice y modelo; con RAG_LAZY=1 no hace nada (se cargan con la primera búsqueda).
+        `precompute` = {intención: consulta de API}: sus resultados se calculan al cargar y
+        se guardan en memoria (ver `collect`).
+        """
+        if precompute:
+            self.intent_queries = {intent: query for intent, query in precompute.items() if query}
+        if RAG_LAZY or not self.available:
+            return
+        if background:
+            threading.Thread(target=self._load, name="rag-warmup", daemon=True).start()
+        else:
+            self._load()
+
+    def encode(self, queries: list):
+        return self.model.encode(queries, batch_size=64)
+
+    def _lookup(self, normalized: list, k: int, filters: dict):
+        """Lo que ya está en caché: (embeddings o None, resultados o None) por consulta."""
+        fkey = filters_key(filters)
+        vectors = [self.embedding_cache.get(text) for text in normalized]
+        results = [self.result_cache.get((_vector_key(v), k, fkey)) if v is not None else None for v in vectors]
+        return vectors, results
+
+    def _search(self, normalized: list, vectors: list, results: list, k: int, filters: dict) -> list:
+        """Completa `results`: codifica las consultas sin embedding y busca las que no tienen resultados."""
+        # Con RAG_LAZY=1 la primera búsqueda carga el índice (esa petición agotará su presupuesto).
+        if not self._load(wait=True):
+            return [[] for _ in normalized]
+        import numpy as np
+        start = time.perf_counter()
+        vectors, results = list(vectors), list(results)
+        fkey = filters_key(filters)
+
+        missing = list(dict.fromkeys(text for text, v in zip(normalized, vectors) if v is None))
+        if missing:
+            encoded = dict(zip(missing, self.encode(missing)))
+            for text, vector in encoded.items():
+                self.embedding_cache.put(text, vector)
+            for i, text in enumerate(normalized):
+                if vectors[i] is None:
+                    vectors[i] = encoded[text]
+                    results[i] = self.result_cache.get((_vector_key(vectors[i]), k, fkey))
+
+        pending = [i for i, r in enumerate(results) if r is None]
+        if pending:
+            matrix = np.stack([vectors[i] for i in pending])
+            found = self.collection.search([normalized[i] for i in pending], matrix, k, filters, RAG_HYBRID)
+            for i, hits in zip(pending, found):
+                results[i] = hits
+                self.result_cache.put((_vector_key(vectors[i]), k, fkey), hits)
+        RETRIEVAL_LATENCY.observe((time.perf_counter() - start) * 1000)
+        return results
+
+    def submit(self, queries: list, k: int = TOP_K, filters: dict = None):
+        """
+        Lanza la búsqueda en segundo plano y devuelve un future (o None si el RAG no está
+        disponible). Si todos los resultados están en caché, el future ya viene resuelto.
+        """
+        if not self.available or not queries:
+            return None
+        if not self.ready and not RAG_LAZY:
+            # Aún cargando en segundo plano: no se encola nada que bloquee el pool.
+            return None
+        normalized = [normalize_query(query) for query in queries]
+        vectors, results = self._lookup(normalized, k, filters)
+        if all(r is not None for r in results):
+            future = Future()
+            future.set_result(results)
+            return future
+        return self._executor.submit(self._search, normalized, vectors, results, k, filters)
+
+    def collect(self, future, n_queries: int, started: float, budget_ms: float = BUDGET_MS,
+                deadline: float = None, intents: list = None) -> list:
+        """
+        Espera el resultado de `submit` como mucho hasta agotar el presupuesto (contado desde
+        `started`, un `time.perf_counter()`) o el deadline de la petición.
+
+        Con `intents` (la intención de cada consulta, ya clasificada): si la búsqueda no llega a
+        tiempo, falla o no se lanzó, y todas tienen resultados precalculados, se devuelven ésos
+        en lugar de nada. La búsqueda de la propia consulta siempre tiene preferencia.
+        """
+        precomputed = [self.intent_results.get(intent) for intent in intents] if intents else None
+        if precomputed is not None and any(hits is None for hits in precomputed):
+            precomputed = None
+        if future is None:
+            return self._without_search(precomputed, n_queries, "unavailable")
+        timeout = budget_ms / 1000 - (time.perf_counter() - started)
+        if deadline is not None:
+            timeout = min(timeout, remaining_seconds(deadline))
+        try:
+            results = future.result(timeout=max(timeout, 0))
+        except FutureTimeout:
+            # La búsqueda sigue en el pool y su resultado se descarta.
+            return self._without_search(precomputed, n_queries, "timeout")
+        except Exception as e:
+            logger.error(f"Error en la búsqueda del RAG: {e}")
+            return self._without_search(precomputed, n_queries, "error")
+        RETRIEVALS.inc(n_queries, result="ok" if self.available else "unavailable")
+        return results
+
+    @staticmethod
+    def _without_search(precomputed: list, n_queries: int, reason: str) -> list:
+        """Resultados precalculados por intención si los hay; si no, sin contexto de API."""
+        if precomputed is not None:
+            RETRIEVALS.inc(n_queries, result="precomputed")
+            return precomputed
+        RETRIEVALS.inc(n_queries, result=reason)
+        return [[] for _ in range(n_queries)]
+
+    def cache_stats(self) -> dict:
+        return {"embedding": self.embedding_cache.stats(), "results": self.result_cache.stats(),
+                "precomputed_intents": len(self.intent_results)}
+
+    def retrieve_batch(self, queries: list, k: int = TOP_K, filters: dict = None,
+                       budget_ms: float = BUDGET_MS, deadline: float = None) -> list:
+        started = time.perf_counter()
+        return self.collect(self.submit(queries, k, filters), len(queries), started, budget_ms, deadline)
+
+    def retrieve(self, query: str, k: int = TOP_K, filters: dict = None,
+                 budget_ms: float = BUDGET_MS, deadline: float = None) -> list:
+        """Los k documentos de la API más cercanos a `query`: [{"id", "distance", "text", "class", ...}]."""
+        return self.retrieve_batch([query], k, filters, budget_ms, deadline)[0]
+
+
+RETRIEVER = Retriever()
@@ -1,9 +1,7 @@
 import os
 import sys
 import json
-import numpy as np
-import faiss
-from sentence_transformers import SentenceTransformer
+import argparse
 
 # --- Configuración de Rutas ---
 # El script se ejecuta desde la raíz, por lo que podemos construir rutas relativas simples.
@@ -12,76 +10,179 @@ REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
 # Añadimos la raíz del proyecto al path para poder importar el paquete 'shared_libs'
 sys.path.insert(0, REPO_ROOT)
 
-from shared_libs.nlu.intent_classifier import classify_intent
-from shared_libs.nlu.slot_filler import extract_slots
+from shared_libs.nlu.intent_classifier import classify_intents
+from shared_libs.nlu.slot_filler import extract_slots_batch
+from shared_libs.nlu.utterance import Utterance
+from shared_libs.vectordb.index_service import INDEX_SERVICE
 
 # Rutas a los archivos de datos y del RAG
 DATA_DIR = os.path.join(REPO_ROOT, 'Revit-Agent', 'agent-revit-orchestrator', 'data')
 IN_FILE = os.path.join(DATA_DIR, 'train_data.jsonl')
 OUT_FILE = os.path.join(DATA_DIR, 'train_data_rag_format_v2.jsonl')
-FAISS_INDEX_PATH = os.path.join(DATA_DIR, 'faiss_index.bin')
-MAPPING_PATH = os.path.join(DATA_DIR, 'index_to_api.json')
-MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
-
-# --- Cargamos los componentes del RAG al inicio ---
-print("INFO: Cargando componentes del RAG...")
-try:
-    rag_index = faiss.read_index(FAISS_INDEX_PATH)
-    with open(MAPPING_PATH, 'r', encoding='utf-8') as f:
-        # Las claves en JSON siempre son strings, así que cargamos tal cual.
-        index_to_api_map = json.load(f)
-    model = SentenceTransformer(MODEL_NAME)
-    RAG_ENABLED = True
-    print("INFO: RAG cargado con éxito.")
-except Exception as e:
-    print(f"ADVERTENCIA: No se pudieron cargar los archivos del RAG. 'RELEVANT_API_CONTEXT' estará vacío. Error: {e}")
-    RAG_ENABLED = False
+# Colección del servicio de índices (shared_libs/utils/build_vector_db.py) con el catálogo de la API.
+RAG_COLLECTION = 'api_signatures'
+# La NLU se resuelve por bloques de líneas, repartidos entre NLU_WORKERS procesos (1 = en este
+# proceso, 0 = uno por CPU).
+BLOCK_SIZE = 2000
+NLU_WORKERS = int(os.getenv("NLU_WORKERS", "1"))
+# Tamaño de lote del modelo al codificar las consultas de un bloque.
+ENCODE_BATCH_SIZE = 128
+# Progreso de la transformación: permite reanudar una ejecución interrumpida.
+CHECKPOINT_PATH = OUT_FILE + '.checkpoint.json'
+
+RAG_ENABLED = False
+
+
+def load_rag():
+    """
+    Carga la colección (mapeada en memoria) y el encoder compartido del proceso, el mismo que
+    usa el orquestador. Se llama desde `transform()` y no al importar el módulo: con NLU_WORKERS
+    distinto de 1, cada proceso del pool vuelve a importar `__main__` (método spawn) y cargaría
+    otra vez el índice y MiniLM.
+    """
+    global RAG_ENABLED
+    print("INFO: Cargando componentes del RAG...")
+    try:
+        INDEX_SERVICE.open([RAG_COLLECTION])
+        api_collection = INDEX_SERVICE.collection(RAG_COLLECTION)
+        RAG_ENABLED = True
+        print(f"INFO: RAG cargado con éxito ('{RAG_COLLECTION}', índice '{api_collection.config['type']}').")
+    except Exception as e:
+        print(f"ADVERTENCIA: No se pudieron cargar los archivos del RAG. 'RELEVANT_API_CONTEXT' estará vacío. Error: {e}")
+        RAG_ENABLED = False
 
 
 def find_relevant_api_context(query: str, k: int = 3) -> list[str]:
     """
     Busca en el índice FAISS los k fragmentos de API más relevantes para la consulta.
     """
-    if not RAG_ENABLED:
-        return []
-    
+    return find_relevant_api_context_batch([query], k)[0]
+
+
+def find_relevant_api_context_batch(queries: list, k: int = 3) -> list:
+    """
+    Contexto de API para un lote de consultas: una sola codificación y un solo `index.search`.
+    Las consultas repetidas se resuelven una vez y se codifican ordenadas por longitud
+    (menos relleno en cada lote del modelo); el resultado respeta el orden de `queries`.
+    """
+    if not RAG_ENABLED or not queries:
+        return [[] for _ in queries]
+
     try:
-        query_vector = model.encode([query])
-        distances, indices = rag_index.search(np.array(query_vector).astype('float32'), k)
-        
-        # El mapeo usa claves string '0', '1', etc., así que convertimos los índices a string para buscar.
-        return [index_to_api_map.get(str(i), "Unknown API entry") for i in indices[0]]
+        unique = sorted(set(queries), key=len)
+        query_vectors = INDEX_SERVICE.encode(unique, batch_size=ENCODE_BATCH_SIZE)
+        # Sólo la búsqueda densa, como al generar las versiones anteriores del dataset.
+        hits = INDEX_SERVICE.search(unique, {RAG_COLLECTION: k}, vectors=query_vectors, hybrid=False)[RAG_COLLECTION]
+
+        by_query = {
+            query: [hit.get("text", "Unknown API entry") for hit in row]
+            for query, row in zip(unique, hits)
+        }
+        return [by_query[query] for query in queries]
     except Exception as e:
-        print(f"ERROR durante la búsqueda RAG para la consulta '{query}': {e}")
-        return []
+        print(f"ERROR durante la búsqueda RAG de un lote de {len(queries)} consultas: {e}")
+        return [[] for _ in queries]
+
+
+def read_records(fin):
+    """Genera (petición, completion) de las líneas válidas del dataset original."""
+    for line in fin:
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError:
+            print(f"Advertencia: Se omitió una línea mal formada: {line.strip()}")
+            continue
+        user_request = (obj.get('prompt') or "").strip()
+        completion = obj.get('completion', '').strip()
+        if user_request and completion:
+            yield user_request, completion
+
+
+def read_blocks(fin, block_size: int = BLOCK_SIZE):
+    block = []
+    for record in read_records(fin):
+        block.append(record)
+        if len(block) >= block_size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def input_signature(path: str) -> dict:
+    """Identifica la versión del archivo de entrada: si cambia, el checkpoint ya no sirve."""
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def load_checkpoint(signature: dict):
+    """Checkpoint de una ejecución anterior sobre el mismo archivo de entrada, o None."""
+    try:
+        with open(CHECKPOINT_PATH, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if checkpoint.get("input") != signature or not os.path.exists(OUT_FILE):
+        return None
+    if os.path.getsize(OUT_FILE) < checkpoint["bytes"]:
+        return None
+    return checkpoint
+
 
+def save_checkpoint(signature: dict, records: int, size: int):
+    tmp_path = CHECKPOINT_PATH + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"input": signature, "records": records, "bytes": size}, f)
+    os.replace(tmp_path, CHECKPOINT_PATH)
 
-def transform():
+
+def transform(restart: bool = False):
     """
     Transforma el dataset original al nuevo formato RAG, incluyendo el contexto de la API.
+
+    Trabaja por bloques: NLU del bloque completo, una codificación y una búsqueda FAISS por
+    bloque, y escritura en orden. Tras cada bloque se guarda un checkpoint (registros
+    procesados y bytes escritos); si la ejecución se interrumpe, la siguiente descarta lo
+    escrito después del último checkpoint y continúa desde ahí.
     """
-    print(f"Transformando {IN_FILE} -> {OUT_FILE}...")
-    count = 0
+    load_rag()
+    signature = input_signature(IN_FILE)
+    checkpoint = None if restart else load_checkpoint(signature)
+    done = checkpoint["records"] if checkpoint else 0
+    if checkpoint:
+        print(f"Reanudando {IN_FILE} -> {OUT_FILE} desde el registro {done}...")
+        # Lo escrito después del último checkpoint se descarta (bloque a medias).
+        with open(OUT_FILE, 'r+b') as f:
+            f.truncate(checkpoint["bytes"])
+    else:
+        print(f"Transformando {IN_FILE} -> {OUT_FILE}...")
+
+    count = done
+    skipped = 0
     with open(IN_FILE, 'r', encoding='utf-8') as fin, \
-         open(OUT_FILE, 'w', encoding='utf-8') as fout:
-
-        for i, line in enumerate(fin):
-            try:
-                obj = json.loads(line)
-                user_request = (obj.get('prompt') or "").strip()
-                completion = obj.get('completion', '').strip()
-                
-                if not user_request or not completion:
+         open(OUT_FILE, 'ab' if checkpoint else 'wb') as fout:
+
+        for block in read_blocks(fin):
+            if skipped < done:
+                take = min(len(block), done - skipped)
+                skipped += take
+                block = block[take:]
+                if not block:
                     continue
 
-                # 1. NLU
-                intent = classify_intent(user_request)
-                slots = extract_slots(user_request, intent)
+            # 1. NLU del bloque completo, con los matchers compilados una sola vez.
+            utterances = [Utterance(user_request) for user_request, _ in block]
+            # Sin el respaldo por embeddings: DETECTED_INTENT es la decisión de los patrones
+            # ('Unknown' incluido), como en las versiones anteriores del dataset.
+            intents = classify_intents(utterances, workers=NLU_WORKERS, fallback=False)
+            slots_list = extract_slots_batch(utterances, intents, workers=NLU_WORKERS)
 
-                # 2. RAG (Retrieval)
-                api_context = find_relevant_api_context(user_request)
+            # 2. RAG (Retrieval) del bloque completo
+            contexts = find_relevant_api_context_batch([user_request for user_request, _ in block])
 
-                # 3. Construcción del nuevo objeto
+            # 3. Construcción de los nuevos objetos, en el orden original
+            lines = []
+            for (user_request, completion), intent, slots, api_context in zip(block, intents, slots_list, contexts):
                 new_obj = {
                     "USER_REQUEST": user_request,
                     "DETECTED_INTENT": intent,
@@ -89,18 +190,19 @@ def transform():
                     "RELEVANT_API_CONTEXT": api_context,
                     "EXPECTED_COMPLETION": completion
                 }
-                fout.write(json.dumps(new_obj, ensure_ascii=False) + "\n")
-                count += 1
-
-                if (i + 1) % 500 == 0:
-                    print(f"  Procesadas {i+1} líneas...")
-
-            except json.JSONDecodeError:
-                print(f"Advertencia: Se omitió una línea mal formada: {line.strip()}")
-                continue
-    
+                lines.append(json.dumps(new_obj, ensure_ascii=False) + "\n")
+            fout.write("".join(lines).encode('utf-8'))
+            fout.flush()
+            count += len(block)
+            save_checkpoint(signature, count, fout.tell())
+            print(f"  Procesadas {count} líneas...")
+
+    if os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
     print(f"\n✅ ¡Dataset transformado con formato RAG completo! Se procesaron {count} líneas.")
 
 
 if __name__ == "__main__":
-    transform()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Transforma train_data.jsonl al formato RAG (NLU + contexto de la API).")
+    parser.add_argument("--restart", action="store_true", help="Ignora el checkpoint y empieza desde el principio.")
+    transform(restart=parser.parse_args().restart)
\ No newline at end of file